@@ -0,0 +1,164 @@
+# 性能监控告警规则
+# 对采样得到的指标流增量求值：每条规则只保存当前状态或固定时间窗口内的样本，
+# 每个样本的求值开销为 O(1)（窗口滑动为均摊 O(1)），不随监控时长增长。
+# 规则写法（时间单位 s 或 min，省略时为秒；百分号可省略）：
+#   cpu > 90 for 30s          连续 30 秒高于 90%
+#   avg(cpu, 60s) > 80        最近 60 秒平均值高于 80%
+#   slope(memory, 60s) > 5    内存使用率的 EWMA 在最近 60 秒内每分钟上升超过 5 个百分点
+import math
+import operator
+import re
+import time
+from collections import deque, namedtuple
+
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+METRIC_LABELS = {'cpu': 'CPU使用率', 'memory': '内存使用率', 'disk': '磁盘使用率'}
+DEFAULT_RULES = ['cpu > 90 for 30s', 'slope(memory, 60s) > 5']
+# 告警历史只保留最近的记录
+HISTORY = 1000
+
+# state 为 firing（触发）或 resolved（恢复）
+Alert = namedtuple('Alert', ['time', 'rule', 'metric', 'value', 'state', 'message'])
+
+_NUMBER = r'(\d+(?:\.\d+)?)'
+_DURATION = _NUMBER + r'\s*(s|sec|m|min)?'
+_OP = r'(>=|<=|>|<)'
+THRESHOLD_PATTERN = re.compile(rf'^(\w+)\s*{_OP}\s*{_NUMBER}\s*%?(?:\s+for\s+{_DURATION})?$')
+AVERAGE_PATTERN = re.compile(rf'^avg\(\s*(\w+)\s*,\s*{_DURATION}\s*\)\s*{_OP}\s*{_NUMBER}\s*%?$')
+SLOPE_PATTERN = re.compile(rf'^slope\(\s*(\w+)\s*,\s*{_DURATION}\s*\)\s*{_OP}\s*{_NUMBER}\s*%?(?:\s*/\s*min)?$')
+
+
+def _seconds(value, unit):
+    return float(value) * (60 if unit in ('m', 'min') else 1)
+
+
+class ThresholdRule:
+    # 只记录当前这段越限开始的时间，越限持续满 duration 秒时触发，恢复正常后重新计时
+    def __init__(self, text, metric, op, threshold, duration=0):
+        self.text = text
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.duration = duration
+        self.since = None
+
+    def update(self, now, value):
+        # 返回 (是否满足告警条件, 用于显示的值)
+        if not OPERATORS[self.op](value, self.threshold):
+            self.since = None
+            return False, value
+        if self.since is None:
+            self.since = now
+        return now - self.since >= self.duration, value
+
+
+class AverageRule:
+    # 时间窗口内的样本和累计和，样本进出窗口时增减，不重新求和
+    def __init__(self, text, metric, window, op, threshold):
+        self.text = text
+        self.metric = metric
+        self.window = window
+        self.op = op
+        self.threshold = threshold
+        self.samples = deque()
+        self.total = 0.0
+        self.full = False
+
+    def update(self, now, value):
+        self.samples.append((now, value))
+        self.total += value
+        while now - self.samples[0][0] > self.window:
+            self.total -= self.samples.popleft()[1]
+            self.full = True
+        average = self.total / len(self.samples)
+        # 窗口填满之前不告警，避免刚开始监控时个别样本误报
+        return self.full and OPERATORS[self.op](average, self.threshold), average
+
+
+class SlopeRule:
+    # 先对指标做指数加权平滑（时间常数为窗口的四分之一），再用窗口两端的平滑值计算每分钟的变化量
+    def __init__(self, text, metric, window, op, threshold):
+        self.text = text
+        self.metric = metric
+        self.window = window
+        self.op = op
+        self.threshold = threshold
+        self.tau = window / 4
+        self.ewma = None
+        self.last_time = None
+        self.history = deque()
+        self.full = False
+
+    def update(self, now, value):
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            # 按实际采样间隔计算平滑系数，采样不均匀时结果不变形
+            alpha = 1 - math.exp(-(now - self.last_time) / self.tau)
+            self.ewma += alpha * (value - self.ewma)
+        self.last_time = now
+        self.history.append((now, self.ewma))
+        while now - self.history[0][0] > self.window:
+            self.history.popleft()
+            self.full = True
+        start_time, start_value = self.history[0]
+        if now <= start_time:
+            return False, 0.0
+        slope = (self.ewma - start_value) / (now - start_time) * 60
+        return self.full and OPERATORS[self.op](slope, self.threshold), slope
+
+
+def parse_rule(text):
+    text = text.strip()
+    match = THRESHOLD_PATTERN.match(text)
+    if match:
+        metric, op, threshold, duration, unit = match.groups()
+        return ThresholdRule(text, metric, op, float(threshold), _seconds(duration or 0, unit))
+    match = AVERAGE_PATTERN.match(text)
+    if match:
+        metric, window, unit, op, threshold = match.groups()
+        return AverageRule(text, metric, _seconds(window, unit), op, float(threshold))
+    match = SLOPE_PATTERN.match(text)
+    if match:
+        metric, window, unit, op, threshold = match.groups()
+        return SlopeRule(text, metric, _seconds(window, unit), op, float(threshold))
+    raise ValueError(f"无法解析告警规则: {text}")
+
+
+def parse_rules(texts):
+    # 接受规则列表，或以分号/换行分隔的字符串
+    if isinstance(texts, str):
+        texts = re.split(r'[;\n]', texts)
+    return [parse_rule(text) for text in texts if text.strip()]
+
+
+class AlertEngine:
+    def __init__(self, rules=None):
+        self.rules = parse_rules(DEFAULT_RULES if rules is None else rules)
+        self.active = {}
+        self.history = deque(maxlen=HISTORY)
+
+    def evaluate(self, sample):
+        # sample 为 {'time': ..., 指标名: 值}；返回本次状态发生变化（触发或恢复）的告警
+        now = sample.get('time', time.time())
+        events = []
+        for rule in self.rules:
+            value = sample.get(rule.metric)
+            if value is None:
+                continue
+            firing, shown = rule.update(now, value)
+            if firing == (rule.text in self.active):
+                continue
+            label = METRIC_LABELS.get(rule.metric, rule.metric)
+            if firing:
+                alert = Alert(now, rule.text, rule.metric, shown, 'firing', f"{label} 告警: {rule.text}（当前 {shown:.1f}）")
+                self.active[rule.text] = alert
+            else:
+                self.active.pop(rule.text)
+                alert = Alert(now, rule.text, rule.metric, shown, 'resolved', f"{label} 恢复: {rule.text}")
+            events.append(alert)
+            self.history.append(alert)
+        return events
+
+    def alerts(self):
+        return list(self.history)
@@ -0,0 +1,264 @@
+# 基准测试：在 100 / 1,000 / 10,000 个合成包的环境上计时各个采集和导出步骤，并记录峰值内存。
+# 结果写为 JSON，使用 --compare 可以与之前某次提交的结果对比，发现性能回退。
+# 全程离线运行，合成环境只在第一次运行时生成，之后复用。
+#
+#   python benchmarks/bench_collectors.py --sizes 100 1000 --output bench.json
+#   python benchmarks/bench_collectors.py --compare bench.json
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from importlib import metadata
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import exporters
+import piplist
+import snapshot_diff
+from dep_analytics import DependencyAnalytics
+from metadata_index import MetadataIndex
+from records import to_row
+from consistency_check import check_installed_requirements
+from synthetic_env import generate_site_packages, generate_requirements
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+
+def prepare_environment(workdir, size):
+    env_dir = os.path.join(workdir, f'env-{size}')
+    marker = os.path.join(env_dir, '.complete')
+    if not os.path.exists(marker):
+        shutil.rmtree(env_dir, ignore_errors=True)
+        print(f"正在生成 {size} 个包的合成环境...", flush=True)
+        generate_site_packages(env_dir, size)
+        generate_requirements(os.path.join(env_dir, 'requirements.txt'), size * 2, size)
+        open(marker, 'w').close()
+    return os.path.join(env_dir, 'site-packages'), os.path.join(env_dir, 'requirements.txt')
+
+
+def measure(func, repeat):
+    # 先计时（取最快一次），再单独在 tracemalloc 下跑一次记录 Python 堆峰值，避免追踪开销影响计时
+    timings = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {
+        'seconds': min(timings),
+        'mean_seconds': sum(timings) / len(timings),
+        'peak_bytes': peak,
+    }
+
+
+def run_size(workdir, size, repeat):
+    site_packages, requirements_file = prepare_environment(workdir, size)
+    results = {}
+
+    def distributions():
+        return list(metadata.distributions(path=[site_packages]))
+
+    package_list, results['get_installed_packages'] = measure(
+        lambda: piplist.get_installed_packages(site_packages), repeat)
+    requirements, results['get_requirements_packages'] = measure(
+        lambda: piplist.get_requirements_packages(requirements_file), repeat)
+    _, results['match_requirements'] = measure(
+        lambda: piplist.match_requirements(package_list, requirements), repeat)
+    _, results['read_distributions'] = measure(distributions, repeat)
+
+    # 元数据索引：冷启动为每次新建数据库并全量解析，热更新时所有 mtime 都没变，只比对目录
+    index_path = os.path.join(workdir, f'index-{size}.sqlite')
+
+    def index_cold():
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        index = MetadataIndex(index_path, [site_packages])
+        try:
+            return index.update()
+        finally:
+            index.close()
+
+    _, results['metadata_index_update_cold'] = measure(index_cold, repeat)
+    index = MetadataIndex(index_path, [site_packages])
+    _, results['metadata_index_update_warm'] = measure(index.update, repeat)
+    _, results['metadata_index_packages'] = measure(index.packages, repeat)
+    index.close()
+    dists = distributions()
+    analytics, results['dependency_analytics'] = measure(
+        lambda: DependencyAnalytics.from_environment(dists), repeat)
+    _, results['consistency_check'] = measure(
+        lambda: check_installed_requirements(dists), repeat)
+
+    # 每 10 个包升级一个版本，模拟“昨天 vs 今天”的快照对比
+    old_snapshot = snapshot_diff.snapshot_from_distributions(dists, 'old')
+    new_packages = {key: (name, f"{version}.post1" if index % 10 == 0 else version)
+                    for index, (key, (name, version)) in enumerate(old_snapshot['packages'].items())}
+    new_snapshot = dict(old_snapshot, label='new', packages=new_packages)
+    _, results['snapshot_diff'] = measure(
+        lambda: snapshot_diff.diff_snapshots(old_snapshot, new_snapshot, include_graph=True), repeat)
+
+    # 一次性序列化的旧写法只能处理普通列表，两种写法使用同样的数据
+    data = {
+        'packages': [to_row(record) for record in package_list],
+        'requirements': [to_row(record) for record in requirements],
+        'dependency_analytics': analytics.to_dict(),
+    }
+    export_dir = tempfile.mkdtemp(prefix='export-', dir=workdir)
+
+    def export_json():
+        with open(os.path.join(export_dir, 'export.json'), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def export_yaml():
+        with open(os.path.join(export_dir, 'export.yaml'), 'w', encoding='utf-8') as f:
+            yaml.dump(data, f, allow_unicode=True, sort_keys=False)
+
+    def export_excel():
+        # save_to_excel 写入当前目录，这里切换到临时目录执行
+        cwd = os.getcwd()
+        os.chdir(export_dir)
+        try:
+            piplist.save_to_excel(package_list=package_list, languages=[], frameworks=[],
+                                  requirements=[], selected_option='packages')
+        finally:
+            os.chdir(cwd)
+
+    def export_stream(fmt):
+        file_name, writer = exporters.EXPORTERS[fmt]
+        return lambda: writer(data, os.path.join(export_dir, file_name))
+
+    _, results['export_json'] = measure(export_json, repeat)
+    _, results['export_yaml'] = measure(export_yaml, repeat)
+    # 流式导出，与上面一次性序列化的写法对比
+    _, results['export_json_stream'] = measure(export_stream('json'), repeat)
+    _, results['export_yaml_stream'] = measure(export_stream('yaml'), repeat)
+    _, results['export_ndjson'] = measure(export_stream('ndjson'), repeat)
+    if exporters.msgpack is not None:
+        _, results['export_msgpack'] = measure(export_stream('msgpack'), repeat)
+    _, results['export_excel'] = measure(export_excel, repeat)
+    shutil.rmtree(export_dir, ignore_errors=True)
+
+    results['packages_found'] = len(package_list)
+    return results
+
+
+def run_probes(repeat):
+    results = {}
+    _, results['get_installed_languages'] = measure(piplist.get_installed_languages, repeat)
+    _, results['get_installed_front_end_frameworks'] = measure(piplist.get_installed_front_end_frameworks, repeat)
+    return results
+
+
+def measure_import(module, repeat):
+    # 在新进程中导入模块，记录耗时以及是否连带导入了 pandas
+    timings = []
+    loads_pandas = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', f"import sys, {module}; print('pandas' in sys.modules)"],
+                                cwd=REPO_ROOT, stdout=subprocess.PIPE, check=True)
+        timings.append(time.perf_counter() - start)
+        loads_pandas = result.stdout.decode('utf-8').strip() == 'True'
+    return {'seconds': min(timings), 'mean_seconds': sum(timings) / len(timings), 'peak_bytes': 0,
+            'loads_pandas': loads_pandas}
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return result.stdout.decode('utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def compare(baseline_path, current, threshold):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = 0
+    print(f"\n与 {baseline.get('revision')} ({baseline_path}) 对比:")
+    for size, cases in current['results'].items():
+        old_cases = baseline.get('results', {}).get(size, {})
+        for case, values in cases.items():
+            if not isinstance(values, dict) or not isinstance(old_cases.get(case), dict):
+                continue
+            old_seconds = old_cases[case]['seconds']
+            ratio = values['seconds'] / old_seconds if old_seconds else float('inf')
+            flag = ''
+            if ratio > threshold:
+                flag = '  <-- 回退'
+                regressions += 1
+            print(f"  [{size}] {case:<36} {old_seconds:>10.4f}s -> {values['seconds']:>10.4f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在合成环境上对各采集和导出步骤做基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='合成环境中的包数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每个步骤的重复次数')
+    parser.add_argument('--workdir', type=str, default=os.path.join(tempfile.gettempdir(), 'piplist-bench'),
+                        help='合成环境的生成目录（会被复用）')
+    parser.add_argument('--output', type=str, default='bench_results.json', help='结果 JSON 文件')
+    parser.add_argument('--probes', action='store_true', help='同时测试编程语言和前端框架探测（依赖主机环境）')
+    parser.add_argument('--compare', type=str, help='与之前的结果 JSON 对比')
+    parser.add_argument('--threshold', type=float, default=1.2, help='判定为回退的耗时倍数')
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': {},
+    }
+
+    for size in args.sizes:
+        print(f"测试 {size} 个包...", flush=True)
+        report['results'][str(size)] = run_size(args.workdir, size, args.repeat)
+        for case, values in report['results'][str(size)].items():
+            if isinstance(values, dict):
+                print(f"  {case:<36} {values['seconds']:>10.4f}s  峰值 {values['peak_bytes'] / 1024 / 1024:>8.2f} MiB")
+
+    report['results']['startup'] = {'import_piplist': measure_import('piplist', args.repeat)}
+
+    if args.probes:
+        report['results']['probes'] = run_probes(args.repeat)
+
+    # 子进程（pip list 等）的内存不在 tracemalloc 统计范围内，单独记录
+    report['max_child_rss_kib'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    report['max_self_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        if compare(args.compare, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
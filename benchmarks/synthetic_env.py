@@ -0,0 +1,117 @@
+# 生成用于基准测试的合成 site-packages 环境和大型 requirements 文件
+# 每个假包都带有真实格式的 METADATA / RECORD / top_level.txt，依赖只指向编号更小的包，
+# 另外按比例混入环境标记、extra 依赖、少量循环依赖和版本冲突，尽量贴近真实环境的分布。
+import base64
+import hashlib
+import os
+import random
+
+PACKAGE_TEMPLATE = '''# 自动生成的测试包 {name}
+VERSION = "{version}"
+
+
+def answer():
+    return {index}
+'''
+
+
+def package_name(index):
+    return f"synthetic-pkg-{index:05d}"
+
+
+def package_version(index):
+    return f"{index % 7}.{index % 13}.{index % 5}"
+
+
+def _record_line(relative_path, content):
+    digest = base64.urlsafe_b64encode(hashlib.sha256(content).digest()).rstrip(b'=').decode('ascii')
+    return f"{relative_path},sha256={digest},{len(content)}"
+
+
+def _requires_dist(index, rng):
+    lines = []
+    if index == 0:
+        return lines
+    for dep in rng.sample(range(index), min(index, rng.randint(0, 6))):
+        roll = rng.random()
+        dep_version = package_version(dep)
+        if roll < 0.02:
+            # 故意制造版本冲突
+            spec = f">{dep_version.split('.')[0]}.99"
+        elif roll < 0.4:
+            spec = f">={dep_version}"
+        elif roll < 0.6:
+            spec = f"=={dep_version}"
+        else:
+            spec = ''
+        line = f"{package_name(dep)}{spec}"
+        if roll > 0.9:
+            line += ' ; python_version >= "3.6"'
+        elif roll > 0.85:
+            line += ' ; extra == "test"'
+        lines.append(line)
+    if rng.random() < 0.01:
+        # 少量缺失依赖和指向编号更大的包（形成循环）的依赖
+        lines.append("synthetic-missing-dependency>=1.0")
+        lines.append(package_name(index + 1))
+    return lines
+
+
+def generate_site_packages(root, count, seed=0):
+    site_packages = os.path.join(root, 'site-packages')
+    os.makedirs(site_packages, exist_ok=True)
+    rng = random.Random(seed)
+
+    for index in range(count):
+        name = package_name(index)
+        version = package_version(index)
+        module = name.replace('-', '_')
+        dist_info = f"{module}-{version}.dist-info"
+        os.makedirs(os.path.join(site_packages, module), exist_ok=True)
+        os.makedirs(os.path.join(site_packages, dist_info), exist_ok=True)
+
+        requires = '\n'.join(f"Requires-Dist: {line}" for line in _requires_dist(index, rng))
+        files = {
+            f"{module}/__init__.py": PACKAGE_TEMPLATE.format(name=name, version=version, index=index).encode('utf-8'),
+            f"{module}/data.txt": (name * rng.randint(1, 64)).encode('utf-8'),
+            f"{dist_info}/METADATA": (
+                "Metadata-Version: 2.1\n"
+                f"Name: {name}\n"
+                f"Version: {version}\n"
+                f"Summary: Synthetic benchmark package number {index}\n"
+                "License: Apache-2.0\n"
+                "Requires-Python: >=3.6\n"
+                "Provides-Extra: test\n"
+                f"{requires}\n"
+                "\n"
+                f"Long description for {name}.\n"
+            ).encode('utf-8'),
+            f"{dist_info}/INSTALLER": b"pip\n",
+            f"{dist_info}/top_level.txt": f"{module}\n".encode('utf-8'),
+        }
+
+        record_lines = []
+        for relative_path, content in files.items():
+            with open(os.path.join(site_packages, relative_path), 'wb') as f:
+                f.write(content)
+            record_lines.append(_record_line(relative_path, content))
+        record_lines.append(f"{dist_info}/RECORD,,")
+        with open(os.path.join(site_packages, dist_info, 'RECORD'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(record_lines) + '\n')
+
+    return site_packages
+
+
+def generate_requirements(path, count, package_count, seed=0):
+    # 大部分条目与合成环境中的包匹配，其余为版本不匹配或未安装的包
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for line_number in range(count):
+            index = rng.randrange(package_count * 2)
+            if index >= package_count:
+                f.write(f"synthetic-absent-{index:05d}=={index % 3}.0.0\n")
+            elif line_number % 10 == 0:
+                f.write(f"{package_name(index)}==99.0.0\n")
+            else:
+                f.write(f"{package_name(index)}=={package_version(index)}\n")
+    return path
@@ -0,0 +1,350 @@
+# 数据采集层
+# 命令行和图形界面共用的采集函数，以及会话级缓存：每个数据源在一个会话内只采集一次，
+# 过期（TTL）或显式失效后才重新采集，所有导出和视图复用同一份内存快照。
+import json
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+
+import chardet
+
+import probes
+import tracing
+from dep_analytics import DependencyAnalytics, normalize_name
+from consistency_check import check_installed_requirements
+from conda_envs import collect_conda_envs
+from metadata_index import load_metadata_index
+from system_packages import load_system_index, native_links
+from records import package, RequirementPin, RequirementMatch
+
+VERSION_NOT_FOUND = probes.VERSION_NOT_FOUND
+
+
+def get_installed_packages(path=None):
+    # 使用 JSON 输出，可编辑安装多出的“位置”列不会再把列对错
+    command = ['pip', 'list', '--format=json']
+    if path:
+        command += ['--path', path]
+    result = tracing.run(command, stdout=subprocess.PIPE)
+    return [package(item['name'], item['version'], item.get('editable_project_location'))
+            for item in json.loads(result.stdout.decode('utf-8') or '[]')]
+
+
+def get_requirements_packages(file_path='requirements.txt'):
+    try:
+        with open(file_path, 'rb') as file:
+            raw_data = file.read()
+            with tracing.span('chardet.detect', 'parse', path=file_path, bytes=len(raw_data)):
+                encoding_result = chardet.detect(raw_data)
+            encoding = encoding_result['encoding']
+
+        with open(file_path, 'r', encoding=encoding) as file:
+            requirements = file.readlines()
+
+        requirements = [re.sub(r'\s+', ' ', line.strip()).split('==') for line in requirements if line.strip()]
+        return [RequirementPin(parts[0], parts[1] if len(parts) > 1 else None) for parts in requirements]
+    except FileNotFoundError:
+        print("requirements.txt 文件未找到。")
+        return []
+    except chardet.UniversalDetectorError:
+        print(f"无法检测 {file_path} 文件的编码。请手动指定编码。")
+        return []
+
+
+def get_language_version(command, pattern, stream='both'):
+    # 单个工具的版本探测，同样先在 PATH 中查找，找不到时不启动子进程
+    probe = {'pattern': re.compile(pattern), 'stream': stream}
+    return probes.match_version(probe, probes.run_command(command, probes.DEFAULT_TIMEOUT))
+
+
+def get_installed_languages():
+    # 探测项见 probes.json
+    return probes.run_probes('languages')
+
+
+def get_installed_front_end_frameworks():
+    return probes.run_probes('frameworks')
+
+
+def match_requirements(package_list, requirements):
+    installed_packages_dict = {record.name: record.version for record in package_list}
+    matched_requirements = []
+    for req in requirements:
+        req_version = req.version or '未指定版本'
+        installed_version = installed_packages_dict.get(req.name, '未安装')
+        matched_requirements.append(
+            RequirementMatch(req.name, req_version, installed_version, req_version == installed_version))
+    return matched_requirements
+
+
+class SessionCache:
+    def __init__(self, ttl=300):
+        # ttl 为 None 时只在显式失效后重新采集
+        self.ttl = ttl
+        self.generation = 0
+        self._loaders = {}
+        self._dependents = {}
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, depends_on=()):
+        # depends_on 中的数据源失效时，本数据源也随之失效
+        self._loaders[name] = (loader, tuple(depends_on))
+        self._locks[name] = threading.Lock()
+        for dependency in depends_on:
+            self._dependents.setdefault(dependency, []).append(name)
+
+    def _fresh(self, name):
+        # 返回未过期的缓存条目，过期或不存在时返回 None；只读一次字典，避免与失效操作竞争
+        entry = self._entries.get(name)
+        if entry is not None and (self.ttl is None or time.monotonic() - entry[0] < self.ttl):
+            return entry
+        return None
+
+    def get(self, name, refresh=False):
+        if refresh:
+            self.invalidate(name)
+        entry = self._fresh(name)
+        if entry is not None:
+            return entry[1]
+
+        # 每个数据源一把锁：并发请求同一数据源时只采集一次，其他线程等待结果
+        with self._locks[name]:
+            entry = self._fresh(name)
+            if entry is not None:
+                return entry[1]
+            loader, depends_on = self._loaders[name]
+            with tracing.span(name, 'collector'):
+                value = loader(*[self.get(dependency) for dependency in depends_on])
+            with self._lock:
+                self._entries[name] = (time.monotonic(), value)
+                self.generation += 1
+            return value
+
+    def refresh(self, name):
+        # 后台刷新：先采集新数据再整体替换，期间读取方仍然拿到旧快照，不会等待采集
+        loader, depends_on = self._loaders[name]
+        with self._locks[name]:
+            arguments = []
+            for dependency in depends_on:
+                entry = self._entries.get(dependency)
+                arguments.append(entry[1] if entry is not None else self.get(dependency))
+            with tracing.span(name, 'collector', background=True):
+                value = loader(*arguments)
+            with self._lock:
+                self._entries[name] = (time.monotonic(), value)
+                self.generation += 1
+        return value
+
+    def put(self, name, value):
+        # 直接写入新值（例如应用增量后的结果），依赖它的数据源随之失效
+        with self._lock:
+            self._entries[name] = (time.monotonic(), value)
+            self.generation += 1
+        for dependent in self._dependents.get(name, ()):
+            self.invalidate(dependent)
+
+    def refresh_all(self):
+        # 按注册顺序刷新，被依赖的数据源总是先于依赖它的数据源
+        for name in self._loaders:
+            self.refresh(name)
+
+    def names(self):
+        return list(self._loaders)
+
+    def with_dependencies(self, names):
+        # 给定数据源及其全部依赖，按注册顺序排列（被依赖的在前）
+        pending = list(names)
+        wanted = set()
+        while pending:
+            name = pending.pop()
+            if name not in wanted:
+                wanted.add(name)
+                pending.extend(self._loaders[name][1])
+        return [name for name in self._loaders if name in wanted]
+
+    def peek(self, name):
+        # 只读取已缓存的数据，不触发采集
+        entry = self._entries.get(name)
+        return entry[1] if entry else None
+
+    def invalidate(self, *names):
+        # 不传参数时清空全部缓存
+        with self._lock:
+            pending = list(names) if names else list(self._entries)
+            while pending:
+                name = pending.pop()
+                if self._entries.pop(name, None) is not None:
+                    self.generation += 1
+                pending.extend(self._dependents.get(name, ()))
+
+    def stamp(self, name):
+        # 数据源最近一次采集的时间戳，可作为缓存版本号
+        entry = self._entries.get(name)
+        return entry[0] if entry else None
+
+    def age(self, name):
+        entry = self._entries.get(name)
+        return time.monotonic() - entry[0] if entry else None
+
+    def snapshot(self, names):
+        return {name: self.get(name) for name in names}
+
+
+def create_session(requirements_file='requirements.txt', ttl=300):
+    session = SessionCache(ttl=ttl)
+    # 包列表、依赖分析和一致性检查都查询元数据索引，索引按 .dist-info 目录的 mtime 增量更新
+    session.register('metadata_index', load_metadata_index)
+    session.register('packages', lambda index: index.packages(), depends_on=['metadata_index'])
+    session.register('requirements', lambda: get_requirements_packages(requirements_file))
+    session.register('languages', get_installed_languages)
+    session.register('frameworks', get_installed_front_end_frameworks)
+    session.register('distributions', lambda: list(metadata.distributions()))
+    session.register('analytics', lambda index: DependencyAnalytics.from_environment(index.distributions()),
+                     depends_on=['metadata_index'])
+    session.register('consistency', lambda index: check_installed_requirements(index.distributions()),
+                     depends_on=['metadata_index'])
+    session.register('requirement_matches', match_requirements, depends_on=['packages', 'requirements'])
+    session.register('conda_envs', collect_conda_envs)
+    session.register('system_packages', load_system_index)
+    session.register('native_links', native_links, depends_on=['distributions', 'system_packages'])
+    return session
+
+
+# 进程内共享的默认会话
+session = create_session()
+
+
+def invalidate_installed():
+    # 安装或卸载包之后调用，语言和前端框架探测结果不受影响
+    session.invalidate('metadata_index', 'distributions')
+
+
+def apply_package_delta(delta):
+    # 把监视模式得到的增量直接应用到已缓存的包列表，不必重新运行 pip list
+    packages = session.peek('packages')
+    session.invalidate('metadata_index', 'distributions')
+    if packages is None:
+        return
+    changed = {normalize_name(row[0]) for key in ('added', 'removed', 'upgraded') for row in delta[key]}
+    updated = [record for record in packages if normalize_name(record.name) not in changed]
+    # 新增和升级的行末尾可能带有可编辑安装的位置
+    updated.extend(package(*row) for row in delta['added'])
+    updated.extend(package(row[0], row[2], *row[3:]) for row in delta['upgraded'])
+    updated.sort(key=lambda record: record.name.lower())
+    session.put('packages', updated)
+
+
+class ScanPipeline:
+    # 后台扫描流水线：各数据源并发采集，每个完成后立即通知监听者；
+    # 输出任务（写 Excel/JSON）在它需要的数据源全部就绪时马上开始，不等其他数据源。
+    def __init__(self, names, outputs=(), cache=None, max_workers=6):
+        # outputs: [(名称, 依赖的数据源列表, 函数)]，函数的参数依次为依赖的数据
+        self.outputs = list(outputs)
+        self.names = list(names)
+        for _, depends_on, _ in self.outputs:
+            self.names.extend(name for name in depends_on if name not in self.names)
+        self.cache = cache or session
+        self.max_workers = max_workers
+        self.results = {}
+        self.failed = set()
+        self.finished = threading.Event()
+        self.thread = None
+        self._listeners = []
+        self._scheduled = set()
+        self._remaining = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        # listener(stage, name, status, elapsed, value) 在工作线程中调用：
+        # stage 为 collect / output / scan，status 为 running / ok / cached / error / skipped
+        self._listeners.append(listener)
+
+    def _emit(self, *event):
+        for listener in self._listeners:
+            listener(*event)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        start = time.perf_counter()
+        self._remaining = len(self.names) + len(self.outputs)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scan')
+        for name in self.names:
+            self._pool.submit(self._collect, name)
+        self._schedule()
+        if self._remaining:
+            self.finished.wait()
+        self._pool.shutdown()
+        self.finished.set()
+        self._emit('scan', None, 'error' if self.failed else 'ok', time.perf_counter() - start, self.results)
+
+    def _done(self):
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self.finished.set()
+
+    def _collect(self, name):
+        self._emit('collect', name, 'running', 0, None)
+        start = time.perf_counter()
+        cached = self.cache._fresh(name) is not None
+        try:
+            value = self.cache.get(name)
+            status = 'cached' if cached else 'ok'
+        except Exception as e:
+            value, status = e, 'error'
+        with self._lock:
+            if status == 'error':
+                self.failed.add(name)
+            else:
+                self.results[name] = value
+        self._emit('collect', name, status, time.perf_counter() - start, value)
+        self._schedule()
+        self._done()
+
+    def _schedule(self):
+        # 依赖全部就绪的输出任务提交到线程池；依赖采集失败的任务跳过
+        ready, skipped = [], []
+        with self._lock:
+            for output in self.outputs:
+                name, depends_on, _ = output
+                if name in self._scheduled:
+                    continue
+                if any(dependency in self.failed for dependency in depends_on):
+                    skipped.append(name)
+                elif all(dependency in self.results for dependency in depends_on):
+                    ready.append(output)
+                else:
+                    continue
+                self._scheduled.add(name)
+        for output in ready:
+            self._pool.submit(self._output, *output)
+        for name in skipped:
+            self._emit('output', name, 'skipped', 0, None)
+            self._done()
+
+    def _output(self, name, depends_on, function):
+        self._emit('output', name, 'running', 0, None)
+        start = time.perf_counter()
+        try:
+            with tracing.span(name, 'export'):
+                value = function(*[self.results[dependency] for dependency in depends_on])
+            status = 'ok'
+        except Exception as e:
+            value, status = e, 'error'
+            with self._lock:
+                self.failed.add(name)
+        self._emit('output', name, status, time.perf_counter() - start, value)
+        self._done()
@@ -0,0 +1,190 @@
+# conda 环境清单
+# 直接读取每个 conda 环境的 conda-meta/*.json，不运行 conda list（每个环境要几秒）；
+# JSON 分批交给进程池解析，再与该环境 site-packages 中 pip 安装的包合并，标出来源（conda/pip）、频道和 build。
+# 结果按 conda-meta/history 和 site-packages 目录的 mtime 缓存：conda 安装/卸载会改写 history，
+# pip 安装/卸载会改变 site-packages 目录，两者都没变时直接使用缓存，几十个环境也只需几毫秒。
+#
+#   python conda_envs.py
+#   python conda_envs.py --env myenv --output results/conda.xlsx
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+from dep_analytics import normalize_name
+from interpreter_discovery import conda_prefixes
+from records import conda_package, to_row, write_excel
+
+DEFAULT_CACHE = os.path.join('results', 'conda_cache.json')
+BATCH_SIZE = 64
+SUBDIRS = ('noarch', 'linux-64', 'linux-aarch64', 'linux-ppc64le', 'osx-64', 'osx-arm64', 'win-64', 'win-32')
+
+
+def channel_name(channel, subdir=None):
+    # https://conda.anaconda.org/conda-forge/linux-64 -> conda-forge，https://repo.anaconda.com/pkgs/main/linux-64 -> pkgs/main
+    if not channel:
+        return ''
+    channel = channel.rstrip('/')
+    last = channel.rsplit('/', 1)[-1]
+    if last == subdir or last in SUBDIRS:
+        channel = channel[:-len(last) - 1]
+    for host in ('conda.anaconda.org/', 'repo.anaconda.com/'):
+        if host in channel:
+            return channel.split(host, 1)[1]
+    return channel
+
+
+def read_conda_record(path):
+    # conda-meta 中一个包的记录；文件中的 files / paths_data 列表很大，只取需要的字段
+    with open(path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    return (record['name'], record['version'], record.get('build', ''),
+            channel_name(record.get('channel') or record.get('schannel'), record.get('subdir')))
+
+
+def parse_batch(paths):
+    # 在子进程中执行，返回 [(路径, (名称, 版本, build, 频道) 或 None)]
+    results = []
+    for path in paths:
+        try:
+            results.append((path, read_conda_record(path)))
+        except (OSError, ValueError, KeyError):
+            results.append((path, None))
+    return results
+
+
+def site_packages_dirs(prefix):
+    return glob.glob(os.path.join(prefix, 'lib', 'python3*', 'site-packages')) + \
+        glob.glob(os.path.join(prefix, 'Lib', 'site-packages'))
+
+
+def env_stamp(prefix):
+    # 缓存键：conda-meta/history 与 site-packages 目录的 mtime
+    stamps = []
+    for path in [os.path.join(prefix, 'conda-meta', 'history')] + site_packages_dirs(prefix):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return stamps
+
+
+def pip_packages(prefix):
+    # {规范化包名: (显示名, 版本)}，读取 dist-info 元数据，不启动该环境的解释器
+    packages = {}
+    directories = site_packages_dirs(prefix)
+    if not directories:
+        return packages
+    for dist in metadata.distributions(path=directories):
+        name = dist.metadata['Name']
+        if name and normalize_name(name) not in packages:
+            packages[normalize_name(name)] = (name, dist.version)
+    return packages
+
+
+def merge_env(conda_records, pip_dists):
+    # conda 管理的包以 conda-meta 为准；site-packages 中其余的包视为 pip 安装
+    rows = [list(record) + ['conda'] for record in conda_records]
+    conda_names = {normalize_name(record[0]) for record in conda_records}
+    for key, (name, version) in pip_dists.items():
+        if key not in conda_names:
+            rows.append([name, version, '', 'pypi', 'pip'])
+    rows.sort(key=lambda row: row[0].lower())
+    return rows
+
+
+def load_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    if not cache_path:
+        return
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(temp_path, cache_path)
+
+
+def collect_conda_envs(prefixes=None, cache_path=DEFAULT_CACHE, workers=None, refresh=False):
+    # 返回 {环境目录: [CondaPackage]}；refresh 为 True 时忽略缓存全部重新读取
+    if prefixes is None:
+        prefixes = conda_prefixes()
+    cache = {} if refresh else load_cache(cache_path)
+    stamps = {prefix: env_stamp(prefix) for prefix in prefixes}
+    stale = [prefix for prefix in prefixes
+             if cache.get(prefix, {}).get('stamp') != stamps[prefix]]
+
+    # 所有需要重新读取的环境的 JSON 一起分批，环境很多或单个环境很大时都能用满进程池
+    paths = [path for prefix in stale for path in glob.glob(os.path.join(prefix, 'conda-meta', '*.json'))]
+    batches = [paths[i:i + BATCH_SIZE] for i in range(0, len(paths), BATCH_SIZE)]
+    parsed = {}
+    if len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(parse_batch, batches):
+                parsed.update(results)
+    elif batches:
+        parsed.update(parse_batch(batches[0]))
+
+    for prefix in stale:
+        meta_dir = os.path.join(prefix, 'conda-meta')
+        records = [parsed[path] for path in glob.glob(os.path.join(meta_dir, '*.json')) if parsed.get(path)]
+        cache[prefix] = {'stamp': stamps[prefix], 'packages': merge_env(records, pip_packages(prefix))}
+
+    # 已删除的环境不再保留
+    cache = {prefix: value for prefix, value in cache.items()
+             if prefix in stamps or os.path.isdir(os.path.join(prefix, 'conda-meta'))}
+    if stale:
+        save_cache(cache_path, cache)
+    return {prefix: [conda_package(*row) for row in cache[prefix]['packages']] for prefix in prefixes}
+
+
+def env_name(prefix):
+    # envs 目录下的环境用目录名，其余（base 环境）用完整路径
+    parent = os.path.basename(os.path.dirname(os.path.normpath(prefix)))
+    return os.path.basename(os.path.normpath(prefix)) if parent == 'envs' else prefix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='读取 conda-meta 列出所有 conda 环境中的包')
+    parser.add_argument('--env', type=str, action='append', help='只列出指定环境（名称或目录），可重复')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存重新读取')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='解析进程数')
+    parser.add_argument('--output', type=str, help='保存为 .json 或 .xlsx')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    prefixes = conda_prefixes()
+    if args.env:
+        prefixes = [prefix for prefix in prefixes if env_name(prefix) in args.env or prefix in args.env]
+    envs = collect_conda_envs(prefixes, workers=args.workers, refresh=args.refresh)
+    elapsed = time.perf_counter() - start
+
+    for prefix, packages in envs.items():
+        from_pip = sum(1 for package in packages if package.source == 'pip')
+        print(f"{env_name(prefix)}: {len(packages)} 个包（conda {len(packages) - from_pip}，pip {from_pip}）")
+    print(f"共 {len(envs)} 个 conda 环境，耗时 {1000 * elapsed:.1f}ms")
+
+    if args.output:
+        rows = [[env_name(prefix)] + to_row(package) for prefix, packages in envs.items() for package in packages]
+        if args.output.endswith('.xlsx'):
+            write_excel(args.output, rows, ['环境', '包名', '版本号', 'build', '频道', '来源'])
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({prefix: [to_row(package) for package in packages] for prefix, packages in envs.items()},
+                          f, ensure_ascii=False, indent=2)
+        print(f"已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
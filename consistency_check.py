@@ -0,0 +1,119 @@
+# 已安装依赖一致性检查
+# 与 pip check 的判断一致：逐个检查已安装包声明的 Requires-Dist（含环境标记），
+# 报告缺失的依赖和版本不满足要求的依赖。全部在进程内完成，不启动 pip 子进程。
+# 检查其他解释器的环境时传入它的环境标记变量（environment），标记按目标解释器求值，而不是当前进程。
+from functools import lru_cache
+from importlib import metadata
+
+from packaging.requirements import Requirement, InvalidRequirement
+from packaging.version import Version, InvalidVersion
+
+from dep_analytics import normalize_name
+from records import DependencyProblem, RequirementMatch
+
+MISSING = '缺失'
+CONFLICT = '版本冲突'
+
+
+def _environment_key(environment):
+    # 环境标记变量字典转换为可作为缓存键的元组；None 表示当前解释器
+    return tuple(sorted(environment.items())) if environment else None
+
+
+@lru_cache(maxsize=None)
+def _parse_requirement(line, environment=None):
+    # 同一条依赖声明在大量包中重复出现，解析和标记求值结果按 (依赖声明, 目标环境) 复用
+    try:
+        req = Requirement(line)
+    except InvalidRequirement:
+        return None
+    if req.marker and not req.marker.evaluate(dict(environment or (), extra='')):
+        return None
+    return normalize_name(req.name), req.name, req.specifier
+
+
+@lru_cache(maxsize=None)
+def _parse_version(version):
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return None
+
+
+def build_version_index(distributions=None):
+    # {规范化包名: (显示名, 版本字符串, 依赖声明列表)}
+    if distributions is None:
+        distributions = metadata.distributions()
+
+    index = {}
+    for dist in distributions:
+        name = dist.metadata['Name']
+        if not name:
+            continue
+        key = normalize_name(name)
+        if key not in index:
+            index[key] = (name, dist.version, dist.requires or [])
+    return index
+
+
+def check_installed_requirements(distributions=None, environment=None):
+    # 返回 DependencyProblem 列表: (包名, 版本, 依赖, 要求, 已安装版本, 问题类型)
+    index = build_version_index(distributions)
+    environment = _environment_key(environment)
+    problems = []
+    for name, version, requirement_lines in index.values():
+        for line in requirement_lines:
+            parsed = _parse_requirement(line, environment)
+            if parsed is None:
+                continue
+            dep_key, dep_name, specifier = parsed
+            installed = index.get(dep_key)
+            if installed is None:
+                problems.append(DependencyProblem(name, version, dep_name, str(specifier), '未安装', MISSING))
+                continue
+            if not specifier:
+                continue
+            installed_version = _parse_version(installed[1])
+            if installed_version is None or not specifier.contains(installed_version, prereleases=True):
+                problems.append(DependencyProblem(name, version, installed[0], str(specifier), installed[1], CONFLICT))
+
+    problems.sort(key=lambda row: (row.package.lower(), row.dependency.lower()))
+    return problems
+
+
+def match_requirement_pins(packages, pins, environment=None):
+    # 按规范化包名和版本约束比对 requirements：未固定版本的依赖只要已安装就算满足；
+    # 注释、-r/-e 等选项行、无法解析和目标环境标记不适用的行都跳过
+    installed = {normalize_name(record.name): record.version for record in packages}
+    environment = _environment_key(environment)
+    matches = []
+    for pin in pins:
+        line = pin.name.split('#')[0].strip() + (f"=={pin.version.split('#')[0].strip()}" if pin.version else '')
+        if not line or line.startswith('-'):
+            continue
+        parsed = _parse_requirement(line, environment)
+        if parsed is None:
+            continue
+        key, name, specifier = parsed
+        version = installed.get(key)
+        if version is None:
+            matches.append(RequirementMatch(name, str(specifier) or '未指定版本', '未安装', False))
+            continue
+        parsed_version = _parse_version(version)
+        matched = not specifier or (parsed_version is not None and specifier.contains(parsed_version, prereleases=True))
+        matches.append(RequirementMatch(name, str(specifier) or '未指定版本', version, matched))
+    return matches
+
+
+def format_problem(row):
+    name, version, dep_name, specifier, installed_version, kind = row
+    if kind == MISSING:
+        return f"{name} {version} requires {dep_name}, which is not installed."
+    return f"{name} {version} has requirement {dep_name}{specifier}, but you have {dep_name} {installed_version}."
+
+
+def problems_to_dict(problems):
+    return {
+        'missing': [format_problem(row) for row in problems if row.kind == MISSING],
+        'conflicts': [format_problem(row) for row in problems if row.kind == CONFLICT],
+    }
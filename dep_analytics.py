@@ -0,0 +1,195 @@
+# 依赖关系分析
+# 基于已安装包的元数据构建依赖图，每个快照只预计算一次反向依赖、传递闭包和强连通分量索引，
+# 之后的“谁引入了X”“移除Y后可以一起删除哪些包”“孤立包”“循环依赖”等查询都只是查表。
+import re
+from importlib import metadata
+
+from packaging.requirements import Requirement, InvalidRequirement
+
+
+def normalize_name(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def read_dependency_edges(distributions=None):
+    # 返回 ({规范化包名: 显示名}, {规范化包名: 依赖集合})，只保留当前环境下生效且已安装的依赖
+    if distributions is None:
+        distributions = metadata.distributions()
+
+    display_names = {}
+    requires = {}
+    for dist in distributions:
+        name = dist.metadata['Name']
+        if not name:
+            continue
+        key = normalize_name(name)
+        if key in display_names:
+            continue
+        display_names[key] = name
+        requires[key] = dist.requires or []
+
+    edges = {}
+    for key, requirement_lines in requires.items():
+        deps = set()
+        for line in requirement_lines:
+            try:
+                req = Requirement(line)
+            except InvalidRequirement:
+                continue
+            # extra 依赖只有在显式安装 extra 时才需要，这里不计入
+            if req.marker and not req.marker.evaluate({'extra': ''}):
+                continue
+            dep = normalize_name(req.name)
+            if dep in display_names and dep != key:
+                deps.add(dep)
+        edges[key] = deps
+    return display_names, edges
+
+
+class DependencyAnalytics:
+    def __init__(self, display_names, edges):
+        self.display_names = display_names
+        self.forward = {name: frozenset(edges.get(name, ())) for name in display_names}
+
+        reverse = {name: set() for name in display_names}
+        for name, deps in self.forward.items():
+            for dep in deps:
+                reverse[dep].add(name)
+        self.reverse = {name: frozenset(parents) for name, parents in reverse.items()}
+
+        self.components = self._strongly_connected_components()
+        self.component_of = {}
+        for index, component in enumerate(self.components):
+            for name in component:
+                self.component_of[name] = index
+
+        self.descendants = self._closure(self.forward)
+        self.ancestors = self._closure(self.reverse)
+        self.orphans = frozenset(name for name, parents in self.reverse.items() if not parents)
+        self.leaves = frozenset(name for name, deps in self.forward.items() if not deps)
+        self.cycles = [component for component in self.components
+                       if len(component) > 1]
+        self._removable_cache = {}
+
+    @classmethod
+    def from_environment(cls, distributions=None):
+        display_names, edges = read_dependency_edges(distributions)
+        return cls(display_names, edges)
+
+    def _strongly_connected_components(self):
+        # 迭代版 Tarjan 算法，避免大环境下递归过深；输出顺序为逆拓扑序（被依赖者在前）
+        index_of = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        components = []
+        counter = 0
+
+        for root in self.forward:
+            if root in index_of:
+                continue
+            work = [(root, iter(self.forward[root]))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index_of:
+                        index_of[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.forward[child])))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(frozenset(component))
+        return components
+
+    def _closure(self, adjacency):
+        # 在强连通分量缩点后的有向无环图上按拓扑序合并集合，同一分量内的节点共享同一个闭包
+        order = self.components if adjacency is self.forward else list(reversed(self.components))
+        component_closure = {}
+        for component in order:
+            reached = set()
+            for name in component:
+                for neighbour in adjacency[name]:
+                    reached.add(neighbour)
+                    neighbour_component = self.component_of[neighbour]
+                    if neighbour_component != self.component_of[name]:
+                        reached |= component_closure[neighbour_component]
+            if len(component) > 1:
+                reached |= component
+            component_closure[self.component_of[next(iter(component))]] = frozenset(reached)
+
+        closure = {}
+        for name in self.forward:
+            reached = component_closure[self.component_of[name]]
+            closure[name] = reached - {name} if name in reached else reached
+        return closure
+
+    def _key(self, name):
+        key = normalize_name(name)
+        if key not in self.forward:
+            raise KeyError(f"未安装的包: {name}")
+        return key
+
+    def _display(self, keys):
+        return sorted((self.display_names[key] for key in keys), key=str.lower)
+
+    def dependents(self, name):
+        return self._display(self.reverse[self._key(name)])
+
+    def dependencies(self, name):
+        return self._display(self.forward[self._key(name)])
+
+    def pulled_in_by(self, name):
+        return self._display(self.ancestors[self._key(name)])
+
+    def requires_all(self, name):
+        return self._display(self.descendants[self._key(name)])
+
+    def removable_with(self, name):
+        # 移除某个包后可一并删除的依赖：它们的所有上游都在“该包及其依赖”范围之内
+        key = self._key(name)
+        if key not in self._removable_cache:
+            scope = self.descendants[key] | {key}
+            removable = [dep for dep in self.descendants[key]
+                         if self.ancestors[dep] <= scope]
+            self._removable_cache[key] = self._display(removable)
+        return self._removable_cache[key]
+
+    def is_installed(self, name):
+        return normalize_name(name) in self.forward
+
+    def to_dict(self):
+        return {
+            'orphans': self._display(self.orphans),
+            'leaves': self._display(self.leaves),
+            # 只导出包含多个节点的强连通分量（即循环依赖），单节点分量没有信息量
+            'strongly_connected_components': [self._display(component)
+                                              for component in self.cycles],
+            # 直接依赖，供快照对比时计算依赖图的变化
+            'dependencies': {self.display_names[name]: self._display(deps)
+                             for name, deps in sorted(self.forward.items()) if deps},
+        }
@@ -0,0 +1,238 @@
+# 流式导出
+# 导出数据逐条写入文件，不再先在内存中拼出完整的文档：
+#   - JSON：结构与原来相同（export.json 仍可被快照对比、多主机聚合读取），列表中的每个元素单独序列化后写出
+#   - NDJSON：每行一条记录（包、编程语言、前端框架、依赖边、依赖问题），便于 jq / 日志系统逐行处理
+#   - YAML：逐个元素交给 PyYAML 序列化，有 libyaml 时使用 C 实现的 CSafeDumper
+#   - msgpack（可选）：与 NDJSON 相同的记录流，二进制格式，供程序读取
+# 顶层是普通字典；其中的列表可以是生成器，字典可以用 MappingStream 包装的 (键, 值) 生成器代替，
+# 写出时只在内存中保留当前这一条。
+import io
+import json
+
+import yaml
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from records import to_dict, to_row
+
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+BUFFER_SIZE = 1024 * 1024
+YAML_CHUNK = 500
+
+# NDJSON 中各个列表对应的记录类型和字段名，与 records 中的字段一致（包的第三列为可编辑安装位置）
+RECORD_FIELDS = {
+    'packages': ('package', ['name', 'version', 'location']),
+    'languages': ('language', ['name', 'version']),
+    'frameworks': ('framework', ['name', 'version']),
+}
+
+
+class _ExportDumper(YAML_DUMPER):
+    pass
+
+
+# 记录类型（namedtuple）按列表写出
+_ExportDumper.add_multi_representer(
+    tuple, lambda dumper, data: dumper.represent_list(to_row(data) if hasattr(data, '_fields') else list(data)))
+
+
+class MappingStream:
+    # 把 (键, 值) 生成器当作字典写出
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def items(self):
+        return self.pairs
+
+
+def _is_mapping(value):
+    return isinstance(value, (dict, MappingStream))
+
+
+def _is_sequence(value):
+    return not isinstance(value, (str, bytes, dict, MappingStream)) and hasattr(value, '__iter__')
+
+
+# 复用同一个编码器；json.dumps 每次传入非默认参数都会新建一个编码器
+_dump_json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def write_json(data, path):
+    with open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+        _write_json_value(f, data, 0)
+        f.write('\n')
+
+
+def _write_json_value(f, value, depth):
+    # 字典逐层展开；列表每个元素写成紧凑的一行
+    if _is_mapping(value):
+        items, opening, closing = value.items(), '{', '}'
+    elif _is_sequence(value):
+        items, opening, closing = value, '[', ']'
+    else:
+        f.write(_dump_json(value))
+        return
+
+    indent = '\n' + '  ' * (depth + 1)
+    f.write(opening)
+    empty = True
+    for item in items:
+        f.write(indent if empty else ',' + indent)
+        empty = False
+        if opening == '{':
+            key, item = item
+            f.write(f'{_dump_json(key)}: ')
+            _write_json_value(f, item, depth + 1)
+        else:
+            f.write(_dump_json(to_row(item) if hasattr(item, '_fields') else item))
+    f.write(closing if empty else '\n' + '  ' * depth + closing)
+
+
+def iter_records(data):
+    # 把导出数据展开为扁平记录 {'type': ..., 字段...}；主机名、导出时间等标量字段合并为第一条 meta 记录
+    meta = {key: value for key, value in data.items() if not (_is_mapping(value) or _is_sequence(value))}
+    if meta:
+        yield dict(meta, type='meta')
+    for key, value in data.items():
+        if key in meta:
+            continue
+        if key in RECORD_FIELDS:
+            record_type, fields = RECORD_FIELDS[key]
+            for row in value:
+                record = {'type': record_type}
+                # 普通列表行与记录一样省略为空的可选字段
+                record.update(to_dict(row) if hasattr(row, '_fields')
+                              else ((field, value) for field, value in zip(fields, row) if value is not None))
+                yield record
+        elif key == 'dependency_analytics':
+            for name, section in value.items():
+                if name == 'dependencies':
+                    for package, requires in section.items():
+                        for dep in requires:
+                            yield {'type': 'dependency', 'package': package, 'requires': dep}
+                else:
+                    for item in section:
+                        yield {'type': name, 'value': item}
+        elif _is_mapping(value):
+            # 例如 consistency: {missing: [...], conflicts: [...]}
+            for name, rows in value.items():
+                for row in rows:
+                    yield dict(row, type=name) if isinstance(row, dict) else {'type': name, 'value': row}
+        else:
+            for item in value:
+                if hasattr(item, '_fields'):
+                    yield dict(to_dict(item), type=key)
+                elif isinstance(item, dict):
+                    yield dict(item, type=key)
+                else:
+                    yield {'type': key, 'value': item}
+
+
+def write_ndjson(data, path):
+    with open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+        for record in iter_records(data):
+            f.write(_dump_json(record))
+            f.write('\n')
+
+
+def write_msgpack(data, path):
+    if msgpack is None:
+        raise ImportError("二进制导出需要安装 msgpack: pip install msgpack")
+    packer = msgpack.Packer(use_bin_type=True)
+    with open(path, 'wb', buffering=BUFFER_SIZE) as f:
+        for record in iter_records(data):
+            f.write(packer.pack(record))
+
+
+def read_msgpack(path):
+    if msgpack is None:
+        raise ImportError("读取二进制导出需要安装 msgpack: pip install msgpack")
+    with open(path, 'rb') as f:
+        yield from msgpack.Unpacker(f, raw=False)
+
+
+def _dump_yaml(value, depth):
+    # 最外层固定为块格式，内部只含标量的列表/字典写成行内格式；嵌套层级通过给每行加缩进实现
+    stream = io.StringIO()
+    dumper = _ExportDumper(stream, allow_unicode=True, sort_keys=False, default_flow_style=None, width=1 << 30)
+    # 每块各自序列化，锚点名会在块之间重复，因此不使用锚点/别名
+    dumper.ignore_aliases = lambda data: True
+    dumper.open()
+    node = dumper.represent_data(value)
+    node.flow_style = False
+    dumper.serialize(node)
+    dumper.close()
+    text = stream.getvalue()
+    if depth:
+        indent = '  ' * depth
+        text = ''.join(indent + line for line in text.splitlines(True))
+    return text
+
+
+def _is_large(value):
+    # 需要逐块流式写出的值：生成器，或元素较多的列表/字典
+    if isinstance(value, MappingStream):
+        return True
+    if isinstance(value, dict):
+        return len(value) > YAML_CHUNK or any(_is_large(item) for item in value.values())
+    if _is_sequence(value):
+        return not isinstance(value, (list, tuple)) or len(value) > YAML_CHUNK
+    return False
+
+
+def write_yaml(data, path):
+    with open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+        _write_yaml_mapping(f, data.items(), 0)
+
+
+def _write_yaml_mapping(f, pairs, depth):
+    # 小的键值对攒够一批再一起交给 PyYAML，大的值单独展开
+    pending = {}
+    for key, value in pairs:
+        if not _is_large(value):
+            pending[key] = value
+            if len(pending) >= YAML_CHUNK:
+                f.write(_dump_yaml(pending, depth))
+                pending = {}
+            continue
+        if pending:
+            f.write(_dump_yaml(pending, depth))
+            pending = {}
+
+        key_text = _dump_yaml([key], 0)[2:].rstrip('\n')
+        items = iter(value.items() if _is_mapping(value) else value)
+        first = next(items, None)
+        if first is None:
+            f.write(f"{'  ' * depth}{key_text}: {'{}' if _is_mapping(value) else '[]'}\n")
+            continue
+        f.write(f"{'  ' * depth}{key_text}:\n")
+        if _is_mapping(value):
+            _write_yaml_mapping(f, _chain(first, items), depth + 1)
+        else:
+            chunk = [first]
+            for item in items:
+                chunk.append(item)
+                if len(chunk) >= YAML_CHUNK:
+                    f.write(_dump_yaml(chunk, depth))
+                    chunk = []
+            if chunk:
+                f.write(_dump_yaml(chunk, depth))
+    if pending:
+        f.write(_dump_yaml(pending, depth))
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+# 格式名: (默认文件名, 写出函数)
+EXPORTERS = {
+    'json': ('export.json', write_json),
+    'ndjson': ('export.ndjson', write_ndjson),
+    'yaml': ('export.yaml', write_yaml),
+    'msgpack': ('export.msgpack', write_msgpack),
+}
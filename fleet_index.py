@@ -0,0 +1,293 @@
+# 多主机快照聚合
+# 并行读取一个目录下各主机导出的 export.json，构建紧凑的列式索引（主机 × 包 × 版本），
+# 字符串全部做字典编码，行按包排序，查询某个包只需访问一段连续区间；
+# 版本范围只对该包的不同版本各求值一次。同一主机有多份快照（如按日期分目录保存）时只索引最新的一份。
+#
+#   python fleet_index.py build snapshots/ -o fleet.idx
+#   python fleet_index.py query fleet.idx urllib3 "<2"
+#   python fleet_index.py versions fleet.idx numpy
+#   python fleet_index.py presence fleet.idx numpy
+#   python fleet_index.py drift fleet.idx --top 20
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from packaging.specifiers import SpecifierSet, InvalidSpecifier
+from packaging.version import Version, InvalidVersion
+
+from dep_analytics import normalize_name
+
+MAGIC = b'PLFI'
+FORMAT_VERSION = 1
+
+
+def host_name_for(path, data):
+    # 优先使用快照中记录的主机名，否则 hosts/<主机>/export.json 取目录名，其余取文件名
+    host = data.get('host') if isinstance(data, dict) else None
+    if host:
+        return host
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem == 'export':
+        return os.path.basename(os.path.dirname(path))
+    return stem
+
+
+def snapshot_time(path, data):
+    # 快照的新旧：优先使用导出时记录的 exported_at，没有或无法解析时使用文件的 mtime
+    try:
+        return datetime.fromisoformat(data['exported_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return os.path.getmtime(path)
+
+
+def read_snapshot(path):
+    # 返回 (主机名, [(规范化包名, 版本)], 快照时间)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # 同一目录下常有 trace.json、对比报告等其他 JSON，只接受带 packages 列表的快照
+    if not isinstance(data, dict) or not isinstance(data.get('packages'), list):
+        raise ValueError('不是清单快照（缺少 packages 列表）')
+    packages = []
+    for row in data['packages']:
+        if isinstance(row, list) and len(row) >= 2:
+            packages.append((normalize_name(row[0]), row[1]))
+    return host_name_for(path, data), packages, snapshot_time(path, data)
+
+
+def find_snapshots(directory):
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith('.json'):
+                yield os.path.join(root, file)
+
+
+class FleetIndex:
+    def __init__(self, hosts, packages, versions, host_ids, version_ids, offsets):
+        self.hosts = hosts
+        self.packages = packages
+        self.versions = versions
+        self.host_ids = host_ids
+        self.version_ids = version_ids
+        self.offsets = offsets
+        self.package_ids = {name: index for index, name in enumerate(packages)}
+        self._parsed_versions = {}
+
+    @classmethod
+    def build(cls, snapshots):
+        # snapshots: 可迭代的 (主机名, [(规范化包名, 版本)])，每台主机只能出现一次
+        hosts = []
+        versions = []
+        version_ids = {}
+        rows_by_package = {}
+        for host, packages in snapshots:
+            if host in hosts:
+                raise ValueError(f"主机 {host} 出现了多份快照")
+            host_id = len(hosts)
+            hosts.append(host)
+            for name, version in packages:
+                version_id = version_ids.get(version)
+                if version_id is None:
+                    version_id = version_ids[version] = len(versions)
+                    versions.append(version)
+                rows_by_package.setdefault(name, []).append((host_id, version_id))
+
+        package_names = sorted(rows_by_package)
+        host_column = array('I')
+        version_column = array('I')
+        offsets = array('I', [0])
+        for name in package_names:
+            for host_id, version_id in rows_by_package[name]:
+                host_column.append(host_id)
+                version_column.append(version_id)
+            offsets.append(len(host_column))
+        return cls(hosts, package_names, versions, host_column, version_column, offsets)
+
+    def save(self, path):
+        header = json.dumps({
+            'format': FORMAT_VERSION,
+            'hosts': self.hosts,
+            'packages': self.packages,
+            'versions': self.versions,
+            'rows': len(self.host_ids),
+        }, ensure_ascii=False).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for column in (self.offsets, self.host_ids, self.version_ids):
+                f.write(column.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path} 不是有效的索引文件")
+            header_length = struct.unpack('<I', f.read(4))[0]
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            if header['format'] != FORMAT_VERSION:
+                raise ValueError(f"不支持的索引格式版本: {header['format']}")
+            columns = []
+            for length in (len(header['packages']) + 1, header['rows'], header['rows']):
+                column = array('I')
+                column.frombytes(f.read(length * column.itemsize))
+                columns.append(column)
+        offsets, host_ids, version_ids = columns
+        return cls(header['hosts'], header['packages'], header['versions'], host_ids, version_ids, offsets)
+
+    def _rows(self, package):
+        package_id = self.package_ids.get(normalize_name(package))
+        if package_id is None:
+            return range(0)
+        return range(self.offsets[package_id], self.offsets[package_id + 1])
+
+    def _parse_version(self, version_id):
+        if version_id not in self._parsed_versions:
+            try:
+                self._parsed_versions[version_id] = Version(self.versions[version_id])
+            except InvalidVersion:
+                self._parsed_versions[version_id] = None
+        return self._parsed_versions[version_id]
+
+    def version_counts(self, package):
+        # {版本: 主机数}
+        counts = {}
+        for row in self._rows(package):
+            version_id = self.version_ids[row]
+            counts[version_id] = counts.get(version_id, 0) + 1
+        return {self.versions[version_id]: count for version_id, count in counts.items()}
+
+    def hosts_matching(self, package, specifier):
+        # 返回 [(主机, 版本)]，版本范围只对该包的每个不同版本求值一次
+        specifier = SpecifierSet(specifier)
+        matching_versions = {}
+        result = []
+        for row in self._rows(package):
+            version_id = self.version_ids[row]
+            matched = matching_versions.get(version_id)
+            if matched is None:
+                parsed = self._parse_version(version_id)
+                matched = matching_versions[version_id] = (
+                    parsed is not None and specifier.contains(parsed, prereleases=True))
+            if matched:
+                result.append((self.hosts[self.host_ids[row]], self.versions[version_id]))
+        return sorted(result)
+
+    def presence(self, package):
+        present = {self.host_ids[row] for row in self._rows(package)}
+        hosts_with = sorted(self.hosts[host_id] for host_id in present)
+        hosts_without = sorted(host for host_id, host in enumerate(self.hosts) if host_id not in present)
+        return hosts_with, hosts_without
+
+    def drift(self, top=20):
+        # 部署版本最分散的包：[(包名, 不同版本数, 主机数)]
+        result = []
+        for package_id, name in enumerate(self.packages):
+            start, end = self.offsets[package_id], self.offsets[package_id + 1]
+            distinct = len(set(self.version_ids[start:end]))
+            if distinct > 1:
+                result.append((name, distinct, end - start))
+        result.sort(key=lambda item: (-item[1], -item[2], item[0]))
+        return result[:top]
+
+
+def build_index(directory, workers=None):
+    paths = sorted(find_snapshots(directory))
+    # {主机名: (快照时间, 路径, 包列表)}，同一主机只保留最新的快照
+    latest = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, outcome in zip(paths, executor.map(_read_snapshot_safe, paths, chunksize=16)):
+            if isinstance(outcome, str):
+                print(f"跳过 {path}: {outcome}", file=sys.stderr)
+                continue
+            host, packages, stamp = outcome
+            previous = latest.get(host)
+            if previous is not None:
+                older, newer = sorted([previous[:2], (stamp, path)])
+                print(f"跳过 {older[1]}: 主机 {host} 已有更新的快照 {newer[1]}", file=sys.stderr)
+                if previous[0] >= stamp:
+                    continue
+            latest[host] = (stamp, path, packages)
+    return FleetIndex.build((host, packages) for host, (_, _, packages) in latest.items())
+
+
+def _read_snapshot_safe(path):
+    try:
+        return read_snapshot(path)
+    except (OSError, ValueError, AttributeError, TypeError, KeyError) as e:
+        return str(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='聚合多台主机导出的快照并查询包版本分布')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='从快照目录构建索引')
+    build_parser.add_argument('directory', help='包含各主机 export.json 的目录')
+    build_parser.add_argument('-o', '--output', default='fleet.idx', help='索引文件路径')
+    build_parser.add_argument('-j', '--workers', type=int, default=None, help='并行进程数')
+
+    query_parser = subparsers.add_parser('query', help='查询某个包版本满足范围的主机')
+    query_parser.add_argument('index')
+    query_parser.add_argument('package')
+    query_parser.add_argument('specifier', help='版本范围，例如 "<2" 或 ">=1.20,<2"')
+
+    versions_parser = subparsers.add_parser('versions', help='统计某个包部署的各版本及主机数')
+    versions_parser.add_argument('index')
+    versions_parser.add_argument('package')
+
+    presence_parser = subparsers.add_parser('presence', help='列出安装/未安装某个包的主机')
+    presence_parser.add_argument('index')
+    presence_parser.add_argument('package')
+
+    drift_parser = subparsers.add_parser('drift', help='列出版本最分散的包')
+    drift_parser.add_argument('index')
+    drift_parser.add_argument('--top', type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        index = build_index(args.directory, args.workers)
+        index.save(args.output)
+        print(f"已索引 {len(index.hosts)} 台主机、{len(index.packages)} 个包、{len(index.host_ids)} 条记录，"
+              f"耗时 {time.perf_counter() - start:.2f}s，保存到 {args.output}")
+        return
+
+    start = time.perf_counter()
+    index = FleetIndex.load(args.index)
+    loaded = time.perf_counter()
+
+    if args.command == 'query':
+        try:
+            matches = index.hosts_matching(args.package, args.specifier)
+        except InvalidSpecifier:
+            print(f"无效的版本范围: {args.specifier}")
+            sys.exit(2)
+        for host, version in matches:
+            print(f"{host}\t{version}")
+        print(f"共 {len(matches)} 台主机的 {args.package} 满足 {args.specifier}")
+    elif args.command == 'versions':
+        counts = index.version_counts(args.package)
+        for version, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"{version}\t{count}")
+        print(f"{args.package} 共部署了 {len(counts)} 个不同版本")
+    elif args.command == 'presence':
+        hosts_with, hosts_without = index.presence(args.package)
+        print(f"已安装 ({len(hosts_with)}): {', '.join(hosts_with)}")
+        print(f"未安装 ({len(hosts_without)}): {', '.join(hosts_without)}")
+    elif args.command == 'drift':
+        for name, distinct, host_count in index.drift(args.top):
+            print(f"{name}\t{distinct} 个版本\t{host_count} 台主机")
+
+    print(f"加载 {1000 * (loaded - start):.1f}ms，查询 {1000 * (time.perf_counter() - loaded):.1f}ms",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+# 项目导入扫描
+# 用 ast 解析项目中的 .py 文件（分批交给进程池），收集顶层导入名，再通过元数据索引中各包的顶层模块（top_level.txt / RECORD）
+# 把导入名映射到分发包，与 requirements 对比，报告：
+#   - 未使用：声明了但没有被导入，也不是任何被导入包的依赖
+#   - 仅间接需要：没有被直接导入，但被导入的包依赖它，或通过 extra 使用它（如 pandas[excel] -> openpyxl）
+#   - 未声明：被导入的已安装包不在 requirements 中
+#   - 无法解析：既不是标准库、项目内模块，也不属于任何已安装包的导入名
+# 每个文件的解析结果按 (路径, 大小, mtime) 缓存，大型仓库再次扫描时只重新解析有变化的文件。
+#
+#   python import_scanner.py . -r requirements.txt --output results/imports.json
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from collectors import get_requirements_packages, session
+from packaging.requirements import InvalidRequirement, Requirement
+
+from dep_analytics import DependencyAnalytics, normalize_name
+
+DEFAULT_CACHE = os.path.join('results', 'import_cache.json')
+BATCH_SIZE = 64
+SKIP_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.tox', '.nox', '.mypy_cache', '.pytest_cache',
+             'build', 'dist', 'site-packages', 'venvs', 'results'}
+# 每个导入名在报告中最多列出的文件数
+SAMPLE_FILES = 5
+STDLIB = set(getattr(sys, 'stdlib_module_names', ())) | set(sys.builtin_module_names) | {'__future__'}
+
+
+def iter_python_files(root):
+    for current, dirs, files in os.walk(root):
+        # 跳过隐藏目录、虚拟环境和构建产物
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')
+                   and not os.path.exists(os.path.join(current, d, 'pyvenv.cfg'))]
+        for file in files:
+            if file.endswith('.py'):
+                yield os.path.join(current, file)
+
+
+def parse_imports(path):
+    # 返回文件中导入的顶层模块名；相对导入属于项目自身，不计入
+    with open(path, 'rb') as f:
+        source = f.read()
+    # 没有 import 关键字的文件不必解析
+    if b'import' not in source:
+        return []
+    tree = ast.parse(source, filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+    return sorted(names)
+
+
+def parse_batch(paths):
+    # 在子进程中执行，返回 [(路径, 导入名列表, 错误信息或 None)]
+    results = []
+    for path in paths:
+        try:
+            results.append((path, parse_imports(path), None))
+        except (OSError, SyntaxError, ValueError) as e:
+            results.append((path, [], f"{type(e).__name__}: {e}"))
+    return results
+
+
+def load_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    if not cache_path:
+        return
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, cache_path)
+
+
+def scan_project(root, cache_path=DEFAULT_CACHE, workers=None, progress=None):
+    # 返回 ({导入名: [文件]}, {文件: 错误信息}, 统计信息)
+    root = os.path.abspath(root)
+    cache = load_cache(cache_path)
+    files = {}
+    pending = []
+    for path in iter_python_files(root):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files[path] = (stat.st_size, stat.st_mtime_ns)
+        cached = cache.get(path)
+        if not (cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns):
+            pending.append(path)
+
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+    if len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(parse_batch, batches)
+            for done, batch in enumerate(results, 1):
+                for path, names, error in batch:
+                    cache[path] = [*files[path], names, error]
+                if progress:
+                    progress(done, len(batches))
+    elif batches:
+        # 文件很少时不必启动进程池
+        for path, names, error in parse_batch(batches[0]):
+            cache[path] = [*files[path], names, error]
+
+    imports = {}
+    errors = {}
+    for path in sorted(files):
+        _, _, names, error = cache[path]
+        if error:
+            errors[path] = error
+        for name in names:
+            imports.setdefault(name, []).append(path)
+
+    # 只清理本项目下已不存在的文件，其他项目的缓存保留
+    prefix = root + os.sep
+    cache = {path: value for path, value in cache.items() if path in files or not path.startswith(prefix)}
+    save_cache(cache_path, cache)
+    return imports, errors, {'files_scanned': len(files), 'files_parsed': len(pending)}
+
+
+def local_modules(root):
+    # 项目自身的模块名：所有 .py 文件名和包含 .py 文件的目录名
+    names = set()
+    for path in iter_python_files(root):
+        names.add(os.path.splitext(os.path.basename(path))[0])
+        names.update(os.path.relpath(os.path.dirname(path), root).split(os.sep))
+    names.discard('.')
+    return names
+
+
+def import_name_index(distributions=None):
+    # {导入名: {规范化包名}}；顶层模块来自元数据索引（top_level.txt，没有时从 RECORD 推断），
+    # 两者都没有时才假定导入名与分发包名相同
+    if distributions is None:
+        distributions = session.get('metadata_index').distributions()
+    index = {}
+    for dist in distributions:
+        key = normalize_name(dist.name)
+        for module in dist.top_level or [key.replace('-', '_')]:
+            index.setdefault(module, set()).add(key)
+    return index
+
+
+def extra_dependencies(distributions, keys):
+    # {规范化包名: {"包[extra]"}}：keys 中的包通过 extra 引入的依赖（如 pandas[excel] -> openpyxl），
+    # 这类插件式依赖不会出现在依赖图中，但也不是多余的声明
+    result = {}
+    for dist in distributions:
+        key = normalize_name(dist.name)
+        if key not in keys:
+            continue
+        for line in dist.requires or ():
+            try:
+                req = Requirement(line)
+            except InvalidRequirement:
+                continue
+            if not req.marker:
+                continue
+            for extra in re.findall(r'extra\s*==\s*["\']([^"\']+)', str(req.marker)):
+                if req.marker.evaluate({'extra': extra}):
+                    result.setdefault(normalize_name(req.name), set()).add(f"{dist.name}[{extra}]")
+    return result
+
+
+def requirement_names(requirements_file):
+    # 只取包名，去掉版本约束、extras 和环境标记；忽略注释和 -r/-e 等选项行
+    names = {}
+    for record in get_requirements_packages(requirements_file):
+        line = record.name.split('#')[0].strip()
+        if not line or line.startswith('-'):
+            continue
+        name = re.split(r'[\s<>=!~;\[@]', line, 1)[0]
+        if name:
+            names[normalize_name(name)] = name
+    return names
+
+
+def analyze_imports(imports, declared, root, distributions=None):
+    # 已安装包的元数据和依赖关系都从元数据索引读取，不再逐个解析 dist-info
+    if distributions is None:
+        distributions = session.get('metadata_index').distributions()
+    index = import_name_index(distributions)
+    analytics = DependencyAnalytics.from_environment(distributions)
+    local = local_modules(root)
+
+    imported = {}
+    unresolved = {}
+    for module, files in imports.items():
+        # 与解释器的查找顺序一致：标准库、项目自身的模块优先于已安装的包
+        if module in STDLIB or module in local:
+            continue
+        if module in index:
+            for key in index[module]:
+                imported.setdefault(key, set()).add(module)
+        else:
+            unresolved[module] = files
+
+    # 被导入的包依赖的全部包
+    pulled_in = {}
+    for key in imported:
+        for dependency in analytics.descendants.get(key, ()):
+            pulled_in.setdefault(dependency, set()).add(key)
+    # 通过 extra 引入的包及其依赖
+    optional = {}
+    for dependency, parents in extra_dependencies(distributions, set(imported) | set(pulled_in)).items():
+        for key in {dependency} | set(analytics.descendants.get(dependency, ())):
+            optional.setdefault(key, set()).update(parents)
+
+    def display(key):
+        return analytics.display_names.get(key, key)
+
+    unused, transitive_only, not_installed = [], [], []
+    for key, name in sorted(declared.items()):
+        if key in imported:
+            continue
+        if key not in analytics.display_names:
+            not_installed.append(name)
+        elif key in pulled_in:
+            transitive_only.append([name, sorted(display(parent) for parent in pulled_in[key])])
+        elif key in optional:
+            transitive_only.append([name, sorted(optional[key])])
+        else:
+            unused.append(name)
+
+    undeclared = []
+    for key, modules in sorted(imported.items()):
+        if key in declared:
+            continue
+        files = sorted({path for module in modules for path in imports[module]})
+        undeclared.append([display(key), sorted(modules), files[:SAMPLE_FILES]])
+
+    return {
+        'unused': unused,
+        'transitive_only': transitive_only,
+        'undeclared': undeclared,
+        'unresolved': [[module, files[:SAMPLE_FILES]] for module, files in sorted(unresolved.items())],
+        'not_installed': not_installed,
+    }
+
+
+def scan_dependencies(root, requirements_file='requirements.txt', cache_path=DEFAULT_CACHE, workers=None,
+                      progress=None):
+    started = time.perf_counter()
+    imports, errors, stats = scan_project(root, cache_path, workers, progress)
+    report = analyze_imports(imports, requirement_names(requirements_file), root)
+    report.update(stats)
+    report['errors'] = errors
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def has_problems(report):
+    return bool(report['unused'] or report['undeclared'])
+
+
+def format_report(report):
+    lines = [f"扫描 {report['files_scanned']} 个文件，本次解析 {report['files_parsed']} 个，耗时 {report['seconds']:.2f}s"]
+    for name in report['unused']:
+        lines.append(f"[未使用] {name}")
+    for name, parents in report['transitive_only']:
+        lines.append(f"[仅间接需要] {name}（由 {', '.join(parents)} 引入）")
+    for name, modules, files in report['undeclared']:
+        lines.append(f"[未声明] {name}（import {', '.join(modules)}，如 {os.path.relpath(files[0])}）")
+    for module, files in report['unresolved']:
+        lines.append(f"[无法解析] import {module}（如 {os.path.relpath(files[0])}）")
+    for name in report['not_installed']:
+        lines.append(f"[未安装] {name}")
+    for path, error in report['errors'].items():
+        lines.append(f"[解析失败] {os.path.relpath(path)}: {error}")
+    counts = (('unused', '未使用'), ('transitive_only', '仅间接需要'), ('undeclared', '未声明'),
+              ('unresolved', '无法解析'))
+    lines.append('，'.join(f"{label} {len(report[key])}" for key, label in counts))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='扫描项目源码中的导入，找出未使用和未声明的依赖')
+    parser.add_argument('root', nargs='?', default='.', help='项目目录')
+    parser.add_argument('-r', '--requirements', type=str, default='requirements.txt', help='requirements 文件')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='解析进程数')
+    parser.add_argument('--cache', type=str, default=DEFAULT_CACHE, help='解析缓存文件，传空字符串禁用缓存')
+    parser.add_argument('--output', type=str, help='将报告保存为 JSON')
+    args = parser.parse_args()
+
+    report = scan_dependencies(args.root, args.requirements, cache_path=args.cache or None, workers=args.workers)
+    print('\n'.join(format_report(report)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已保存到 {args.output}")
+    sys.exit(1 if has_problems(report) else 0)
+
+
+if __name__ == '__main__':
+    main()
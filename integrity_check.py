@@ -0,0 +1,224 @@
+# 已安装文件完整性校验
+# 按每个包 RECORD 中记录的 sha256 和文件大小校验已安装文件，报告被修改、缺失以及 RECORD 之外多出的文件。
+# 哈希计算分批交给进程池，大文件使用 mmap 读取；结果按 (路径, 大小, mtime) 缓存，再次校验时只重新计算有变化的文件。
+#
+#   python integrity_check.py --output results/integrity.json
+import argparse
+import base64
+import hashlib
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+from dep_analytics import normalize_name
+
+DEFAULT_CACHE = os.path.join('results', 'integrity_cache.json')
+MMAP_THRESHOLD = 1024 * 1024
+READ_BUFFER = 1024 * 1024
+BATCH_SIZE = 256
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            while True:
+                chunk = f.read(READ_BUFFER)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return base64.urlsafe_b64encode(digest.digest()).rstrip(b'=').decode('ascii')
+
+
+def hash_batch(paths):
+    # 在子进程中执行，返回 [(路径, 摘要或 None, 错误信息或 None)]
+    results = []
+    for path in paths:
+        try:
+            results.append((path, hash_file(path), None))
+        except OSError as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+def load_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    if not cache_path:
+        return
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, cache_path)
+
+
+def collect_records(distributions):
+    # 返回 ({包名: [(绝对路径, 期望摘要, 期望大小)]}, {包名: 顶层目录集合}, 所有已登记路径集合)
+    records = {}
+    top_levels = {}
+    recorded = set()
+    seen = set()
+    for dist in distributions:
+        name = dist.metadata['Name']
+        if not name or normalize_name(name) in seen or not dist.files:
+            continue
+        seen.add(normalize_name(name))
+        entries = []
+        directories = set()
+        for file in dist.files:
+            path = os.path.normpath(str(dist.locate_file(file)))
+            recorded.add(path)
+            parts = file.parts
+            if len(parts) > 1 and parts[0] != '..' and not parts[0].endswith(('.dist-info', '.egg-info', '.data')):
+                directories.add(os.path.normpath(str(dist.locate_file(parts[0]))))
+            # RECORD 自身和安装后生成的 .pyc 没有哈希，只检查登记了哈希的文件
+            if file.hash is None or file.hash.mode != 'sha256':
+                continue
+            entries.append((path, file.hash.value, file.size))
+        records[name] = entries
+        top_levels[name] = directories
+    return records, top_levels, recorded
+
+
+def find_unlisted(top_levels, recorded):
+    # 包的顶层目录中没有被任何包的 RECORD 登记的文件（忽略 __pycache__）
+    unlisted = {}
+    for name, directories in top_levels.items():
+        extra = []
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = [d for d in dirs if d != '__pycache__']
+                for file in files:
+                    path = os.path.normpath(os.path.join(root, file))
+                    if path not in recorded:
+                        extra.append(path)
+        if extra:
+            unlisted[name] = sorted(extra)
+    return unlisted
+
+
+def verify_installed_files(distributions=None, cache_path=DEFAULT_CACHE, workers=None, progress=None):
+    if distributions is None:
+        distributions = metadata.distributions()
+    started = time.perf_counter()
+    records, top_levels, recorded = collect_records(distributions)
+    cache = load_cache(cache_path)
+
+    report = {name: {'modified': [], 'missing': [], 'unlisted': []} for name in records}
+    pending = {}
+    stats = {}
+    for name, entries in records.items():
+        for path, expected, expected_size in entries:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                report[name]['missing'].append(path)
+                continue
+            stats[path] = (stat.st_size, stat.st_mtime_ns)
+            if expected_size is not None and stat.st_size != expected_size:
+                report[name]['modified'].append(path)
+                continue
+            cached = cache.get(path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                if cached[2] != expected:
+                    report[name]['modified'].append(path)
+                continue
+            pending.setdefault(path, []).append((name, expected))
+
+    hashed_bytes = 0
+    paths = list(pending)
+    batches = [paths[i:i + BATCH_SIZE] for i in range(0, len(paths), BATCH_SIZE)]
+    if batches:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for done, results in enumerate(executor.map(hash_batch, batches), 1):
+                for path, digest, error in results:
+                    if digest is None:
+                        for name, _ in pending[path]:
+                            report[name]['missing'].append(path)
+                        continue
+                    size, mtime = stats[path]
+                    hashed_bytes += size
+                    cache[path] = [size, mtime, digest]
+                    for name, expected in pending[path]:
+                        if digest != expected:
+                            report[name]['modified'].append(path)
+                if progress:
+                    progress(done, len(batches))
+
+    for name, extra in find_unlisted(top_levels, recorded).items():
+        report[name]['unlisted'] = extra
+
+    # 缓存中删除已不存在的文件
+    cache = {path: value for path, value in cache.items() if path in stats}
+    save_cache(cache_path, cache)
+
+    elapsed = time.perf_counter() - started
+    problems = {name: result for name, result in report.items() if any(result.values())}
+    for result in problems.values():
+        for key in result:
+            result[key].sort()
+    return {
+        'packages_checked': len(records),
+        'files_checked': sum(len(entries) for entries in records.values()),
+        'files_hashed': len(paths),
+        'bytes_hashed': hashed_bytes,
+        'seconds': elapsed,
+        'throughput_mib_s': hashed_bytes / 1024 / 1024 / elapsed if elapsed else 0,
+        'problems': dict(sorted(problems.items(), key=lambda item: item[0].lower())),
+    }
+
+
+def format_report(report):
+    lines = [f"已校验 {report['packages_checked']} 个包的 {report['files_checked']} 个文件，"
+             f"本次计算哈希 {report['files_hashed']} 个（{report['bytes_hashed'] / 1024 / 1024:.1f} MiB，"
+             f"{report['throughput_mib_s']:.0f} MiB/s），耗时 {report['seconds']:.2f}s"]
+    if not report['problems']:
+        lines.append("所有文件均与 RECORD 一致。")
+    labels = (('modified', '已修改'), ('missing', '缺失'), ('unlisted', '未登记'))
+    for name, result in report['problems'].items():
+        lines.append(f"\n{name}:")
+        for key, label in labels:
+            for path in result[key]:
+                lines.append(f"  [{label}] {path}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按 RECORD 中的 sha256 校验已安装文件是否被篡改')
+    parser.add_argument('--path', type=str, nargs='*', help='要校验的 site-packages 目录，默认为当前解释器')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='哈希计算进程数')
+    parser.add_argument('--cache', type=str, default=DEFAULT_CACHE, help='哈希缓存文件，传空字符串禁用缓存')
+    parser.add_argument('--output', type=str, help='将报告保存为 JSON')
+    args = parser.parse_args()
+
+    distributions = metadata.distributions(path=args.path) if args.path else None
+    report = verify_installed_files(distributions, cache_path=args.cache or None, workers=args.workers)
+    print('\n'.join(format_report(report)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已保存到 {args.output}")
+    sys.exit(1 if report['problems'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+# Python 解释器发现
+# 在 PATH、/usr/bin/python3.*、pyenv、conda 环境以及 uv / rye 工具链目录中查找所有 Python 解释器。
+# 版本号尽量不运行解释器获得：依次读取 pyvenv.cfg、include/pythonX.Y/patchlevel.h、conda-meta、
+# 工具链目录名、lib/pythonX.Y 目录；都不行时才执行一次解释器。结果按二进制文件 mtime 缓存。
+#
+#   python interpreter_discovery.py
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+
+DEFAULT_CACHE = os.path.join('results', 'interpreter_cache.json')
+VERSION_PATTERN = re.compile(r'(\d+\.\d+\.\d+)')
+EXECUTABLE_PATTERN = re.compile(r'^python(\d(\.\d+)?)?(\.exe)?$', re.IGNORECASE)
+
+_discovered = None
+_discovered_lock = threading.Lock()
+
+
+def _executable_names():
+    return ('python.exe',) if os.name == 'nt' else ('python3', 'python')
+
+
+def _bin_candidates(prefix):
+    # 某个安装目录下的解释器路径
+    if os.name == 'nt':
+        return [os.path.join(prefix, 'python.exe')]
+    return [os.path.join(prefix, 'bin', name) for name in _executable_names()]
+
+
+def conda_prefixes():
+    # 本机所有 conda 环境的目录（含 base 环境），按真实路径去重，只保留带 conda-meta 的目录
+    home = os.path.expanduser('~')
+    prefixes = []
+    environments_file = os.path.join(home, '.conda', 'environments.txt')
+    if os.path.exists(environments_file):
+        with open(environments_file, 'r', encoding='utf-8', errors='replace') as f:
+            prefixes.extend(line.strip() for line in f if line.strip())
+    for base in ('miniconda3', 'miniconda', 'anaconda3', 'miniforge3', 'mambaforge', '.conda'):
+        base_path = os.path.join(home, base)
+        if os.path.isdir(base_path):
+            prefixes.append(base_path)
+            prefixes.extend(glob.glob(os.path.join(base_path, 'envs', '*')))
+    if os.environ.get('CONDA_PREFIX'):
+        prefixes.append(os.environ['CONDA_PREFIX'])
+
+    result = []
+    seen = set()
+    for prefix in prefixes:
+        realpath = os.path.realpath(prefix)
+        if realpath not in seen and os.path.isdir(os.path.join(prefix, 'conda-meta')):
+            seen.add(realpath)
+            result.append(prefix)
+    return result
+
+
+def candidate_paths():
+    # 返回 [(路径, 来源)]，同一个解释器可能出现多次，由调用方按真实路径去重
+    home = os.path.expanduser('~')
+    candidates = []
+
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        # pyenv 的 shims 只是转发脚本，真实解释器在下面按 pyenv versions 目录列出
+        if not os.path.isdir(directory) or os.path.basename(os.path.normpath(directory)) == 'shims':
+            continue
+        try:
+            entries = os.listdir(directory)
+        except OSError:
+            continue
+        for entry in entries:
+            if EXECUTABLE_PATTERN.match(entry):
+                candidates.append((os.path.join(directory, entry), 'PATH'))
+
+    if os.name != 'nt':
+        for pattern in ('/usr/bin/python3.*', '/usr/local/bin/python3.*', '/opt/homebrew/bin/python3.*'):
+            for path in glob.glob(pattern):
+                if EXECUTABLE_PATTERN.match(os.path.basename(path)):
+                    candidates.append((path, 'system'))
+    else:
+        local_app_data = os.environ.get('LOCALAPPDATA', '')
+        for pattern in (os.path.join(local_app_data, 'Programs', 'Python', 'Python3*'),
+                        r'C:\Python3*', r'C:\Program Files\Python3*'):
+            for prefix in glob.glob(pattern):
+                candidates.extend((path, 'system') for path in _bin_candidates(prefix))
+
+    pyenv_root = os.environ.get('PYENV_ROOT', os.path.join(home, '.pyenv'))
+    for prefix in sorted(glob.glob(os.path.join(pyenv_root, 'versions', '*'))):
+        candidates.extend((path, 'pyenv') for path in _bin_candidates(prefix))
+
+    for prefix in conda_prefixes():
+        candidates.extend((path, 'conda') for path in _bin_candidates(prefix))
+
+    uv_root = os.environ.get('UV_PYTHON_INSTALL_DIR', os.path.join(home, '.local', 'share', 'uv', 'python'))
+    if os.name == 'nt':
+        uv_root = os.environ.get('UV_PYTHON_INSTALL_DIR',
+                                 os.path.join(os.environ.get('APPDATA', home), 'uv', 'python'))
+    for prefix in sorted(glob.glob(os.path.join(uv_root, 'cpython-*'))):
+        candidates.extend((path, 'uv') for path in _bin_candidates(prefix))
+
+    rye_root = os.environ.get('RYE_HOME', os.path.join(home, '.rye'))
+    for prefix in sorted(glob.glob(os.path.join(rye_root, 'py', '*'))):
+        candidates.extend((path, 'rye') for path in _bin_candidates(prefix))
+
+    return [(path, source) for path, source in candidates if os.path.isfile(path) and os.access(path, os.X_OK)]
+
+
+def _prefix_of(realpath):
+    directory = os.path.dirname(realpath)
+    return directory if os.name == 'nt' else os.path.dirname(directory)
+
+
+def binary_minor_version(path):
+    # 从文件名（python3.12、python3.12.exe）读取主次版本号，python3 之类的通用名称再看符号链接指向的文件；读不到时返回 None
+    for name in (os.path.basename(path), os.path.basename(os.path.realpath(path))):
+        match = re.match(r'^python(\d+\.\d+)', name, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _matches(version, minor):
+    return minor is None or version == minor or version.startswith(minor + '.')
+
+
+def read_version_from_layout(path):
+    # 不运行解释器，从安装目录结构中读取版本号，读不到时返回 None。
+    # /usr、/usr/local 等共享前缀下可能同时装有多个 python3.X，只接受与该二进制文件的主次版本号一致的布局；
+    # 文件名中没有版本号时，只有前缀下唯一的布局才可信
+    realpath = os.path.realpath(path)
+    prefix = _prefix_of(realpath)
+    minor = binary_minor_version(path)
+
+    # venv / uv 虚拟环境
+    for cfg in (os.path.join(_prefix_of(os.path.abspath(path)), 'pyvenv.cfg'), os.path.join(prefix, 'pyvenv.cfg')):
+        if os.path.exists(cfg):
+            with open(cfg, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    key, _, value = line.partition('=')
+                    if key.strip() in ('version', 'version_info'):
+                        match = VERSION_PATTERN.search(value)
+                        if match and _matches(match.group(1), minor):
+                            return match.group(1)
+
+    # 带头文件的完整安装（python.org、pyenv、conda、uv、rye 均有）
+    headers = glob.glob(os.path.join(prefix, 'include', f'python{minor or "3"}*', 'patchlevel.h')) + \
+        glob.glob(os.path.join(prefix, 'include', 'patchlevel.h'))
+    versions = []
+    for header in headers:
+        with open(header, 'r', encoding='utf-8', errors='replace') as f:
+            match = re.search(r'#define\s+PY_VERSION\s+"(\d+\.\d+\.\d+)', f.read())
+        if match and _matches(match.group(1), minor) and match.group(1) not in versions:
+            versions.append(match.group(1))
+    if len(versions) == 1:
+        return versions[0]
+
+    # conda 环境
+    for record in glob.glob(os.path.join(prefix, 'conda-meta', 'python-3*.json')):
+        match = VERSION_PATTERN.search(os.path.basename(record))
+        if match and _matches(match.group(1), minor):
+            return match.group(1)
+
+    # pyenv / uv / rye 的目录名中带有完整版本
+    match = re.search(r'(?:versions[\\/]|cpython-|cpython@)(\d+\.\d+\.\d+)', realpath)
+    if match and _matches(match.group(1), minor):
+        return match.group(1)
+
+    # 最后只能从 lib/pythonX.Y 得到主次版本号
+    libs = glob.glob(os.path.join(prefix, 'lib', f'python{minor}' if minor else 'python3.*', 'os.py'))
+    if len(libs) == 1:
+        return os.path.basename(os.path.dirname(libs[0]))[len('python'):]
+    return None
+
+
+def run_for_version(path):
+    try:
+        result = subprocess.run([path, '-c', 'import sys; print("%d.%d.%d" % sys.version_info[:3])'],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = VERSION_PATTERN.search(result.stdout.decode('utf-8', errors='replace'))
+    return match.group(1) if match else None
+
+
+def _load_cache(cache_path):
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def _save_cache(cache_path, cache):
+    if not cache_path:
+        return
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, cache_path)
+
+
+def read_version(path, cache=None):
+    # cache 为 {真实路径: {'mtime': ..., 'version': ...}}，二进制文件 mtime 不变时直接复用
+    realpath = os.path.realpath(path)
+    try:
+        mtime = os.stat(realpath).st_mtime_ns
+    except OSError:
+        return None
+    if cache is not None:
+        cached = cache.get(realpath)
+        if cached and cached.get('mtime') == mtime:
+            return cached['version']
+    version = read_version_from_layout(path) or run_for_version(path)
+    # 无法运行的文件也记下来（版本为 None），下次不再尝试
+    if cache is not None:
+        cache[realpath] = {'mtime': mtime, 'version': version}
+    return version
+
+
+def discover_interpreters(refresh=False, cache_path=DEFAULT_CACHE):
+    # 返回 [{'path', 'realpath', 'version', 'source'}]，按版本从高到低排列；结果在进程内复用
+    global _discovered
+    with _discovered_lock:
+        if _discovered is not None and not refresh:
+            return _discovered
+
+        # refresh 时忽略缓存文件重新读取版本，读取结果仍写回缓存
+        cache = {} if refresh else _load_cache(cache_path)
+        interpreters = []
+        seen = set()
+        for path, source in candidate_paths():
+            # python、python3、python3.11 往往是同一个文件的符号链接，只保留第一个
+            realpath = os.path.realpath(path)
+            if realpath in seen:
+                continue
+            seen.add(realpath)
+            version = read_version(path, cache)
+            if version:
+                interpreters.append({'path': path, 'realpath': realpath, 'version': version, 'source': source})
+        _save_cache(cache_path, cache)
+
+        interpreters.sort(key=lambda item: tuple(int(part) for part in item['version'].split('.')), reverse=True)
+        _discovered = interpreters
+        return interpreters
+
+
+def find_interpreter(version=None):
+    # 按版本号前缀（如 "3.11" 或 "3.11.7"）选出最新的匹配解释器，未指定时返回当前解释器
+    if not version:
+        return sys.executable
+    current = '%d.%d.%d' % sys.version_info[:3]
+    if current == version or current.startswith(version + '.'):
+        return sys.executable
+    for interpreter in discover_interpreters():
+        if interpreter['version'] == version or interpreter['version'].startswith(version + '.'):
+            return interpreter['path']
+    raise FileNotFoundError(f"未找到 Python {version} 解释器")
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='列出本机上的所有 Python 解释器')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存重新读取版本')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    interpreters = discover_interpreters(refresh=args.refresh)
+    for interpreter in interpreters:
+        print(f"{interpreter['version']:<10} {interpreter['source']:<7} {interpreter['path']}")
+    print(f"共发现 {len(interpreters)} 个解释器，耗时 {1000 * (time.perf_counter() - start):.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
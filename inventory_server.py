@@ -0,0 +1,163 @@
+# 本地清单 HTTP 服务
+# 以 JSON 接口提供已安装包、编程语言、前端框架、依赖匹配和性能监控数据。
+# 数据来自会话缓存并由后台线程定时刷新，请求只读取内存中的快照；
+# 每个接口带 ETag，轮询方携带 If-None-Match 且数据未变化时返回 304。
+#
+#   python inventory_server.py --port 8765 --interval 300
+import argparse
+import hashlib
+import json
+import threading
+
+from flask import Flask, Response, jsonify, request
+
+import tracing
+from collectors import create_session
+from consistency_check import problems_to_dict
+from alerts import AlertEngine
+from monitor_sampler import MonitorSampler
+from records import to_dict, to_row
+
+# 接口路径 -> (依赖的数据源, 序列化函数)
+ENDPOINTS = {
+    'packages': (['packages'], lambda packages: [to_row(record) for record in packages]),
+    'languages': (['languages'], lambda languages: [to_row(record) for record in languages]),
+    'frameworks': (['frameworks'], lambda frameworks: [to_row(record) for record in frameworks]),
+    'requirements': (['requirement_matches'], lambda matches: [to_row(record) for record in matches]),
+    'analytics': (['analytics'], lambda analytics: analytics.to_dict()),
+    'consistency': (['consistency'], problems_to_dict),
+    'system': (['system_packages'], lambda index: [to_row(record) for record in index.packages]),
+    'native': (['native_links'], lambda links: [to_dict(link) for link in links]),
+    'conda': (['conda_envs'],
+              lambda envs: {prefix: [to_row(record) for record in rows] for prefix, rows in envs.items()}),
+}
+
+
+class RenderedCache:
+    # 每个接口的响应体只在数据源刷新后重新序列化一次，ETag 取响应体的哈希，内容不变则 ETag 不变
+    def __init__(self, session):
+        self.session = session
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def _stamps(self, sources):
+        return tuple(self.session.stamp(name) for name in sources)
+
+    def get(self, endpoint):
+        # 缓存条目为 (时间戳, ETag, 响应体) 一个元组，整体读写，ETag 与响应体不会来自不同版本
+        sources, serializer = ENDPOINTS[endpoint]
+        stamps = self._stamps(sources)
+        with self._lock:
+            cached = self._rendered.get(endpoint)
+        if cached and cached[0] == stamps and None not in stamps:
+            return cached[2], cached[1]
+
+        # 读取数据前后时间戳一致，才能确定数据就是这组时间戳对应的版本；期间有后台刷新时重读
+        for _ in range(3):
+            values = [self.session.get(name) for name in sources]
+            current = self._stamps(sources)
+            if current == stamps:
+                break
+            stamps = current
+        else:
+            stamps = None
+        body = json.dumps(serializer(*values), ensure_ascii=False).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+        if stamps is not None:
+            with self._lock:
+                self._rendered[endpoint] = (stamps, etag, body)
+        return body, etag
+
+
+def json_response(body, etag):
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def create_app(session, sampler):
+    app = Flask(__name__)
+    rendered = RenderedCache(session)
+
+    @app.route('/')
+    def index():
+        return jsonify({'endpoints': [f'/{name}' for name in ENDPOINTS] + ['/monitor', '/alerts', '/status']})
+
+    @app.route('/<endpoint>')
+    def inventory(endpoint):
+        if endpoint not in ENDPOINTS:
+            return jsonify({'error': f'未知接口: {endpoint}'}), 404
+        body, etag = rendered.get(endpoint)
+        return json_response(body, etag)
+
+    @app.route('/monitor')
+    def monitor():
+        since = request.args.get('since', type=float)
+        samples = [dict(record, alerts=[to_dict(alert) for alert in record.get('alerts', ())])
+                   for record in sampler.samples(since)]
+        body = json.dumps(samples, ensure_ascii=False).encode('utf-8')
+        latest = samples[-1]['time'] if samples else 0
+        return json_response(body, f'{since}-{latest}')
+
+    @app.route('/alerts')
+    def alerts():
+        engine = sampler.alerts
+        return jsonify({
+            'rules': [rule.text for rule in engine.rules],
+            'active': [to_dict(alert) for alert in list(engine.active.values())],
+            'history': [to_dict(alert) for alert in engine.alerts()],
+        })
+
+    @app.route('/status')
+    def status():
+        return jsonify({
+            'generation': session.generation,
+            'ages': {name: session.age(name) for name in session.names()},
+            'monitor_running': sampler.running,
+            'slowest': tracing.tracer.report_lines(5),
+        })
+
+    return app
+
+
+def refresh_loop(session, interval, stop_event):
+    while not stop_event.wait(interval):
+        try:
+            tracing.tracer.clear()
+            session.refresh_all()
+        except Exception as e:
+            print(f"后台刷新失败: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以 HTTP JSON 接口提供本机的 Python 环境清单')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--interval', type=float, default=300, help='后台刷新间隔（秒）')
+    parser.add_argument('--requirements', type=str, default='requirements.txt', help='依赖匹配使用的 requirements 文件')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='性能监控采样间隔（秒）')
+    parser.add_argument('--rule', action='append', metavar='规则', help='性能监控告警规则，可重复指定')
+    args = parser.parse_args()
+
+    # 缓存不按时间过期，只由后台线程整体替换，请求不会触发采集
+    session = create_session(requirements_file=args.requirements, ttl=None)
+    print("正在进行首次采集...")
+    session.refresh_all()
+
+    sampler = MonitorSampler(interval=args.sample_interval, alerts=AlertEngine(args.rule))
+    sampler.start()
+
+    stop_event = threading.Event()
+    threading.Thread(target=refresh_loop, args=(session, args.interval, stop_event), daemon=True).start()
+
+    app = create_app(session, sampler)
+    try:
+        app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        stop_event.set()
+        sampler.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+# 已安装分发包的持久化元数据索引
+# 把每个分发包的名称、版本、简介、许可证、依赖声明、顶层模块、文件数和大小保存在 SQLite（results/metadata_index.sqlite）中，
+# 简介和详细说明建立 FTS5 全文索引。更新时只列出各 site-packages 目录并比较 .dist-info 目录的 mtime，
+# 只重新读取新增或变化的包、删除已卸载的包；包管理、依赖分析、导出和命令行都从索引查询，大型环境中也只需几毫秒。
+#
+#   python metadata_index.py --search "http client"
+#   python metadata_index.py --info requests
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from importlib import metadata
+from pathlib import Path
+
+from dep_analytics import normalize_name
+from records import DistributionInfo, package
+
+DEFAULT_DB = os.path.join('results', 'metadata_index.sqlite')
+METADATA_SUFFIXES = ('.dist-info', '.egg-info')
+# 许可证字段有时是完整的许可证文本，超过这个长度时改用分类器中的许可证名称
+LICENSE_MAX = 80
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS distributions (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    directory TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    summary TEXT,
+    license TEXT,
+    requires TEXT,
+    top_level TEXT,
+    file_count INTEGER,
+    size INTEGER,
+    location TEXT
+);
+CREATE INDEX IF NOT EXISTS distributions_directory ON distributions (directory);
+CREATE INDEX IF NOT EXISTS distributions_key ON distributions (key);
+"""
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS distributions_fts USING fts5(name, summary, description)"
+COLUMNS = 'name, version, summary, license, requires, top_level, file_count, size, location'
+
+
+class IndexedDistribution(DistributionInfo):
+    # 与 importlib.metadata.Distribution 相同的 metadata['Name']、version、requires 接口，
+    # 依赖分析和一致性检查可以直接使用索引中的记录
+    __slots__ = ()
+
+    @property
+    def metadata(self):
+        return {'Name': self.name}
+
+
+def search_directories():
+    # 与 importlib.metadata 的查找顺序一致：按 sys.path 顺序，同名包以先出现的为准
+    directories = []
+    for path in sys.path:
+        path = os.path.abspath(path or '.')
+        if os.path.isdir(path) and path not in directories:
+            directories.append(path)
+    return directories
+
+
+def top_level_modules(dist):
+    # 优先读 top_level.txt，没有时从 RECORD 中的顶层路径推断
+    top_level = dist.read_text('top_level.txt')
+    if top_level:
+        return sorted({line.strip().split('/')[0] for line in top_level.splitlines() if line.strip()})
+    modules = set()
+    for file in dist.files or ():
+        first = file.parts[0]
+        if first == '..' or first.endswith(('.dist-info', '.egg-info', '.data', '.pth')) or first == '__pycache__':
+            continue
+        if len(file.parts) == 1:
+            if not first.endswith(('.py', '.so', '.pyd')):
+                continue
+            first = first.split('.')[0]
+        modules.add(first)
+    return sorted(modules)
+
+
+def license_of(meta):
+    expression = meta.get('License-Expression')
+    if expression:
+        return expression
+    text = (meta.get('License') or '').strip()
+    if text and len(text) <= LICENSE_MAX and '\n' not in text:
+        return text
+    classifiers = [value.split('::')[-1].strip() for value in meta.get_all('Classifier') or ()
+                   if value.startswith('License ::')]
+    if classifiers:
+        return ', '.join(classifiers)
+    return text.splitlines()[0][:LICENSE_MAX] if text else ''
+
+
+def editable_location(dist):
+    # 与 pip list 的“可编辑安装位置”一致，来自 direct_url.json
+    try:
+        direct_url = json.loads(dist.read_text('direct_url.json') or '{}')
+    except ValueError:
+        return None
+    if direct_url.get('dir_info', {}).get('editable') and direct_url.get('url', '').startswith('file://'):
+        return direct_url['url'][len('file://'):]
+    return None
+
+
+def read_distribution(path):
+    # 返回 (索引列, 详细说明)；详细说明只写入全文索引
+    dist = metadata.PathDistribution(Path(path))
+    meta = dist.metadata
+    name = meta['Name']
+    if not name:
+        return None
+    files = dist.files or []
+    row = (normalize_name(name), name, dist.version or '', meta.get('Summary') or '', license_of(meta),
+           json.dumps(dist.requires or []), json.dumps(top_level_modules(dist)), len(files),
+           sum(file.size or 0 for file in files), editable_location(dist))
+    return row, meta.get_payload() or meta.get('Description') or ''
+
+
+def fts_query(text):
+    # 每个词加引号并按前缀匹配，用户输入中的 FTS5 运算符不会引起语法错误
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in text.split())
+
+
+class MetadataIndex:
+    def __init__(self, db_path=DEFAULT_DB, directories=None):
+        self.db_path = db_path
+        self.directories = directories or search_directories()
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        # 会话缓存在工作线程中加载数据源，连接在线程间共享，由锁保证同一时刻只有一个线程使用
+        # 批量扫描时多个索引对象并发写同一个数据库文件，写锁等待时间放宽
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self._connection.executescript(SCHEMA)
+        try:
+            self._connection.execute(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 时退化为 LIKE 查询
+            self.fts = False
+        self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def update(self):
+        # 返回 {'added': n, 'updated': n, 'removed': n, 'seconds': t}
+        start = time.perf_counter()
+        found = {}
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.endswith(METADATA_SUFFIXES) and entry.is_dir():
+                    found[entry.path] = (directory, entry.stat().st_mtime_ns)
+
+        stats = {'added': 0, 'updated': 0, 'removed': 0}
+        with self._lock, self._connection:
+            connection = self._connection
+            placeholders = ','.join('?' * len(self.directories))
+            known = {path: (row_id, mtime) for row_id, path, mtime in connection.execute(
+                f'SELECT id, path, mtime FROM distributions WHERE directory IN ({placeholders})', self.directories)}
+
+            for path, (row_id, _) in known.items():
+                if path not in found:
+                    self._delete(row_id)
+                    stats['removed'] += 1
+            for path, (directory, mtime) in found.items():
+                if path in known and known[path][1] == mtime:
+                    continue
+                try:
+                    parsed = read_distribution(path)
+                except (OSError, ValueError):
+                    parsed = None
+                if path in known:
+                    self._delete(known[path][0])
+                    stats['updated'] += 1
+                elif parsed is not None:
+                    stats['added'] += 1
+                if parsed is None:
+                    continue
+                row, description = parsed
+                cursor = connection.execute(
+                    'INSERT INTO distributions (path, directory, mtime, key, name, version, summary, license, '
+                    'requires, top_level, file_count, size, location) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (path, directory, mtime) + row)
+                if self.fts:
+                    connection.execute('INSERT INTO distributions_fts (rowid, name, summary, description) '
+                                       'VALUES (?, ?, ?, ?)', (cursor.lastrowid, row[1], row[3], description))
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    def _delete(self, row_id):
+        self._connection.execute('DELETE FROM distributions WHERE id = ?', (row_id,))
+        if self.fts:
+            self._connection.execute('DELETE FROM distributions_fts WHERE rowid = ?', (row_id,))
+
+    def _select(self, where='', parameters=()):
+        # 只返回当前查找路径中的记录，同名包取查找顺序靠前的目录
+        placeholders = ','.join('?' * len(self.directories))
+        order = ' '.join(f'WHEN ? THEN {i}' for i in range(len(self.directories)))
+        query = (f'SELECT key, {COLUMNS} FROM distributions WHERE directory IN ({placeholders}) {where} '
+                 f'ORDER BY CASE directory {order} END, id')
+        with self._lock:
+            rows = self._connection.execute(query, list(self.directories) + list(parameters) +
+                                            list(self.directories)).fetchall()
+        result = {}
+        for key, *row in rows:
+            if key not in result:
+                row[4], row[5] = json.loads(row[4]), json.loads(row[5])
+                result[key] = IndexedDistribution(*row)
+        return result
+
+    def distributions(self):
+        return sorted(self._select().values(), key=lambda dist: dist.name.lower())
+
+    def packages(self):
+        # 与 pip list 相同的 Package 记录
+        return [package(dist.name, dist.version, dist.location) for dist in self.distributions()]
+
+    def get(self, name):
+        return self._select('AND key = ?', [normalize_name(name)]).get(normalize_name(name))
+
+    def search(self, text, limit=50):
+        # 按名称、简介和详细说明全文检索，名称命中的权重最高
+        if not text.strip():
+            return self.distributions()[:limit]
+        if self.fts:
+            placeholders = ','.join('?' * len(self.directories))
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT d.key FROM distributions_fts JOIN distributions d ON d.id = distributions_fts.rowid '
+                    f'WHERE distributions_fts MATCH ? AND d.directory IN ({placeholders}) '
+                    'ORDER BY bm25(distributions_fts, 10.0, 5.0, 1.0) LIMIT ?',
+                    [fts_query(text)] + list(self.directories) + [limit]).fetchall()
+            rank = {}
+            for (key,) in rows:
+                rank.setdefault(key, len(rank))
+            if not rank:
+                return []
+            matches = self._select(f"AND key IN ({','.join('?' * len(rank))})", list(rank))
+            return sorted(matches.values(), key=lambda dist: rank[normalize_name(dist.name)])
+        pattern = f"%{text.strip()}%"
+        return list(self._select('AND (name LIKE ? OR summary LIKE ?)', [pattern, pattern]).values())[:limit]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(db_path=DEFAULT_DB):
+    # 同一进程中同一数据库只打开一次
+    with _indexes_lock:
+        if db_path not in _indexes:
+            _indexes[db_path] = MetadataIndex(db_path)
+        return _indexes[db_path]
+
+
+def load_metadata_index(db_path=DEFAULT_DB):
+    # 会话缓存的数据源：增量更新后返回索引
+    index = open_index(db_path)
+    index.update()
+    return index
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='维护并查询已安装分发包的元数据索引')
+    parser.add_argument('--search', type=str, metavar='关键词', help='按名称、简介和详细说明全文检索')
+    parser.add_argument('--info', type=str, metavar='包名', help='显示指定包的元数据')
+    parser.add_argument('--limit', type=int, default=20, help='检索结果条数')
+    parser.add_argument('--db', type=str, default=DEFAULT_DB, help='索引数据库文件')
+    parser.add_argument('--rebuild', action='store_true', help='删除索引后重新建立')
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.db):
+        os.remove(args.db)
+    index = MetadataIndex(args.db)
+    stats = index.update()
+    print(f"索引更新：新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['removed']}，"
+          f"耗时 {1000 * stats['seconds']:.1f}ms")
+
+    if args.info:
+        dist = index.get(args.info)
+        if dist is None:
+            print(f"未安装 {args.info}")
+            raise SystemExit(1)
+        print(f"{dist.name} {dist.version}\n简介: {dist.summary}\n许可证: {dist.license}\n"
+              f"顶层模块: {', '.join(dist.top_level)}\n文件: {dist.file_count} 个，{format_size(dist.size)}")
+        for line in dist.requires:
+            print(f"依赖: {line}")
+        if dist.location:
+            print(f"可编辑安装位置: {dist.location}")
+    elif args.search is not None:
+        start = time.perf_counter()
+        results = index.search(args.search, args.limit)
+        elapsed = time.perf_counter() - start
+        for dist in results:
+            print(f"{dist.name} {dist.version}  {dist.summary}")
+        print(f"共 {len(results)} 个结果，耗时 {1000 * elapsed:.1f}ms")
+    else:
+        print(f"已索引 {len(index.distributions())} 个分发包")
+
+
+if __name__ == '__main__':
+    main()
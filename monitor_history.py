@@ -0,0 +1,237 @@
+# 性能监控历史记录查看
+# 录制或导出的监控 CSV 按块读入后转换为按列存放的二进制缓存（results/.monitor_cache），之后以内存映射方式打开，
+# 不必整体读入内存；每个指标构建多级最小值/最大值金字塔并与基础列存放在同一缓存目录，缩放和平移时只取当前可见范围、
+# 合适分辨率的数据点（每个像素最多一对最小/最大值），几 GB 的录制文件也能流畅浏览，且不会漏掉尖峰。
+#
+#   python monitor_history.py results/performance_monitor_20261019_140000.csv --output view.png
+#   python monitor_history.py results/monitor.csv --start "2026-10-19 14:00:00" --end "2026-10-19 15:00:00"
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+METRICS = [('cpu', 'CPU使用率 (%)'), ('memory', '内存使用率 (%)'), ('disk', '磁盘使用率 (%)')]
+COLUMNS = ['time'] + [metric for metric, _ in METRICS]
+CHUNK_ROWS = 1 << 20
+FACTOR = 8
+MAX_POINTS = 2000
+CACHE_DIR = '.monitor_cache'
+
+
+def cache_path_of(path):
+    # 缓存目录名包含源文件的大小和 mtime，录制文件继续追加后自动重建
+    stat = os.stat(path)
+    name = f"{os.path.basename(path)}-{stat.st_size}-{stat.st_mtime_ns}"
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR, name)
+
+
+def parse_times(values):
+    # values 为 pandas 的字符串列。录制文件为完整的日期时间；旧版导出只有 时:分:秒，
+    # 按当天的秒数处理，跨过午夜时顺延一天
+    import pandas as pd
+
+    if len(values) and len(values.iloc[0]) <= 8:
+        seconds = pd.to_timedelta(values).dt.total_seconds().to_numpy()
+        rollover = np.concatenate([[0], np.cumsum(np.diff(seconds) < 0)])
+        return seconds + rollover * 86400
+    return pd.to_datetime(values, format='%Y-%m-%d %H:%M:%S').to_numpy().astype('datetime64[s]').astype(np.float64)
+
+
+def build_cache(path, cache_path, chunk_rows=CHUNK_ROWS):
+    # 逐块读入 CSV，各列分别追加到二进制文件，内存占用只与块大小有关
+    import pandas as pd
+
+    temp_path = cache_path + '.tmp'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    files = {column: open(os.path.join(temp_path, f'{column}.f64'), 'wb') for column in COLUMNS}
+    alerts = []
+    last_time = None
+    # 旧版导出没有告警列
+    with open(path, 'r', encoding='utf-8') as f:
+        names = COLUMNS + ['alerts'] if f.readline().count(',') >= len(COLUMNS) else COLUMNS
+    try:
+        reader = pd.read_csv(path, header=0, names=names, index_col=False, chunksize=chunk_rows,
+                             dtype={'time': str, 'alerts': str}, encoding='utf-8', on_bad_lines='skip')
+        for chunk in reader:
+            times = parse_times(chunk['time'])
+            if last_time is not None and len(times) and len(chunk['time'].iloc[0]) <= 8:
+                # 只有时分秒的旧格式：接续上一块的天数
+                times += 86400 * np.ceil(max(0, last_time - times[0]) / 86400)
+            if len(times):
+                last_time = times[-1]
+            files['time'].write(times.tobytes())
+            for metric, _ in METRICS:
+                files[metric].write(chunk[metric].to_numpy(dtype=np.float64).tobytes())
+            if 'alerts' not in chunk:
+                continue
+            flagged = chunk['alerts'].notna().to_numpy()
+            alerts.extend(zip(times[flagged].tolist(), chunk['alerts'][flagged].tolist()))
+    finally:
+        for f in files.values():
+            f.close()
+    with open(os.path.join(temp_path, 'alerts.json'), 'w', encoding='utf-8') as f:
+        json.dump(alerts, f, ensure_ascii=False)
+
+    # 同一源文件的旧缓存一并清理
+    cache_dir = os.path.dirname(cache_path)
+    prefix = os.path.basename(path) + '-'
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and os.path.join(cache_dir, name) not in (cache_path, temp_path):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    os.replace(temp_path, cache_path)
+
+
+class Recording:
+    def __init__(self, path, factor=FACTOR):
+        self.path = path
+        self.cache_path = cache_path_of(path)
+        if not os.path.isdir(self.cache_path):
+            build_cache(path, self.cache_path)
+
+        def column(name):
+            file_path = os.path.join(self.cache_path, f'{name}.f64')
+            if os.path.getsize(file_path) == 0:
+                return np.empty(0, dtype=np.float64)
+            return np.memmap(file_path, dtype=np.float64, mode='r')
+
+        self.times = column('time')
+        self.series = {metric: column(metric) for metric, _ in METRICS}
+        with open(os.path.join(self.cache_path, 'alerts.json'), 'r', encoding='utf-8') as f:
+            self.alerts = json.load(f)
+        self.alert_times = np.array([alert[0] for alert in self.alerts], dtype=np.float64)
+        self.factor = factor
+        self.levels = self._build_levels()
+
+    def __len__(self):
+        return len(self.times)
+
+    def _level_column(self, name, build):
+        # 金字塔各级写入缓存目录，之后打开同一录制文件时直接内存映射；目录不可写时只保留在内存中
+        file_path = os.path.join(self.cache_path, f'{name}.f64')
+        if os.path.exists(file_path):
+            return np.memmap(file_path, dtype=np.float64, mode='r')
+        values = build()
+        temp_path = file_path + '.tmp'
+        try:
+            values.tofile(temp_path)
+            os.replace(temp_path, file_path)
+        except OSError:
+            return values
+        return np.memmap(file_path, dtype=np.float64, mode='r')
+
+    def _build_levels(self):
+        # levels[k][指标] = (最小值, 最大值)，每一级的一个点覆盖上一级的 factor 个点；第 0 级就是原始数据
+        levels = [None]
+        count = len(self.times)
+        previous = {metric: (values, values) for metric, values in self.series.items()}
+        while count > MAX_POINTS:
+            starts = np.arange(0, count, self.factor)
+            name = f'level{len(levels)}-x{self.factor}'
+            level = {}
+            for metric, (mins, maxs) in previous.items():
+                level[metric] = (self._level_column(f'{name}-{metric}-min', lambda: np.minimum.reduceat(mins, starts)),
+                                 self._level_column(f'{name}-{metric}-max', lambda: np.maximum.reduceat(maxs, starts)))
+            levels.append(level)
+            previous = level
+            count = len(starts)
+        return levels
+
+    def time_range(self):
+        if not len(self.times):
+            return 0.0, 0.0
+        return float(self.times[0]), float(self.times[-1])
+
+    def query(self, metric, start=None, end=None, max_points=MAX_POINTS):
+        # 返回 (时间, 值)：可见点数不多时为原始数据，否则为交替的最小/最大值包络，总点数不超过 max_points
+        times = self.times
+        lo = 0 if start is None else max(int(np.searchsorted(times, start, 'left')) - 1, 0)
+        hi = len(times) if end is None else min(int(np.searchsorted(times, end, 'right')) + 1, len(times))
+        if hi <= lo:
+            return np.empty(0), np.empty(0)
+
+        level = 0
+        step = 1
+        while (hi - lo) / step > max_points and level + 1 < len(self.levels):
+            level += 1
+            step *= self.factor
+        if level == 0:
+            if hi - lo <= max_points:
+                return np.asarray(times[lo:hi]), np.asarray(self.series[metric][lo:hi])
+            mins = maxs = self.series[metric]
+            first, last = lo, hi
+        else:
+            mins, maxs = self.levels[level][metric]
+            first, last = lo // step, -(-hi // step)
+        x = np.asarray(times[first * step:last * step:step])
+        mins, maxs = np.asarray(mins[first:last]), np.asarray(maxs[first:last])
+
+        # 最粗一级（或没有金字塔的短录制）仍然超出时，再按组合并，每组保留一对最小/最大值
+        pairs = max(max_points // 2, 1)
+        if len(x) > pairs:
+            starts = np.arange(0, len(x), -(-len(x) // pairs))
+            x = x[starts]
+            mins, maxs = np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts)
+        return np.repeat(x, 2), np.column_stack([mins, maxs]).ravel()
+
+    def alerts_between(self, start, end, limit=200):
+        lo, hi = np.searchsorted(self.alert_times, [start, end])
+        return self.alerts[lo:min(hi, lo + limit)]
+
+
+def to_plot_time(seconds):
+    # matplotlib 的日期数值以 1970-01-01 为起点、以天为单位
+    return np.asarray(seconds) / 86400.0
+
+
+def parse_time_argument(value):
+    return float(np.datetime64(value.replace(' ', 'T'), 's').astype(np.float64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查看录制的性能监控数据')
+    parser.add_argument('path', help='录制或导出的监控 CSV 文件')
+    parser.add_argument('--start', type=str, help='开始时间，如 "2026-10-19 14:00:00"')
+    parser.add_argument('--end', type=str, help='结束时间')
+    parser.add_argument('--points', type=int, default=MAX_POINTS, help='每个指标最多绘制的点数')
+    parser.add_argument('--output', type=str, help='保存为图片')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    recording = Recording(args.path)
+    loaded = time.perf_counter()
+    first, last = recording.time_range()
+    start = parse_time_argument(args.start) if args.start else first
+    end = parse_time_argument(args.end) if args.end else last
+    print(f"{len(recording)} 个样本，{len(recording.alerts)} 条告警，{len(recording.levels)} 级金字塔，"
+          f"加载 {loaded - start_time:.2f}s")
+
+    for metric, label in METRICS:
+        x, y = recording.query(metric, start, end, args.points)
+        if len(y):
+            print(f"{label}: 最小 {y.min():.1f}，最大 {y.max():.1f}（{len(y)} 个绘制点）")
+
+    if args.output:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(len(METRICS), 1, figsize=(12, 9), sharex=True)
+        for ax, (metric, label) in zip(axes, METRICS):
+            x, y = recording.query(metric, start, end, args.points)
+            ax.plot(to_plot_time(x), y, linewidth=0.8)
+            for alert_time, _ in recording.alerts_between(start, end):
+                ax.axvline(to_plot_time(alert_time), color='red', alpha=0.3, linewidth=0.8)
+            ax.set_title(label)
+            ax.xaxis_date()
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        fig.savefig(args.output)
+        print(f"已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# 系统资源采样
+# 在后台线程中按固定间隔采集 CPU、内存、磁盘使用率（可选各网卡流量），只保留最近一段时间的样本。
+# 可选地对每个样本求值告警规则（见 alerts.py），并把样本和告警逐行追加到 CSV 录制文件。
+#
+#   python monitor_sampler.py --record results/monitor.csv --rule "cpu > 90 for 30s" --rule "avg(memory, 5min) > 85"
+import argparse
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+from alerts import AlertEngine, DEFAULT_RULES
+
+CSV_HEADER = "时间,CPU使用率,内存使用率,磁盘使用率,告警\n"
+
+
+def format_csv_row(record):
+    # 同一时刻的多条告警用分号隔开写在最后一列
+    timestamp = datetime.fromtimestamp(record['time']).strftime("%Y-%m-%d %H:%M:%S")
+    alerts = '; '.join(alert.message for alert in record.get('alerts', ())).replace(',', '，')
+    return f"{timestamp},{record['cpu']},{record['memory']},{record['disk']},{alerts}\n"
+
+
+class MonitorSampler:
+    def __init__(self, interval=1.0, history=3600, disk_path='/', alerts=None, record_path=None, network=False):
+        # alerts 为 AlertEngine，record_path 为 CSV 录制文件，均可省略；network 为 True 时同时采集各网卡的累计流量
+        self.interval = interval
+        self.disk_path = disk_path
+        self.network = network
+        self.alerts = alerts
+        self.record_path = record_path
+        self._record_file = None
+        self._listeners = []
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, listener):
+        # listener(record) 在采样线程中调用，record['alerts'] 为本次触发或恢复的告警
+        self._listeners.append(listener)
+
+    def sample(self):
+        record = {
+            'time': time.time(),
+            'cpu': psutil.cpu_percent(),
+            'memory': psutil.virtual_memory().percent,
+            'disk': psutil.disk_usage(self.disk_path).percent,
+        }
+        if self.network:
+            record['network'] = psutil.net_io_counters(pernic=True)
+        if self.alerts is not None:
+            record['alerts'] = self.alerts.evaluate(record)
+        with self._lock:
+            self._samples.append(record)
+            if self._record_file is not None:
+                self._record_file.write(format_csv_row(record))
+        for listener in self._listeners:
+            listener(record)
+        return record
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+        with self._lock:
+            if self._record_file is not None:
+                self._record_file.close()
+                self._record_file = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if self.record_path and self._record_file is None:
+            # 行缓冲：每个样本立即落盘，进程意外退出也不会丢失已录制的告警
+            self._record_file = open(self.record_path, 'a', encoding='utf-8', buffering=1)
+            if self._record_file.tell() == 0:
+                self._record_file.write(CSV_HEADER)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=False):
+        # wait 为 True 时等待采样线程退出，录制文件随之关闭
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def samples(self, since=None):
+        with self._lock:
+            if since is None:
+                return list(self._samples)
+            return [record for record in self._samples if record['time'] > since]
+
+    def latest(self):
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def export_csv(self, path):
+        # 导出内存中保留的全部样本及其告警
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(CSV_HEADER)
+            for record in self.samples():
+                f.write(format_csv_row(record))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='后台采集系统资源使用率并按规则告警')
+    parser.add_argument('--interval', type=float, default=1.0, help='采样间隔（秒）')
+    parser.add_argument('--rule', action='append', metavar='规则',
+                        help=f"告警规则，可重复指定，默认为 {'、'.join(DEFAULT_RULES)}")
+    parser.add_argument('--record', type=str, metavar='文件', help='把样本和告警追加到 CSV 文件')
+    args = parser.parse_args()
+
+    sampler = MonitorSampler(interval=args.interval, alerts=AlertEngine(args.rule), record_path=args.record)
+
+    def print_alerts(record):
+        for alert in record['alerts']:
+            print(f"{datetime.fromtimestamp(alert.time):%H:%M:%S} {alert.message}", flush=True)
+
+    sampler.add_listener(print_alerts)
+    sampler.start()
+    try:
+        while sampler.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sampler.stop(wait=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,15 @@
 # 基础库导入
 import os
-import re
 import json
-import yaml
 import time
 import locale
+import socket
+import sys
 import threading
 import subprocess
 from datetime import datetime
 
 # 第三方库导入
-import chardet
-import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
 from filelock import FileLock
@@ -20,25 +18,63 @@ from filelock import FileLock
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
+from tkinter import filedialog
 
 # 在文件开头添加新的导入
-import psutil
-import venv
-import pkg_resources
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from threading import Event
 
+import tracing
+from collectors import session, invalidate_installed, apply_package_delta, ScanPipeline
+from watch_mode import InventoryWatcher, format_delta
+from integrity_check import verify_installed_files, format_report
+import interpreter_discovery
+import venv_templates
+import snapshot_diff
+import exporters
+from consistency_check import problems_to_dict
+from records import write_excel
+from monitor_sampler import MonitorSampler
+import monitor_history
+import system_packages
+from alerts import AlertEngine, DEFAULT_RULES
+
+# 主窗口结果视图中各数据源的显示名称
+SCAN_LABELS = {
+    'packages': 'Python库',
+    'requirements': 'requirements.txt',
+    'languages': '编程语言',
+    'frameworks': '前端框架',
+    'metadata_index': '元数据索引',
+    'distributions': '已安装分发包',
+    'analytics': '依赖分析',
+    'consistency': '依赖一致性检查',
+    'requirement_matches': '依赖匹配',
+}
+SCAN_STATUS = {'running': '进行中', 'ok': '完成', 'cached': '缓存', 'error': '失败', 'skipped': '跳过'}
+
 class PipListGUI:
     def __init__(self):
         # 设置matplotlib后端
         plt.switch_backend('Agg')
         self.VERSION = "1.0.0"
         self.monitor_running = False
+        self.monitor_sampler = None
+        self.save_directory = os.path.join(os.getcwd(), 'results')
+        os.makedirs(self.save_directory, exist_ok=True)
+        # 所有视图和导出共用同一个会话缓存
+        self.collector = session
+        self.watcher = None
+        # 主窗口当前的后台扫描
+        self.scan = None
+        self.scan_rows = {}
+        # 监视模式下收到增量时需要刷新的已打开窗口
+        self.inventory_views = []
         
         self.root = ttk.Window(
             title=f"piplist-GUI工具 v{self.VERSION}",
             themename="litera",
-            size=(800, 600),
+            size=(800, 760),
             position=(100, 50)
         )
         self.setup_gui()
@@ -49,30 +85,21 @@ class PipListGUI:
             # 清理之前的图形
             plt.close('all')
             
-            # 创建有向图
+            # 创建有向图，依赖关系直接取自分析索引，不再逐个调用 pip show
             G = nx.DiGraph()
-            packages = self.get_installed_packages()
+            analytics = self.get_dependency_analytics()
+            names = analytics.display_names
             
             # 用于存储依赖计数
             dep_count = {}
             
             # 收集依赖关系
-            for pkg in packages:
-                pkg_name = pkg[0]
-                dep_count[pkg_name] = 0
+            for key, deps in analytics.forward.items():
+                pkg_name = names[key]
+                dep_count[pkg_name] = len(analytics.reverse[key])
                 G.add_node(pkg_name)
-                
-                try:
-                    result = subprocess.run(['pip', 'show', pkg_name], stdout=subprocess.PIPE)
-                    output = result.stdout.decode('utf-8')
-                    requires = re.search(r'Requires: (.+)', output)
-                    if requires:
-                        deps = [d.strip() for d in requires.group(1).split(',') if d.strip()]
-                        for dep in deps:
-                            G.add_edge(pkg_name, dep)
-                            dep_count[dep] = dep_count.get(dep, 0) + 1
-                except Exception:
-                    continue
+                for dep in deps:
+                    G.add_edge(pkg_name, names[dep])
 
             # 创建图形
             fig = plt.figure(figsize=(20, 15))
@@ -129,10 +156,11 @@ class PipListGUI:
             
             # 保存图形
             file_path = os.path.join(self.save_directory, 'dependency_graph.png')
-            plt.savefig(file_path,
-                       dpi=300,
-                       bbox_inches='tight',
-                       pad_inches=0.5)
+            with tracing.write(file_path):
+                plt.savefig(file_path,
+                           dpi=300,
+                           bbox_inches='tight',
+                           pad_inches=0.5)
             
             # 清理资源
             plt.close(fig)
@@ -164,11 +192,21 @@ class PipListGUI:
         # 创建进度条
         self.progress_bar = ttk.Progressbar(
             self.main_frame,
-            mode='indeterminate',
+            mode='determinate',
             style='primary.Horizontal.TProgressbar'
         )
         self.progress_bar.pack(fill=X, padx=20, pady=10)
 
+        # 创建结果视图：每个数据源和输出文件的状态、耗时和结果
+        results_frame = ttk.LabelFrame(self.main_frame, text="查询结果", padding="10")
+        results_frame.pack(fill=BOTH, expand=YES, padx=20, pady=10)
+        columns = ("步骤", "状态", "耗时", "结果")
+        self.results_tree = ttk.Treeview(results_frame, columns=columns, show="headings", height=8)
+        for col, width in zip(columns, (160, 80, 80, 340)):
+            self.results_tree.heading(col, text=col)
+            self.results_tree.column(col, width=width)
+        self.results_tree.pack(fill=BOTH, expand=YES)
+
         # 创建状态栏
         self.status_bar = ttk.Label(
             self.root,
@@ -225,7 +263,12 @@ class PipListGUI:
         menubar.add_cascade(label="文件", menu=file_menu)
         file_menu.add_command(label="导出JSON", command=self.export_as_json)
         file_menu.add_command(label="导出YAML", command=self.export_as_yaml)
+        file_menu.add_command(label="导出NDJSON", command=lambda: self.export_as('ndjson'))
+        file_menu.add_command(label="导出二进制(msgpack)", command=lambda: self.export_as('msgpack'))
         file_menu.add_command(label="生成依赖图", command=self.generate_dependency_graph)
+        file_menu.add_command(label="导出跟踪数据", command=self.export_trace)
+        file_menu.add_command(label="快照对比", command=self.compare_snapshots_window)
+        file_menu.add_command(label="刷新数据", command=self.refresh_data)
         file_menu.add_separator()
         file_menu.add_command(label="退出", command=self.root.quit)
 
@@ -233,9 +276,12 @@ class PipListGUI:
         tools_menu = ttk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="工具", menu=tools_menu)
         tools_menu.add_command(label="包管理", command=self.open_package_manager)
+        tools_menu.add_command(label="依赖分析", command=self.dependency_analytics_window)
+        tools_menu.add_command(label="监视模式（开/关）", command=self.toggle_watch_mode)
         tools_menu.add_command(label="虚拟环境管理", command=self.manage_venv)
         tools_menu.add_command(label="安全检查", command=self.security_check)
         tools_menu.add_command(label="性能监控", command=self.performance_monitor)
+        tools_menu.add_command(label="监控历史", command=self.history_viewer)
 
     def show_message(self, title, message, message_type="info"):
         if message_type == "info":
@@ -246,448 +292,272 @@ class PipListGUI:
             Messagebox.show_warning(message, title)
 
     # 数据处理方法
-    def get_installed_packages(self):
-        result = subprocess.run(['pip', 'list'], stdout=subprocess.PIPE)
-        packages = result.stdout.decode('utf-8').split('\n')[2:]
-        return [package.split() for package in packages if package]
-
-    def get_requirements_packages(self, file_path='requirements.txt'):
-        try:
-            with open(file_path, 'rb') as file:
-                raw_data = file.read()
-                encoding = chardet.detect(raw_data)['encoding']
-
-            with open(file_path, 'r', encoding=encoding) as file:
-                requirements = file.readlines()
-
-            return [re.sub(r'\s+', ' ', line.strip()).split('==') 
-                   for line in requirements if line.strip()]
-        except FileNotFoundError:
-            return []
-
-    def get_language_version(self, command, pattern):
-        try:
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            output = result.stdout.decode('utf-8').strip()
-            match = re.search(pattern, output)
-            return match.group(1) if match else "版本信息未找到"
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return "版本信息未找到"
-
-    def get_installed_languages(self):
-        languages = []
-        language_configs = [
-            (['python', '--version'], r'Python (\d+\.\d+\.\d+)', 'Python'),
-            (['java', '-version'], r'version "(\d+\.\d+\.\d+_\d+)"', 'Java'),
-            (['node', '--version'], r'v(\d+\.\d+\.\d+)', 'Node.js'),
-            # ... 其他语言配置
-        ]
-
-        for command, pattern, name in language_configs:
-            version = self.get_language_version(command, pattern)
-            languages.append([name, version])
-
-        return languages
-
-    def get_installed_front_end_frameworks(self):
-        frameworks = []
-        framework_configs = [
-            (['npm', 'list', '-g', 'vue-cli'], r'vue-cli@(\d+\.\d+\.\d+)', 'Vue.js'),
-            (['npm', 'list', '-g', 'create-react-app'], r'create-react-app@(\d+\.\d+\.\d+)', 'React.js'),
-            (['npm', 'list', '-g', '@angular/cli'], r'@angular/cli@(\d+\.\d+\.\d+)', 'Angular'),
-            # ... 其他框架配置
-        ]
-
-        for command, pattern, name in framework_configs:
-            version = self.get_language_version(command, pattern)
-            frameworks.append([name, version])
-
-        return frameworks
-
-    def save_to_excel(self, package_list, languages, frameworks, requirements, selected_option='all'):
+    def scan_outputs(self, selected_option='all'):
+        # 返回 [(文件名, 依赖的数据源, 写出函数)]，每个文件在它需要的数据就绪后立即写出
         os.makedirs(self.save_directory, exist_ok=True)
-    
+
         data_configs = {
-            'languages': ('编程语言.xlsx', ['编程语言', '版本号'], languages),
-            'packages': ('Python库.xlsx', ['包名', '版本号'], package_list),
-            'frameworks': ('前端框架.xlsx', ['前端框架', '版本号'], frameworks),
-            'requirements': ('依赖匹配.xlsx', ['包名', '要求版本', '已安装版本', '是否匹配'], self._process_requirements(package_list, requirements))
+            'languages': ('编程语言.xlsx', ['编程语言', '版本号'], 'languages'),
+            'packages': ('Python库.xlsx', ['包名', '版本号', '可编辑安装位置'], 'packages'),
+            'frameworks': ('前端框架.xlsx', ['前端框架', '版本号'], 'frameworks'),
+            'requirements': ('依赖匹配.xlsx', ['包名', '要求版本', '已安装版本', '是否匹配'], 'requirement_matches'),
+            'consistency': ('依赖冲突.xlsx', ['包名', '版本号', '依赖', '要求版本', '已安装版本', '问题类型'], 'consistency')
         }
-    
-        for key, (filename, columns, data) in data_configs.items():
-            if selected_option in ['all', key]:
+
+        def excel_writer(file_path, columns):
+            def write(data):
+                with FileLock('lock'), tracing.write(file_path):
+                    write_excel(file_path, data, columns)
+                return file_path
+            return write
+
+        outputs = []
+        for key, (filename, columns, source) in data_configs.items():
+            # 依赖冲突检查随依赖匹配一起输出
+            if selected_option in ['all', key] or (key == 'consistency' and selected_option == 'requirements'):
                 file_path = os.path.join(self.save_directory, filename)
-                with FileLock('lock'):
-                    pd.DataFrame(data, columns=columns).to_excel(file_path, index=False)
+                outputs.append((filename, [source], excel_writer(file_path, columns)))
+
+        if selected_option == 'all':
+            def write_json(*data):
+                file_path = os.path.join(self.save_directory, 'export.json')
+                with tracing.write(file_path):
+                    exporters.write_json(self.get_export_data(), file_path)
+                return file_path
+            outputs.append(('export.json', ['packages', 'languages', 'frameworks', 'analytics', 'consistency'],
+                            write_json))
+        return outputs
 
-    def export_as_json(self):
+    # 事件处理方法
+    def on_select(self):
+        if self.scan is not None and self.scan.running():
+            self.status_bar.config(text="上一次查询尚未完成")
+            return
+
+        selected_option = self.option_var.get()
+        tracing.tracer.clear()
+        self.scan = ScanPipeline([], self.scan_outputs(selected_option), self.collector)
+
+        # 每个数据源和输出文件各占一行，完成后立即更新
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.scan_rows = {}
+        for stage, names in (('collect', self.scan.names), ('output', [output[0] for output in self.scan.outputs])):
+            for name in names:
+                label = SCAN_LABELS.get(name, name)
+                self.scan_rows[(stage, name)] = self.results_tree.insert(
+                    "", END, values=(label, "等待", "", ""))
+        self.progress_bar.config(mode='determinate', maximum=len(self.scan_rows), value=0)
+        self.status_bar.config(text="正在处理...")
+
+        self.scan.add_listener(lambda *event: self.root.after(0, self.on_scan_event, *event))
+        self.scan.start()
+
+    def on_scan_event(self, stage, name, status, elapsed, value):
+        # 在主线程中执行：更新结果视图中对应的一行
+        if stage == 'scan':
+            failed = sorted(SCAN_LABELS.get(item, item) for item in self.scan.failed)
+            self.status_bar.config(text=f"完成，用时 {elapsed:.2f}s | 最慢: {tracing.tracer.summary(3)}")
+            if failed:
+                self.show_message("错误", f"以下步骤失败: {'，'.join(failed)}", "error")
+            return
+
+        if status == 'error':
+            detail = str(value)
+        elif status == 'skipped':
+            detail = "所需数据采集失败"
+        elif stage == 'output' and value:
+            detail = os.path.basename(value)
+        elif hasattr(value, '__len__'):
+            detail = f"{len(value)} 条"
+        else:
+            detail = ""
+        row = self.scan_rows[(stage, name)]
+        duration = "" if status == 'running' else f"{elapsed * 1000:.0f}ms"
+        self.results_tree.item(row, values=(SCAN_LABELS.get(name, name), SCAN_STATUS[status], duration, detail))
+        if status != 'running':
+            self.progress_bar.config(value=self.progress_bar['value'] + 1)
+
+    def get_export_data(self):
+        data = {'host': socket.gethostname(), 'exported_at': datetime.now().isoformat(timespec='seconds')}
+        data.update(self.collector.snapshot(['packages', 'languages', 'frameworks']))
+        data['dependency_analytics'] = self.collector.get('analytics').to_dict()
+        data['consistency'] = problems_to_dict(self.collector.get('consistency'))
+        return data
+
+    def export_as(self, fmt):
+        # 逐条流式写出，大型导出时内存占用不随数据量增长
         try:
-            data = {
-                'packages': self.get_installed_packages(),
-                'languages': self.get_installed_languages(),
-                'frameworks': self.get_installed_front_end_frameworks()
-            }
-            file_path = os.path.join(self.save_directory, 'export.json')
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            self.show_message("成功", f"数据已导出到桌面: {os.path.basename(file_path)}")
+            file_name, writer = exporters.EXPORTERS[fmt]
+            file_path = os.path.join(self.save_directory, file_name)
+            with tracing.write(file_path):
+                writer(self.get_export_data(), file_path)
+            self.show_message("成功", f"数据已导出为{fmt.upper()}格式")
         except Exception as e:
             self.show_message("错误", f"导出失败: {str(e)}", "error")
 
+    def export_as_json(self):
+        self.export_as('json')
+
     def export_as_yaml(self):
-        try:
-            data = {
-                'packages': self.get_installed_packages(),
-                'languages': self.get_installed_languages(),
-                'frameworks': self.get_installed_front_end_frameworks()
-            }
-            file_path = os.path.join(self.save_directory, 'export.yaml')
-            with open(file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(data, f, allow_unicode=True, sort_keys=False)
-            self.show_message("成功", f"数据已导出到桌面: {os.path.basename(file_path)}")
-        except Exception as e:
-            self.show_message("错误", f"导出失败: {str(e)}", "error")
+        self.export_as('yaml')
 
-    def generate_dependency_graph(self):
-        try:
-            # 清理之前的图形
-            plt.close('all')
-            
-            # 创建有向图
-            G = nx.DiGraph()
-            packages = self.get_installed_packages()
-            
-            # 用于存储依赖计数
-            dep_count = {}
-            
-            # 收集依赖关系
-            for pkg in packages:
-                pkg_name = pkg[0]
-                dep_count[pkg_name] = 0
-                G.add_node(pkg_name)
-                
-                try:
-                    result = subprocess.run(['pip', 'show', pkg_name], stdout=subprocess.PIPE)
-                    output = result.stdout.decode('utf-8')
-                    requires = re.search(r'Requires: (.+)', output)
-                    if requires:
-                        deps = [d.strip() for d in requires.group(1).split(',') if d.strip()]
-                        for dep in deps:
-                            G.add_edge(pkg_name, dep)
-                            dep_count[dep] = dep_count.get(dep, 0) + 1
-                except Exception:
-                    continue
+    def refresh_data(self):
+        self.collector.invalidate()
+        self.status_bar.config(text="缓存已清空，下次查询将重新采集")
 
-            # 创建图形
-            fig = plt.figure(figsize=(20, 15))
-            
-            # 使用spring_layout布局，增加节点间距
-            pos = nx.spring_layout(G, k=2.5, iterations=150, seed=42)
-            
-            # 计算节点大小（基于依赖数量）
-            node_sizes = [1000 + (dep_count.get(node, 0) * 100) for node in G.nodes()]
-            
-            # 计算节点颜色（基于依赖数量）
-            node_colors = [dep_count.get(node, 0) for node in G.nodes()]
-            
-            # 绘制节点
-            nodes = nx.draw_networkx_nodes(G, pos,
-                                         node_size=node_sizes,
-                                         node_color=node_colors,
-                                         cmap=plt.cm.YlOrRd,
-                                         alpha=0.7)
-            
-            # 绘制边
-            nx.draw_networkx_edges(G, pos,
-                                 edge_color='lightgray',
-                                 arrows=True,
-                                 arrowsize=10,
-                                 alpha=0.3,
-                                 min_source_margin=20,
-                                 min_target_margin=20)
-            
-            # 优化标签显示
-            labels = {node: node for node in G.nodes()}
-            label_pos = {k: (v[0], v[1] + 0.08) for k, v in pos.items()}  # 将标签位置略微上移
-            nx.draw_networkx_labels(G, label_pos,
-                                  labels=labels,
-                                  font_size=8,
-                                  font_family='sans-serif',
-                                  bbox=dict(facecolor='white', 
-                                          edgecolor='none', 
-                                          alpha=0.7,
-                                          pad=0.5))
-            
-            # 删除重复的标签绘制代码，只保留一次
-            nx.draw_networkx_labels(G, label_pos,
-                                  labels=labels,
-                                  font_size=8,
-                                  font_family='sans-serif',
-                                  bbox=dict(facecolor='white', 
-                                          edgecolor='none', 
-                                          alpha=0.7,
-                                          pad=0.5))
-            
-            # 保存前确保设置了正确的布局
-            plt.tight_layout()
-            
-            # 保存图形
-            file_path = os.path.join(self.save_directory, 'dependency_graph.png')
-            plt.savefig(file_path,
-                       dpi=300,
-                       bbox_inches='tight',
-                       pad_inches=0.5)
-            
-            # 清理资源
-            plt.close(fig)
-            
-            self.show_message("成功", "依赖关系图已生成，节点大小和颜色深浅表示被依赖的次数")
+    def export_trace(self):
+        try:
+            file_path = os.path.join(self.save_directory, 'trace.json')
+            tracing.tracer.export_chrome_trace(file_path)
+            self.status_bar.config(text=f"最慢: {tracing.tracer.summary(3)}")
+            self.show_message("成功", f"跟踪数据已导出: {os.path.basename(file_path)}，可在 chrome://tracing 中打开")
         except Exception as e:
-            self.show_message("错误", f"生成依赖图失败: {str(e)}", "error")
-
-    def setup_gui(self):
-        # 创建主框架
-        self.main_frame = ttk.Frame(self.root, padding="20")
-        self.main_frame.pack(fill=BOTH, expand=YES)
-
-        # 创建标题
-        title_label = ttk.Label(
-            self.main_frame,
-            text="Python环境管理工具",
-            font=("Microsoft YaHei UI", 16, "bold")
-        )
-        title_label.pack(pady=10)
-
-        # 创建选项变量和选项框
-        self.option_var = ttk.StringVar(value='all')
-        self.create_options_frame()
-
-        # 创建按钮
-        self.create_button_frame()
-
-        # 创建进度条
-        self.progress_bar = ttk.Progressbar(
-            self.main_frame,
-            mode='indeterminate',
-            style='primary.Horizontal.TProgressbar'
-        )
-        self.progress_bar.pack(fill=X, padx=20, pady=10)
-
-        # 创建状态栏
-        self.status_bar = ttk.Label(
-            self.root,
-            text="就绪",
-            relief=SUNKEN,
-            padding=(10, 5)
-        )
-        self.status_bar.pack(side=BOTTOM, fill=X)
-
-    def create_options_frame(self):
-        options_frame = ttk.LabelFrame(
-            self.main_frame,
-            text="选择检测类型",
-            padding="10"
-        )
-        options_frame.pack(fill=X, padx=20, pady=10)
-
-        options = [
-            ("所有信息 (all)", 'all'),
-            ("编程语言信息 (languages)", 'languages'),
-            ("Python库信息 (packages)", 'packages'),
-            ("前端框架信息 (frameworks)", 'frameworks'),
-            ("依赖匹配信息 (requirements)", 'requirements')
-        ]
-
-        for text, value in options:
-            ttk.Radiobutton(
-                options_frame,
-                text=text,
-                variable=self.option_var,
-                value=value,
-                style='primary'
-            ).pack(anchor=W, pady=5)
-
-    def create_button_frame(self):
-        button_frame = ttk.Frame(self.main_frame)
-        button_frame.pack(pady=20)
-
-        submit_button = ttk.Button(
-            button_frame,
-            text="查询并保存信息",
-            command=self.on_select,
-            style='primary.TButton',
-            width=20
-        )
-        submit_button.pack(side=LEFT, padx=5)
-
-    def create_menu(self):
-        menubar = ttk.Menu(self.root)
-        self.root.config(menu=menubar)
-
-        # 文件菜单
-        file_menu = ttk.Menu(menubar, tearoff=0)
-        menubar.add_cascade(label="文件", menu=file_menu)
-        file_menu.add_command(label="导出JSON", command=self.export_as_json)
-        file_menu.add_command(label="导出YAML", command=self.export_as_yaml)
-        file_menu.add_command(label="生成依赖图", command=self.generate_dependency_graph)
-        file_menu.add_separator()
-        file_menu.add_command(label="退出", command=self.root.quit)
-
-        # 工具菜单
-        tools_menu = ttk.Menu(menubar, tearoff=0)
-        menubar.add_cascade(label="工具", menu=tools_menu)
-        tools_menu.add_command(label="包管理", command=self.open_package_manager)
-        tools_menu.add_command(label="虚拟环境管理", command=self.manage_venv)
-        tools_menu.add_command(label="安全检查", command=self.security_check)
-        tools_menu.add_command(label="性能监控", command=self.performance_monitor)
+            self.show_message("错误", f"导出失败: {str(e)}", "error")
 
-    def show_message(self, title, message, message_type="info"):
-        if message_type == "info":
-            Messagebox.show_info(message, title)
-        elif message_type == "error":
-            Messagebox.show_error(message, title)
-        elif message_type == "warning":
-            Messagebox.show_warning(message, title)
+    def toggle_watch_mode(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.status_bar.config(text="监视模式已关闭")
+            return
+
+        # 已有导出快照时同步更新它
+        snapshot_path = os.path.join(self.save_directory, 'export.json')
+        self.watcher = InventoryWatcher(snapshot_path=snapshot_path if os.path.exists(snapshot_path) else None)
+        self.watcher.add_listener(
+            lambda delta, inventory: self.root.after(0, self.on_inventory_delta, delta))
+        self.watcher.start()
+        mode = '文件系统事件' if self.watcher.use_events else 'mtime 轮询'
+        self.status_bar.config(text=f"监视模式已开启（{mode}，{len(self.watcher.directories)} 个目录）")
+
+    def on_inventory_delta(self, delta):
+        # 在主线程中执行：更新缓存中的包列表并刷新已打开的窗口
+        apply_package_delta(delta)
+        lines = format_delta(delta)
+        self.status_bar.config(text=f"检测到 {len(lines)} 项变化: {'，'.join(lines[:3])}{' ...' if len(lines) > 3 else ''}")
+        for refresh_view in list(self.inventory_views):
+            refresh_view()
+
+    def compare_snapshots_window(self):
+        diff_window = ttk.Toplevel(self.root)
+        diff_window.title("快照对比")
+        diff_window.geometry("800x600")
+
+        # 快照可以是导出的 JSON/YAML 文件、虚拟环境目录，或 live 表示当前环境
+        form_frame = ttk.Frame(diff_window)
+        form_frame.pack(fill=X, padx=10, pady=5)
+        old_var = ttk.StringVar(value=os.path.join(self.save_directory, 'export.json'))
+        new_var = ttk.StringVar(value=snapshot_diff.LIVE)
+        graph_var = ttk.BooleanVar(value=True)
+
+        for row, (label, var) in enumerate((("旧快照:", old_var), ("新快照:", new_var))):
+            ttk.Label(form_frame, text=label).grid(row=row, column=0, padx=5, pady=5)
+            ttk.Entry(form_frame, textvariable=var, width=70).grid(row=row, column=1, padx=5, pady=5)
+            ttk.Button(form_frame, text="浏览",
+                       command=lambda var=var: var.set(filedialog.askopenfilename(
+                           filetypes=[("快照", "*.json *.ndjson *.yaml *.yml")]) or var.get())).grid(row=row, column=2, padx=5)
+        ttk.Checkbutton(form_frame, text="对比依赖关系", variable=graph_var).grid(row=2, column=1, sticky=W, padx=5)
+
+        text_area = ttk.Text(diff_window)
+        text_area.pack(fill=BOTH, expand=YES, padx=10, pady=5)
 
-    # 数据处理方法
-    def get_installed_packages(self):
-        result = subprocess.run(['pip', 'list'], stdout=subprocess.PIPE)
-        packages = result.stdout.decode('utf-8').split('\n')[2:]
-        return [package.split() for package in packages if package]
+        def load(source, graph):
+            # 当前环境直接复用缓存中的元数据
+            if source == snapshot_diff.LIVE:
+                return snapshot_diff.snapshot_from_distributions(self.collector.get('distributions'), '当前环境', graph)
+            return snapshot_diff.load_snapshot(source, graph)
 
-    def get_requirements_packages(self, file_path='requirements.txt'):
-        try:
-            with open(file_path, 'rb') as file:
-                raw_data = file.read()
-                encoding = chardet.detect(raw_data)['encoding']
+        def compare():
+            try:
+                graph = graph_var.get()
+                with tracing.span('snapshot_diff', 'diff'):
+                    delta = snapshot_diff.diff_snapshots(load(old_var.get().strip(), graph),
+                                                         load(new_var.get().strip(), graph), graph)
+                text_area.delete(1.0, END)
+                text_area.insert(END, '\n'.join(snapshot_diff.format_delta(delta)))
+                snapshot_diff.save_delta(delta, os.path.join(self.save_directory, 'snapshot_diff.json'))
+                snapshot_diff.save_delta(delta, os.path.join(self.save_directory, 'snapshot_diff.xlsx'))
+                self.status_bar.config(text="差异报告已保存到 snapshot_diff.json / snapshot_diff.xlsx")
+            except Exception as e:
+                self.show_message("错误", f"对比失败: {str(e)}", "error")
 
-            with open(file_path, 'r', encoding=encoding) as file:
-                requirements = file.readlines()
+        ttk.Button(form_frame, text="对比", command=compare).grid(row=2, column=2, padx=5, pady=5)
 
-            return [re.sub(r'\s+', ' ', line.strip()).split('==') 
-                   for line in requirements if line.strip()]
-        except FileNotFoundError:
-            return []
+    def get_dependency_analytics(self, refresh=False):
+        # 每个快照只构建一次索引，窗口内的查询都复用它
+        if refresh:
+            invalidate_installed()
+        return self.collector.get('analytics')
 
-    def get_language_version(self, command, pattern):
-        try:
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            output = result.stdout.decode('utf-8').strip()
-            match = re.search(pattern, output)
-            return match.group(1) if match else "版本信息未找到"
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return "版本信息未找到"
-
-    def get_installed_languages(self):
-        languages = []
-        language_configs = [
-            (['python', '--version'], r'Python (\d+\.\d+\.\d+)', 'Python'),
-            (['java', '-version'], r'version "(\d+\.\d+\.\d+_\d+)"', 'Java'),
-            (['node', '--version'], r'v(\d+\.\d+\.\d+)', 'Node.js'),
-            # ... 其他语言配置
-        ]
+    def dependency_analytics_window(self):
+        analytics_window = ttk.Toplevel(self.root)
+        analytics_window.title("依赖分析")
+        analytics_window.geometry("800x600")
 
-        for command, pattern, name in language_configs:
-            version = self.get_language_version(command, pattern)
-            languages.append([name, version])
+        # 创建查询框架
+        query_frame = ttk.Frame(analytics_window)
+        query_frame.pack(fill=X, padx=10, pady=5)
 
-        return languages
+        ttk.Label(query_frame, text="包名:").pack(side=LEFT, padx=5)
+        name_var = ttk.StringVar()
+        ttk.Entry(query_frame, textvariable=name_var).pack(side=LEFT, fill=X, expand=YES)
 
-    def get_installed_front_end_frameworks(self):
-        frameworks = []
-        framework_configs = [
-            (['npm', 'list', '-g', 'vue-cli'], r'vue-cli@(\d+\.\d+\.\d+)', 'Vue.js'),
-            (['npm', 'list', '-g', 'create-react-app'], r'create-react-app@(\d+\.\d+\.\d+)', 'React.js'),
-            (['npm', 'list', '-g', '@angular/cli'], r'@angular/cli@(\d+\.\d+\.\d+)', 'Angular'),
-            # ... 其他框架配置
-        ]
+        # 创建结果显示区域
+        text_area = ttk.Text(analytics_window)
+        text_area.pack(fill=BOTH, expand=YES, padx=10, pady=5)
 
-        for command, pattern, name in framework_configs:
-            version = self.get_language_version(command, pattern)
-            frameworks.append([name, version])
+        scrollbar = ttk.Scrollbar(text_area, orient="vertical", command=text_area.yview)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        text_area.configure(yscrollcommand=scrollbar.set)
 
-        return frameworks
+        def show_lines(title, items):
+            text_area.delete(1.0, END)
+            text_area.insert(END, f"{title} ({len(items)})\n\n")
+            for item in items:
+                text_area.insert(END, f"{item}\n")
+
+        def query_package(method, title):
+            name = name_var.get().strip()
+            if not name:
+                return
+            try:
+                show_lines(title.format(name), method(name))
+            except KeyError as e:
+                self.show_message("错误", e.args[0], "error")
 
-    def save_to_excel(self, package_list, languages, frameworks, requirements, selected_option='all'):
-        save_directory = os.path.join(os.getcwd(), 'results')
-        os.makedirs(save_directory, exist_ok=True)
-    
-        data_configs = {
-            'languages': ('编程语言.xlsx', ['编程语言', '版本号'], languages),
-            'packages': ('Python库.xlsx', ['包名', '版本号'], package_list),
-            'frameworks': ('前端框架.xlsx', ['前端框架', '版本号'], frameworks),
-            'requirements': ('依赖匹配.xlsx', ['包名', '要求版本', '已安装版本', '是否匹配'], self._process_requirements(package_list, requirements))
-        }
-    
-        for key, (filename, columns, data) in data_configs.items():
-            if selected_option in ['all', key]:
-                file_path = os.path.join(save_directory, filename)
-                with FileLock('lock'):
-                    pd.DataFrame(data, columns=columns).to_excel(file_path, index=False)
-
-    def _process_requirements(self, package_list, requirements):
-        installed_packages_dict = {package[0]: package[1] for package in package_list}
-        matched_requirements = []
-        for req in requirements:
-            package_name = req[0]
-            req_version = req[1] if len(req) > 1 else '未指定版本'
-            installed_version = installed_packages_dict.get(package_name, '未安装')
-            matched_requirements.append(
-                [package_name, req_version, installed_version, req_version == installed_version]
-            )
-        return matched_requirements
+        def show_orphans():
+            show_lines("孤立包（未被任何包依赖）", self.get_dependency_analytics().to_dict()['orphans'])
 
-    # 事件处理方法
-    def on_select(self):
-        try:
-            self.progress_bar.start(10)
-            self.status_bar.config(text="正在处理...")
-            
-            selected_option = self.option_var.get()
-            packages = self.get_installed_packages()
-            requirements = self.get_requirements_packages()
-            languages = self.get_installed_languages()
-            frameworks = self.get_installed_front_end_frameworks()
+        def show_leaves():
+            show_lines("叶子包（不依赖其他包）", self.get_dependency_analytics().to_dict()['leaves'])
 
-            self.save_to_excel(packages, languages, frameworks, requirements, selected_option)
-            
-            self.progress_bar.stop()
-            self.status_bar.config(text="就绪")
-            self.show_message("成功", "信息已成功保存到 results 目录")
-        except Exception as e:
-            self.progress_bar.stop()
-            self.status_bar.config(text="出错")
-            self.show_message("错误", str(e), "error")
+        def show_cycles():
+            cycles = self.get_dependency_analytics().to_dict()['strongly_connected_components']
+            show_lines("循环依赖", [' <-> '.join(component) for component in cycles])
 
-    def export_as_json(self):
-        try:
-            data = {
-                'packages': self.get_installed_packages(),
-                'languages': self.get_installed_languages(),
-                'frameworks': self.get_installed_front_end_frameworks()
-            }
-            save_directory = os.path.join(os.getcwd(), 'results')
-            os.makedirs(save_directory, exist_ok=True)
-            with open(os.path.join(save_directory, 'export.json'), 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            self.show_message("成功", "数据已导出为JSON格式")
-        except Exception as e:
-            self.show_message("错误", f"导出失败: {str(e)}", "error")
+        def refresh():
+            self.get_dependency_analytics(refresh=True)
+            self.status_bar.config(text="依赖分析索引已刷新")
 
-    def export_as_yaml(self):
-        try:
-            data = {
-                'packages': self.get_installed_packages(),
-                'languages': self.get_installed_languages(),
-                'frameworks': self.get_installed_front_end_frameworks()
-            }
-            save_directory = os.path.join(os.getcwd(), 'results')
-            os.makedirs(save_directory, exist_ok=True)
-            with open(os.path.join(save_directory, 'export.yaml'), 'w', encoding='utf-8') as f:
-                yaml.dump(data, f, allow_unicode=True, sort_keys=False)
-            self.show_message("成功", "数据已导出为YAML格式")
-        except Exception as e:
-            self.show_message("错误", f"导出失败: {str(e)}", "error")
+        analytics = self.get_dependency_analytics()
+        button_frame = ttk.Frame(analytics_window)
+        button_frame.pack(fill=X, padx=10, pady=5)
+        ttk.Button(button_frame, text="谁引入了它",
+                  command=lambda: query_package(self.get_dependency_analytics().pulled_in_by,
+                                               "引入 {} 的包")).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="它依赖什么",
+                  command=lambda: query_package(self.get_dependency_analytics().requires_all,
+                                               "{} 的全部依赖")).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="卸载影响",
+                  command=lambda: query_package(self.get_dependency_analytics().removable_with,
+                                               "卸载 {} 后可一并删除")).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="孤立包", command=show_orphans).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="叶子包", command=show_leaves).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="循环依赖", command=show_cycles).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="刷新索引", command=refresh).pack(side=LEFT, padx=5)
+
+        text_area.insert(END, f"已索引 {len(analytics.forward)} 个包，"
+                              f"发现 {len(analytics.cycles)} 组循环依赖\n")
 
     def open_package_manager(self):
         package_window = ttk.Toplevel(self.root)
@@ -706,12 +576,12 @@ class PipListGUI:
         list_frame = ttk.Frame(package_window)
         list_frame.pack(fill=BOTH, expand=YES, padx=10, pady=5)
         
-        columns = ("包名", "当前版本", "最新版本", "状态")
+        columns = ("包名", "当前版本", "最新版本", "状态", "简介")
         tree = ttk.Treeview(list_frame, columns=columns, show="headings")
         
         for col in columns:
             tree.heading(col, text=col)
-            tree.column(col, width=150)
+            tree.column(col, width=300 if col == "简介" else 110)
 
         scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
         scrollbar.pack(side=RIGHT, fill=Y)
@@ -719,11 +589,13 @@ class PipListGUI:
         tree.pack(fill=BOTH, expand=YES)
 
         def search_packages():
-            query = search_var.get().lower()
+            # 在元数据索引中按名称、简介和详细说明全文检索
+            query = search_var.get()
             tree.delete(*tree.get_children())
-            for dist in pkg_resources.working_set:
-                if query in dist.key.lower():
-                    tree.insert("", END, values=(dist.key, dist.version, "获取中...", "已安装"))
+            index = self.collector.get('metadata_index')
+            results = index.search(query, limit=500) if query.strip() else index.distributions()
+            for dist in results:
+                tree.insert("", END, values=(dist.name, dist.version, "获取中...", "已安装", dist.summary))
 
         def install_package():
             selected = tree.selection()
@@ -731,6 +603,7 @@ class PipListGUI:
                 pkg_name = tree.item(selected[0])['values'][0]
                 try:
                     subprocess.run(['pip', 'install', '--upgrade', pkg_name], check=True)
+                    invalidate_installed()
                     self.show_message("成功", f"包 {pkg_name} 安装/更新成功")
                     search_packages()
                 except subprocess.CalledProcessError as e:
@@ -743,6 +616,7 @@ class PipListGUI:
                 if Messagebox.show_question(f"确定要卸载 {pkg_name} 吗?", "确认卸载") == "是":
                     try:
                         subprocess.run(['pip', 'uninstall', '-y', pkg_name], check=True)
+                        invalidate_installed()
                         self.show_message("成功", f"包 {pkg_name} 已卸载")
                         search_packages()
                     except subprocess.CalledProcessError as e:
@@ -751,9 +625,18 @@ class PipListGUI:
         button_frame = ttk.Frame(package_window)
         button_frame.pack(fill=X, padx=10, pady=5)
         ttk.Button(button_frame, text="搜索", command=search_packages).pack(side=LEFT, padx=5)
+        search_entry.bind("<Return>", lambda event: search_packages())
         ttk.Button(button_frame, text="安装/更新", command=install_package).pack(side=LEFT, padx=5)
         ttk.Button(button_frame, text="卸载", command=uninstall_package).pack(side=LEFT, padx=5)
 
+        # 监视模式下包有变化时自动刷新列表
+        def on_close(event):
+            if event.widget is package_window and search_packages in self.inventory_views:
+                self.inventory_views.remove(search_packages)
+
+        self.inventory_views.append(search_packages)
+        package_window.bind("<Destroy>", on_close)
+
         # 初始加载所有包
         search_packages()
 
@@ -767,14 +650,22 @@ class PipListGUI:
         create_frame.pack(fill=X, padx=10, pady=5)
 
         name_var = ttk.StringVar()
-        python_var = ttk.StringVar(value="3.8")
+        current_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+        python_var = ttk.StringVar(value=current_version)
+        wheelhouse_var = ttk.StringVar()
 
         ttk.Label(create_frame, text="环境名称:").grid(row=0, column=0, padx=5, pady=5)
         ttk.Entry(create_frame, textvariable=name_var).grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(create_frame, text="Python版本:").grid(row=1, column=0, padx=5, pady=5)
-        ttk.Combobox(create_frame, textvariable=python_var, 
-                    values=["3.7", "3.8", "3.9", "3.10"]).grid(row=1, column=1, padx=5, pady=5)
+        # 列出本机发现的解释器（有缓存时无需运行任何解释器），也可以直接输入版本号或解释器路径
+        interpreters = {f"{item['version']} ({item['source']}) {item['path']}": item['path']
+                        for item in interpreter_discovery.discover_interpreters()}
+        ttk.Combobox(create_frame, textvariable=python_var, width=50,
+                    values=list(interpreters)).grid(row=1, column=1, padx=5, pady=5)
+
+        ttk.Label(create_frame, text="本地wheel目录(可选):").grid(row=2, column=0, padx=5, pady=5)
+        ttk.Entry(create_frame, textvariable=wheelhouse_var).grid(row=2, column=1, padx=5, pady=5)
 
         # 显示现有虚拟环境列表
         list_frame = ttk.LabelFrame(venv_window, text="现有环境", padding=10)
@@ -794,14 +685,30 @@ class PipListGUI:
 
         def create_venv():
             name = name_var.get()
-            if name:
+            if not name:
+                return
+            version = python_var.get().strip()
+            wheelhouse = wheelhouse_var.get().strip() or None
+
+            # 首次使用某个版本时需要构建模板（运行一次 ensurepip），放到后台线程避免界面卡住
+            def worker():
                 try:
                     venv_path = os.path.join(os.getcwd(), "venvs", name)
-                    venv.create(venv_path, with_pip=True)
-                    self.show_message("成功", f"虚拟环境 {name} 创建成功")
-                    refresh_venvs()
+                    if version in interpreters:
+                        python_exe = interpreters[version]
+                    elif os.path.isfile(version):
+                        python_exe = version
+                    else:
+                        python_exe = venv_templates.find_interpreter(version)
+                    venv_templates.create_venv(venv_path, python_exe, wheelhouse)
+                    venv_window.after(0, lambda: (self.show_message("成功", f"虚拟环境 {name} 创建成功"),
+                                                  refresh_venvs()))
                 except Exception as e:
-                    self.show_message("错误", f"创建失败: {str(e)}", "error")
+                    error = str(e)
+                    venv_window.after(0, lambda: self.show_message("错误", f"创建失败: {error}", "error"))
+
+            self.status_bar.config(text=f"正在创建虚拟环境 {name}...")
+            threading.Thread(target=worker, daemon=True).start()
 
         def refresh_venvs():
             tree.delete(*tree.get_children())
@@ -809,15 +716,15 @@ class PipListGUI:
             if os.path.exists(venvs_dir):
                 for venv_name in os.listdir(venvs_dir):
                     venv_path = os.path.join(venvs_dir, venv_name)
-                    if os.path.isdir(venv_path):
-                        python_path = os.path.join(venv_path, "Scripts", "python.exe")
+                    # .templates 等隐藏目录是内部使用的模板
+                    if os.path.isdir(venv_path) and not venv_name.startswith('.'):
+                        python_path = venv_templates.venv_python(venv_path)
                         if os.path.exists(python_path):
-                            try:
-                                result = subprocess.run([python_path, "--version"], 
-                                                     capture_output=True, text=True)
-                                version = result.stdout.strip()
-                                tree.insert("", END, values=(venv_name, version, venv_path, "可用"))
-                            except:
+                            # 版本取自 pyvenv.cfg，不必为每个环境启动一次解释器
+                            version = interpreter_discovery.read_version(python_path)
+                            if version:
+                                tree.insert("", END, values=(venv_name, f"Python {version}", venv_path, "可用"))
+                            else:
                                 tree.insert("", END, values=(venv_name, "未知", venv_path, "错误"))
 
         def activate_venv():
@@ -830,38 +737,41 @@ class PipListGUI:
 
         def delete_venv():
             selected = tree.selection()
-            if selected:
-                venv_name = tree.item(selected[0])['values'][0]
-                if Messagebox.show_question(f"确定要删除虚拟环境 {venv_name} 吗?", "确认删除") == "是":
-                    try:
-                        import shutil
-                        venv_path = os.path.join(os.getcwd(), "venvs", venv_name)
-                        
-                        # 先尝试关闭所有可能的进程
-                        python_exe = os.path.join(venv_path, "Scripts", "python.exe")
-                        if os.path.exists(python_exe):
-                            try:
-                                subprocess.run(['taskkill', '/F', '/IM', 'python.exe'], 
-                                            stdout=subprocess.PIPE, 
-                                            stderr=subprocess.PIPE)
-                            except:
-                                pass
-                        
-                        # 设置文件权限
-                        def on_error(func, path, exc_info):
-                            import stat
-                            if not os.access(path, os.W_OK):
-                                os.chmod(path, stat.S_IWUSR)
-                                func(path)
-                            else:
-                                raise
-                        
-                        # 删除虚拟环境目录
-                        shutil.rmtree(venv_path, onerror=on_error)
-                        self.show_message("成功", f"虚拟环境 {venv_name} 已删除")
-                        refresh_venvs()
-                    except Exception as e:
-                        self.show_message("错误", f"删除失败: {str(e)}", "error")
+            if not selected:
+                return
+            venv_name = tree.item(selected[0])['values'][0]
+            if Messagebox.show_question(f"确定要删除虚拟环境 {venv_name} 吗?", "确认删除") != "是":
+                return
+            venv_path = os.path.join(os.getcwd(), "venvs", venv_name)
+
+            # 只找真正在使用该环境的进程，由用户决定是否结束它们
+            processes = venv_templates.find_venv_processes(venv_path)
+            terminate = False
+            if processes:
+                names = "\n".join(f"{proc.info['name']} (PID {proc.pid})" for proc in processes)
+                if Messagebox.show_question(f"以下进程正在使用该环境:\n{names}\n\n是否结束这些进程并继续删除?",
+                                            "确认结束进程") != "是":
+                    return
+                terminate = True
+
+            def progress(done, total):
+                venv_window.after(0, lambda: self.status_bar.config(
+                    text=f"正在删除虚拟环境 {venv_name}: {done}/{total} 个文件"))
+
+            # 删除放到后台线程，大环境也不会卡住界面
+            def worker():
+                try:
+                    venv_templates.delete_venv(venv_path, terminate=terminate, progress=progress)
+                    venv_window.after(0, lambda: (self.status_bar.config(text=f"虚拟环境 {venv_name} 已删除"),
+                                                  refresh_venvs()))
+                except Exception as e:
+                    error = str(e)
+                    venv_window.after(0, lambda: (self.show_message("错误", f"删除失败: {error}", "error"),
+                                                  refresh_venvs()))
+
+            threading.Thread(target=worker, daemon=True).start()
+            # Linux 上目录会先被改名移走，稍后刷新列表即可看到环境已消失
+            venv_window.after(200, refresh_venvs)
 
         button_frame = ttk.Frame(venv_window)
         button_frame.pack(fill=X, padx=10, pady=5)
@@ -899,14 +809,14 @@ class PipListGUI:
             text_area.insert(END, "开始安全检查...\n\n")
             
             try:
-                packages = self.get_installed_packages()
+                packages = self.collector.get('packages')
                 total = len(packages)
                 
                 for i, pkg in enumerate(packages, 1):
                     if not self.security_check_running:
                         break
                         
-                    pkg_name = pkg[0]
+                    pkg_name = pkg.name
                     text_area.insert(END, f"[{i}/{total}] 检查 {pkg_name}...\n")
                     text_area.see(END)
                     
@@ -935,6 +845,53 @@ class PipListGUI:
             text_area.insert(END, "\n已停止安全检查！\n")
             text_area.see(END)
 
+        def start_integrity_check():
+            # 按 RECORD 校验已安装文件；哈希在进程池中计算，界面更新切回主线程
+            def append(text):
+                security_window.after(0, lambda: (text_area.insert(END, text), text_area.see(END)))
+
+            def progress(done, total):
+                append(f"哈希计算进度: {done}/{total} 批\n")
+
+            security_window.after(0, lambda: text_area.delete(1.0, END))
+            append("开始校验已安装文件完整性...\n\n")
+            try:
+                cache_path = os.path.join(self.save_directory, 'integrity_cache.json')
+                report = verify_installed_files(cache_path=cache_path, progress=progress)
+                append('\n'.join(format_report(report)) + '\n')
+                report_path = os.path.join(self.save_directory,
+                                           f'integrity_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+                with tracing.write(report_path), open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                append(f"\n完整性校验报告已保存到 {os.path.basename(report_path)}\n")
+            except Exception as e:
+                append(f"\n完整性校验失败: {str(e)}\n")
+
+        def start_native_check():
+            # 扩展模块链接的系统库及提供它们的系统包；包数据库和 ELF 解析结果都有缓存
+            def append(text):
+                security_window.after(0, lambda: (text_area.insert(END, text), text_area.see(END)))
+
+            security_window.after(0, lambda: text_area.delete(1.0, END))
+            append("开始读取系统包数据库...\n\n")
+            try:
+                index = self.collector.get('system_packages')
+                if index.manager is None:
+                    append("未找到 dpkg、rpm 或 apk 的包数据库\n")
+                    return
+                append(f"{index.manager}: {len(index)} 个系统包\n\n")
+                links = self.collector.get('native_links')
+                for name, owners in sorted(system_packages.system_dependencies(links).items(),
+                                           key=lambda item: item[0].lower()):
+                    append(f"{name}: " + '，'.join(f"{owner} {version}" for owner, version in sorted(owners.items()))
+                           + "\n")
+                for name, library in sorted({(link.package, link.library) for link in links
+                                             if link.source == 'missing'}):
+                    append(f"警告: {name} 依赖的 {library} 未找到提供者\n")
+                append("\n系统库依赖检查完成！\n")
+            except Exception as e:
+                append(f"\n系统库依赖检查失败: {str(e)}\n")
+
         def export_results():
             try:
                 filename = f'security_check_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
@@ -950,16 +907,36 @@ class PipListGUI:
         ttk.Button(control_frame, text="开始检查", 
                   command=lambda: threading.Thread(target=start_check).start()).pack(side=LEFT, padx=5)
         ttk.Button(control_frame, text="停止检查", command=stop_check).pack(side=LEFT, padx=5)
+        ttk.Button(control_frame, text="完整性校验",
+                  command=lambda: threading.Thread(target=start_integrity_check, daemon=True).start()).pack(side=LEFT, padx=5)
+        ttk.Button(control_frame, text="系统库依赖",
+                  command=lambda: threading.Thread(target=start_native_check, daemon=True).start()).pack(side=LEFT, padx=5)
         ttk.Button(control_frame, text="导出结果", command=export_results).pack(side=LEFT, padx=5)
 
     def performance_monitor(self):
         monitor_window = ttk.Toplevel(self.root)
         monitor_window.title("性能监控")
-        monitor_window.geometry("1000x800")
+        monitor_window.geometry("1000x900")
     
         # 创建控制框架
         control_frame = ttk.Frame(monitor_window)
         control_frame.pack(fill=X, padx=10, pady=5)
+
+        # 告警规则，多条规则用分号分隔
+        rules_frame = ttk.Frame(monitor_window)
+        rules_frame.pack(fill=X, padx=10, pady=5)
+        ttk.Label(rules_frame, text="告警规则:").pack(side=LEFT, padx=5)
+        rules_var = ttk.StringVar(value='; '.join(DEFAULT_RULES))
+        ttk.Entry(rules_frame, textvariable=rules_var).pack(side=LEFT, fill=X, expand=YES, padx=5)
+
+        # 告警列表
+        alert_frame = ttk.LabelFrame(monitor_window, text="告警", padding=5)
+        alert_frame.pack(side=BOTTOM, fill=X, padx=10, pady=5)
+        alert_tree = ttk.Treeview(alert_frame, columns=("时间", "状态", "规则", "值"), show="headings", height=5)
+        for col, width in zip(("时间", "状态", "规则", "值"), (150, 80, 400, 100)):
+            alert_tree.heading(col, text=col)
+            alert_tree.column(col, width=width)
+        alert_tree.pack(fill=X)
     
         # 创建图表区域
         chart_frame = ttk.Frame(monitor_window)
@@ -970,55 +947,42 @@ class PipListGUI:
         canvas = FigureCanvasTkAgg(fig, master=chart_frame)
         canvas.get_tk_widget().pack(fill=BOTH, expand=YES)
     
-        # 初始化数据
-        self.time_points = []
-        self.cpu_data = []
-        self.memory_data = []
-        self.disk_data = []
+        # 采样在后台线程中进行，图表只读取最近的样本；告警规则对每个样本增量求值
+        self.monitor_sampler = None
         self.monitor_running = False
+
+        def on_sample(record):
+            if record['alerts']:
+                monitor_window.after(0, show_alerts, record['alerts'])
+
+        def show_alerts(alerts):
+            for alert in alerts:
+                alert_tree.insert("", 0, values=(datetime.fromtimestamp(alert.time).strftime("%H:%M:%S"),
+                                                 '触发' if alert.state == 'firing' else '恢复',
+                                                 alert.rule, f"{alert.value:.1f}"))
+            firing = [alert for alert in alerts if alert.state == 'firing']
+            if firing:
+                self.status_bar.config(text=firing[-1].message)
     
         def update_charts():
             if self.monitor_running:
                 try:
-                    # 获取当前时间
-                    current_time = datetime.now().strftime("%H:%M:%S")
-                    self.time_points.append(current_time)
-                    
-                    # 获取系统信息
-                    cpu_percent = psutil.cpu_percent()
-                    memory = psutil.virtual_memory()
-                    disk = psutil.disk_usage('/')
-                    
-                    self.cpu_data.append(cpu_percent)
-                    self.memory_data.append(memory.percent)
-                    self.disk_data.append(disk.percent)
-                    
                     # 保持最近30个数据点
-                    if len(self.time_points) > 30:
-                        self.time_points.pop(0)
-                        self.cpu_data.pop(0)
-                        self.memory_data.pop(0)
-                        self.disk_data.pop(0)
+                    samples = self.monitor_sampler.samples()[-30:]
+                    time_points = [datetime.fromtimestamp(record['time']).strftime("%H:%M:%S") for record in samples]
                     
                     # 更新图表
                     ax1.clear()
                     ax2.clear()
                     ax3.clear()
                     
-                    ax1.plot(range(len(self.time_points)), self.cpu_data, 'b-')
-                    ax1.set_title('CPU使用率 (%)')
-                    ax1.set_xticks(range(len(self.time_points)))
-                    ax1.set_xticklabels(self.time_points, rotation=45)
-                    
-                    ax2.plot(range(len(self.time_points)), self.memory_data, 'r-')
-                    ax2.set_title('内存使用率 (%)')
-                    ax2.set_xticks(range(len(self.time_points)))
-                    ax2.set_xticklabels(self.time_points, rotation=45)
-                    
-                    ax3.plot(range(len(self.time_points)), self.disk_data, 'g-')
-                    ax3.set_title('磁盘使用率 (%)')
-                    ax3.set_xticks(range(len(self.time_points)))
-                    ax3.set_xticklabels(self.time_points, rotation=45)
+                    for ax, key, style, title in ((ax1, 'cpu', 'b-', 'CPU使用率 (%)'),
+                                                  (ax2, 'memory', 'r-', '内存使用率 (%)'),
+                                                  (ax3, 'disk', 'g-', '磁盘使用率 (%)')):
+                        ax.plot(range(len(samples)), [record[key] for record in samples], style)
+                        ax.set_title(title)
+                        ax.set_xticks(range(len(time_points)))
+                        ax.set_xticklabels(time_points, rotation=45)
                     
                     fig.tight_layout()
                     canvas.draw()
@@ -1030,23 +994,34 @@ class PipListGUI:
                     self.monitor_running = False
     
         def start_monitor():
+            if self.monitor_running:
+                return
+            try:
+                engine = AlertEngine(rules_var.get())
+            except ValueError as e:
+                self.show_message("错误", str(e), "error")
+                return
+            # 监控期间的样本和告警同时录制到 results 目录
+            filename = f'performance_monitor_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            self.monitor_sampler = MonitorSampler(interval=1.0, alerts=engine,
+                                                  record_path=os.path.join(self.save_directory, filename))
+            self.monitor_sampler.add_listener(on_sample)
+            self.monitor_sampler.start()
             self.monitor_running = True
             update_charts()
     
         def stop_monitor():
             self.monitor_running = False
+            if self.monitor_sampler is not None:
+                self.monitor_sampler.stop()
     
         def export_data():
+            if self.monitor_sampler is None:
+                return
             try:
-                filename = f'performance_monitor_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+                filename = f'performance_monitor_{datetime.now().strftime("%Y%m%d_%H%M%S")}_export.csv'
                 filepath = os.path.join(self.save_directory, filename)
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write("时间,CPU使用率,内存使用率,磁盘使用率\n")
-                    for t, c, m, d in zip(self.time_points, self.cpu_data, 
-                                        self.memory_data, self.disk_data):
-                        f.write(f"{t},{c},{m},{d}\n")
-                
+                self.monitor_sampler.export_csv(filepath)
                 self.show_message("成功", f"监控数据已导出到桌面: {filename}")
             except Exception as e:
                 self.show_message("错误", f"导出失败: {str(e)}", "error")
@@ -1061,12 +1036,91 @@ class PipListGUI:
         status_label.pack(side=BOTTOM, fill=X, padx=10, pady=5)
     
         def update_status():
-            status_label.config(text=f"监控状态: {'运行中' if self.monitor_running else '已停止'}")
+            text = f"监控状态: {'运行中' if self.monitor_running else '已停止'}"
+            if self.monitor_sampler is not None and self.monitor_sampler.alerts.active:
+                text += f" | 当前告警 {len(self.monitor_sampler.alerts.active)} 条"
+            status_label.config(text=text)
             monitor_window.after(1000, update_status)
+
+        def on_close(event):
+            if event.widget is monitor_window:
+                stop_monitor()
+
+        monitor_window.bind("<Destroy>", on_close)
     
         update_status()
         self.show_message("成功", "性能监控已启动")
 
+    def history_viewer(self):
+        # 打开录制或导出的监控 CSV；首次打开需要转换为二进制缓存，放到后台线程
+        path = filedialog.askopenfilename(title="选择监控记录", initialdir=self.save_directory,
+                                          filetypes=[("CSV 文件", "*.csv"), ("所有文件", "*.*")])
+        if not path:
+            return
+
+        def worker():
+            try:
+                recording = monitor_history.Recording(path)
+                self.root.after(0, self.show_history_window, recording)
+            except Exception as e:
+                error = str(e)
+                self.root.after(0, lambda: self.show_message("错误", f"读取监控记录失败: {error}", "error"))
+
+        self.status_bar.config(text=f"正在加载 {os.path.basename(path)}...")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show_history_window(self, recording):
+        history_window = ttk.Toplevel(self.root)
+        history_window.title(f"监控历史 - {os.path.basename(recording.path)}")
+        history_window.geometry("1000x800")
+        self.status_bar.config(text=f"已加载 {len(recording)} 个样本，{len(recording.alerts)} 条告警")
+
+        fig, axes = plt.subplots(len(monitor_history.METRICS), 1, figsize=(10, 10), sharex=True)
+        canvas = FigureCanvasTkAgg(fig, master=history_window)
+        # 工具栏提供缩放和平移
+        toolbar = NavigationToolbar2Tk(canvas, history_window)
+        toolbar.update()
+        canvas.get_tk_widget().pack(fill=BOTH, expand=YES)
+
+        lines = {}
+        alert_marks = []
+        for ax, (metric, label) in zip(axes, monitor_history.METRICS):
+            lines[metric], = ax.plot([], [], linewidth=0.8)
+            ax.set_title(label)
+            ax.set_ylim(0, 100)
+            ax.xaxis_date()
+        pending = {'redraw': False}
+
+        def redraw():
+            # 只取当前可见范围、与窗口宽度相当的数据点
+            pending['redraw'] = False
+            start, end = (value * 86400 for value in axes[0].get_xlim())
+            max_points = max(canvas.get_tk_widget().winfo_width(), 500)
+            for metric, _ in monitor_history.METRICS:
+                x, y = recording.query(metric, start, end, max_points)
+                lines[metric].set_data(monitor_history.to_plot_time(x), y)
+            for mark in alert_marks:
+                mark.remove()
+            alert_marks.clear()
+            for alert_time, _ in recording.alerts_between(start, end):
+                for ax in axes:
+                    alert_marks.append(ax.axvline(monitor_history.to_plot_time(alert_time), color='red',
+                                                  alpha=0.3, linewidth=0.8))
+            canvas.draw_idle()
+
+        def on_xlim_changed(ax):
+            # 平移时会连续触发，合并到一次重绘
+            if not pending['redraw']:
+                pending['redraw'] = True
+                history_window.after_idle(redraw)
+
+        first, last = recording.time_range()
+        axes[0].set_xlim(monitor_history.to_plot_time(first), monitor_history.to_plot_time(max(last, first + 1)))
+        axes[0].callbacks.connect('xlim_changed', on_xlim_changed)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        redraw()
+
     def run(self):
         self.root.mainloop()
 
@@ -1,185 +1,363 @@
 #!python
-import pandas as pd
-import subprocess
 from filelock import FileLock
-import os
 import argparse
+import json
+import os
 import re
-import chardet
-
-
-def get_installed_packages():
-    result = subprocess.run(['pip', 'list'], stdout=subprocess.PIPE)
-    packages = result.stdout.decode('utf-8').split('\n')
-    packages = packages[2:]
-    packages = [package for package in packages if package]
-    package_list = [package.split() for package in packages]
-    return package_list
-
-
-def get_requirements_packages(file_path='requirements.txt'):
-    try:
-        with open(file_path, 'rb') as file:
-            raw_data = file.read()
-            encoding_result = chardet.detect(raw_data)
-            encoding = encoding_result['encoding']
-
-        with open(file_path, 'r', encoding=encoding) as file:
-            requirements = file.readlines()
-
-        requirements = [re.sub(r'\s+', ' ', line.strip()).split('==') for line in requirements if line.strip()]
-        return requirements
-    except FileNotFoundError:
-        print("requirements.txt 文件未找到。")
-        return []
-    except chardet.UniversalDetectorError:
-        print(f"无法检测 {file_path} 文件的编码。请手动指定编码。")
-        return []
-
-
-def get_language_version(command, pattern):
-    try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        output = result.stdout.decode('utf-8').strip()
-        match = re.search(pattern, output)
-        if match:
-            return match.group(1)
-        else:
-            return "版本信息未找到"
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return "版本信息未找到"
-
-
-def get_installed_languages():
-    languages = []
-
-    python_version = get_language_version(['python', '--version'], r'Python (\d+\.\d+\.\d+)')
-    languages.append(['Python', python_version])
-
-    java_version = get_language_version(['java', '-version'], r'version "(\d+\.\d+\.\d+_\d+)"')
-    languages.append(['Java', java_version])
-
-    node_version = get_language_version(['node', '--version'], r'v(\d+\.\d+\.\d+)')
-    languages.append(['Node.js', node_version])
-
-    c_version = get_language_version(['gcc', '--version'], r'gcc version (\d+\.\d+\.\d+)')
-    languages.append(['C语言编译器 (gcc)', c_version])
-
-    go_version = get_language_version(['go', 'version'], r'go version go(\d+\.\d+\.\d+)')
-    languages.append(['Go语言', go_version])
-
-    ruby_version = get_language_version(['ruby', '-v'], r'ruby (\d+\.\d+\.\d+)')
-    languages.append(['Ruby', ruby_version])
-
-    php_version = get_language_version(['php', '-v'], r'PHP (\d+\.\d+\.\d+)')
-    languages.append(['PHP', php_version])
-
-    perl_version = get_language_version(['perl', '-v'], r'v(\d+\.\d+\.\d+)')
-    languages.append(['Perl', perl_version])
-
-    swift_version = get_language_version(['swift', '--version'], r'Swift version (\d+\.\d+\.\d+)')
-    languages.append(['Swift', swift_version])
-
-    rust_version = get_language_version(['rustc', '--version'], r'rustc (\d+\.\d+\.\d+)')
-    languages.append(['Rust', rust_version])
-
-    csharp_version = get_language_version(['dotnet', '--version'], r'(\d\.\d+\.\d+)')
-    languages.append(['C#', csharp_version])
-
-    python3_version = get_language_version(['python3', '--version'], r'Python (\d+\.\d+\.\d+)')
-    languages.append(['Python 3', python3_version])
-
-    typescript_version = get_language_version(['npm', 'list', '-g', 'typescript'], r'typescript@(\d+\.\d+\.\d+)')
-    languages.append(['TypeScript', typescript_version])
-
-    r_version = get_language_version(['Rscript', '--version'], r'R version (\d+\.\d+\.\d+)')
-    languages.append(['R', r_version])
-
-    kotlin_version = get_language_version(['kotlinc', '-version'], r'Kotlin version (\d+\.\d+\.\d+)')
-    languages.append(['Kotlin', kotlin_version])
-
-    return languages
-
-
-def get_installed_front_end_frameworks():
-    frameworks = []
-
-    vue_version = get_language_version(['npm', 'list', '-g', 'vue-cli'], r'vue-cli@(\d+\.\d+\.\d+)')
-    frameworks.append(['Vue.js', vue_version])
-
-    react_version = get_language_version(['npm', 'list', '-g', 'create-react-app'], r'create-react-app@(\d+\.\d+\.\d+)')
-    frameworks.append(['React.js', react_version])
-
-    angular_version = get_language_version(['npm', 'list', '-g', '@angular/cli'], r'@angular/cli@(\d+\.\d+\.\d+)')
-    frameworks.append(['Angular', angular_version])
-
-    ember_version = get_language_version(['npm', 'list', '-g', 'ember-cli'], r'ember-cli@(\d+\.\d+\.\d+)')
-    frameworks.append(['Ember.js', ember_version])
-
-    svelte_version = get_language_version(['npm', 'list', '-g', 'svelte-cli'], r'svelte-cli@(\d+\.\d+\.\d+)')
-    frameworks.append(['Svelte', svelte_version])
-
-    nextjs_version = get_language_version(['npm', 'list', '-g', 'next'], r'next@(\d+\.\d+\.\d+)')
-    frameworks.append(['Next.js', nextjs_version])
-
-    nuxtjs_version = get_language_version(['npm', 'list', '-g', 'nuxt'], r'nuxt@(\d+\.\d+\.\d+)')
-    frameworks.append(['Nuxt.js', nuxtjs_version])
-
-    gatsby_version = get_language_version(['npm', 'list', '-g', 'gatsby-cli'], r'gatsby-cli@(\d+\.\d+\.\d+)')
-    frameworks.append(['Gatsby', gatsby_version])
-
-    vuepress_version = get_language_version(['npm', 'list', '-g', 'vuepress'], r'vuepress@(\d+\.\d+\.\d+)')
-    frameworks.append(['VuePress', vuepress_version])
-
-    return frameworks
-
-
-def save_to_excel(package_list, languages, frameworks, requirements, file_name='已安装库.xlsx', selected_option='all'):
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import exporters
+import tracing
+from collectors import (session, get_installed_packages, get_requirements_packages, get_language_version,
+                        get_installed_languages, get_installed_front_end_frameworks, match_requirements)
+from consistency_check import check_installed_requirements, format_problem, match_requirement_pins, problems_to_dict
+from metadata_index import DEFAULT_DB, MetadataIndex, search_directories
+from records import to_dict, write_excel, write_excel_sheets
+from snapshot_diff import site_packages_of
+
+SECTIONS = ['languages', 'frameworks', 'packages', 'requirements', 'consistency']
+# 编程语言和前端框架属于主机，只探测一次；其余部分对每个 Python 环境分别扫描
+HOST_SECTIONS = ['languages', 'frameworks']
+FORMATS = ['xlsx'] + list(exporters.EXPORTERS)
+# 退出码：存在依赖不匹配或依赖冲突时为 1，有目标扫描失败时为 2
+EXIT_MISMATCH = 1
+EXIT_FAILED = 2
+
+
+def save_to_excel(package_list, languages, frameworks, requirements, file_name='已安装库.xlsx', selected_option='all',
+                  problems=None):
     lock_file_name = 'lock'
 
     if selected_option == 'all' or selected_option == 'languages':
         temp_file_name = '编程语言.xlsx'
         with FileLock(lock_file_name):
-            df_languages = pd.DataFrame(languages, columns=['编程语言', '版本号'])
-            df_languages.to_excel(temp_file_name, index=False)
+            with tracing.write(temp_file_name):
+                write_excel(temp_file_name, languages, ['编程语言', '版本号'])
         print(f"编程语言信息已成功保存到 {temp_file_name}")
 
     if selected_option == 'all' or selected_option == 'packages':
         temp_file_name = 'Python库.xlsx'
         with FileLock(lock_file_name):
-            df_packages = pd.DataFrame(package_list, columns=['包名', '版本号'])
-            df_packages.to_excel(temp_file_name, index=False)
+            with tracing.write(temp_file_name):
+                write_excel(temp_file_name, package_list, ['包名', '版本号', '可编辑安装位置'])
         print(f"Python库信息已成功保存到 {temp_file_name}")
 
     if selected_option == 'all' or selected_option == 'frameworks':
         temp_file_name = '前端框架.xlsx'
         with FileLock(lock_file_name):
-            df_frameworks = pd.DataFrame(frameworks, columns=['前端框架', '版本号'])
-            df_frameworks.to_excel(temp_file_name, index=False)
+            with tracing.write(temp_file_name):
+                write_excel(temp_file_name, frameworks, ['前端框架', '版本号'])
         print(f"前端框架信息已成功保存到 {temp_file_name}")
 
     if selected_option == 'all' or selected_option == 'requirements':
         temp_file_name = '依赖匹配.xlsx'
         with FileLock(lock_file_name):
-            installed_packages_dict = {package[0]: package[1] for package in package_list}
-            matched_requirements = []
-            for req in requirements:
-                package_name = req[0]
-                req_version = req[1] if len(req) > 1 else '未指定版本'
-                installed_version = installed_packages_dict.get(package_name, '未安装')
-                matched_requirements.append(
-                    [package_name, req_version, installed_version, req_version == installed_version])
-            df_matched_requirements = pd.DataFrame(matched_requirements,
-                                                   columns=['包名', '要求版本', '已安装版本', '是否匹配'])
-            df_matched_requirements.to_excel(temp_file_name, index=False)
+            matched_requirements = match_requirements(package_list, requirements)
+            with tracing.write(temp_file_name):
+                write_excel(temp_file_name, matched_requirements, ['包名', '要求版本', '已安装版本', '是否匹配'])
         print(f"依赖匹配信息已成功保存到 {temp_file_name}")
 
+        temp_file_name = '依赖冲突.xlsx'
+        if problems is None:
+            problems = session.get('consistency')
+        with FileLock(lock_file_name):
+            with tracing.write(temp_file_name):
+                write_excel(temp_file_name, problems, ['包名', '版本号', '依赖', '要求版本', '已安装版本', '问题类型'])
+        for problem in problems:
+            print(format_problem(problem))
+        print(f"依赖一致性检查发现 {len(problems)} 个问题，已保存到 {temp_file_name}")
+
+
+def print_dependency_analytics(args):
+    analytics = session.get('analytics')
+
+    try:
+        if args.why:
+            print(f"直接依赖 {args.why} 的包: {', '.join(analytics.dependents(args.why)) or '无'}")
+            print(f"间接引入 {args.why} 的包: {', '.join(analytics.pulled_in_by(args.why)) or '无'}")
+        if args.remove_impact:
+            removable = analytics.removable_with(args.remove_impact)
+            print(f"卸载 {args.remove_impact} 后可一并删除的依赖: {', '.join(removable) or '无'}")
+    except KeyError as e:
+        print(e.args[0])
+
+    if args.orphans:
+        print(f"孤立包（未被任何包依赖）: {', '.join(analytics.to_dict()['orphans'])}")
+    if args.cycles:
+        cycles = analytics.to_dict()['strongly_connected_components']
+        if cycles:
+            for component in cycles:
+                print(f"循环依赖: {' <-> '.join(component)}")
+        else:
+            print("未发现循环依赖。")
+
+
+def print_package_search(args):
+    # 查询元数据索引，不重新扫描环境
+    index = session.get('metadata_index')
+    if args.info:
+        dist = index.get(args.info)
+        if dist is None:
+            print(f"未安装 {args.info}")
+            return
+        print(f"{dist.name} {dist.version}\n简介: {dist.summary}\n许可证: {dist.license}\n"
+              f"顶层模块: {', '.join(dist.top_level)}\n文件数: {dist.file_count}")
+        print(f"依赖: {', '.join(dist.requires) or '无'}")
+    if args.search:
+        for dist in index.search(args.search):
+            print(f"{dist.name} {dist.version}  {dist.summary}")
+
+
+# 在目标解释器中输出 sys.path 和 PEP 508 环境标记变量（与 packaging.markers.default_environment 相同），
+# 目标环境不一定装有 packaging，因此直接计算
+INTERPRETER_SCRIPT = '''
+import json, os, platform, sys
+version = sys.implementation.version
+implementation_version = '{0.major}.{0.minor}.{0.micro}'.format(version)
+if version.releaselevel != 'final':
+    implementation_version += version.releaselevel[0] + str(version.serial)
+print(json.dumps({'path': sys.path, 'environment': {
+    'implementation_name': sys.implementation.name,
+    'implementation_version': implementation_version,
+    'os_name': os.name,
+    'platform_machine': platform.machine(),
+    'platform_release': platform.release(),
+    'platform_system': platform.system(),
+    'platform_version': platform.version(),
+    'python_full_version': platform.python_version(),
+    'platform_python_implementation': platform.python_implementation(),
+    'python_version': '.'.join(platform.python_version_tuple()[:2]),
+    'sys_platform': sys.platform,
+}}))
+'''
+
+
+def interpreter_info(python):
+    # 运行目标解释器取得它的 sys.path 和环境标记变量，只需这一次子进程，包元数据仍在本进程中从索引读取
+    result = subprocess.run([python, '-c', INTERPRETER_SCRIPT],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30, check=True)
+    info = json.loads(result.stdout.decode('utf-8'))
+    directories = [os.path.abspath(path) for path in info['path'] if path and os.path.isdir(path)]
+    return directories, info['environment']
+
+
+def venv_environment(path, directories):
+    # 虚拟环境的环境标记变量：优先运行环境自己的解释器；无法运行时（例如其他平台的环境）从目录布局推断
+    # Python 版本和平台，推断不出的变量按当前解释器求值
+    for python in (os.path.join(path, 'bin', 'python'), os.path.join(path, 'Scripts', 'python.exe')):
+        if os.path.exists(python):
+            try:
+                return interpreter_info(python)[1]
+            except (OSError, subprocess.SubprocessError, ValueError, KeyError):
+                break
+    environment = {}
+    for directory in directories:
+        match = re.search(r'[\\/]lib[\\/]python(\d+\.\d+)[\\/]site-packages$', directory)
+        if match:
+            environment['python_version'] = match.group(1)
+        elif re.search(r'[\\/]Lib[\\/]site-packages$', directory):
+            environment.update(os_name='nt', sys_platform='win32', platform_system='Windows')
+    return environment or None
+
+
+def batch_targets(args):
+    # 返回 [(标签, 类型, 路径)]；没有指定解释器和虚拟环境时扫描当前解释器
+    targets = [('python', path) for path in args.python or ()] + [('venv', path) for path in args.venv or ()]
+    if not targets:
+        targets = [('current', sys.executable)]
+    labels = []
+    for kind, path in targets:
+        label = 'current' if kind == 'current' else re.sub(r'[^\w.-]+', '_', os.path.abspath(path).strip(os.sep))
+        while label in [item[0] for item in labels]:
+            label += '_'
+        labels.append((label, kind, path))
+    return labels
+
+
+def scan_environment(kind, path, sections, requirement_files, db_path):
+    # 对一个 Python 环境扫描包、依赖匹配和依赖一致性；元数据来自共享的索引数据库，增量更新
+    # environment 为目标解释器的环境标记变量，依赖声明和 requirements 中的标记按它求值
+    environment = None
+    if kind == 'current':
+        directories = search_directories()
+    elif kind == 'python':
+        directories, environment = interpreter_info(path)
+    else:
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"虚拟环境目录不存在: {path}")
+        directories = [os.path.abspath(directory) for directory in site_packages_of(path)]
+        environment = venv_environment(path, directories)
+    index = MetadataIndex(db_path, directories)
+    try:
+        index.update()
+        distributions = index.distributions()
+        packages = index.packages()
+    finally:
+        index.close()
+
+    data = {'target': path}
+    if 'packages' in sections:
+        data['packages'] = packages
+    if 'requirements' in sections:
+        data['requirements'] = [dict(to_dict(match), file=file)
+                                for file in requirement_files
+                                for match in match_requirement_pins(packages, get_requirements_packages(file), environment)]
+    if 'consistency' in sections:
+        data['consistency'] = problems_to_dict(check_installed_requirements(distributions, environment))
+    return data
+
+
+def count_problems(data):
+    mismatches = sum(1 for row in data.get('requirements', ()) if not row['matched'])
+    conflicts = sum(len(rows) for rows in data.get('consistency', {}).values())
+    return mismatches + conflicts
+
+
+def write_batch_output(data, path, fmt):
+    if fmt != 'xlsx':
+        exporters.EXPORTERS[fmt][1](data, path)
+        return
+    sheets = []
+    if 'languages' in data:
+        sheets.append(('编程语言', data['languages'], ['编程语言', '版本号']))
+    if 'frameworks' in data:
+        sheets.append(('前端框架', data['frameworks'], ['前端框架', '版本号']))
+    if 'packages' in data:
+        sheets.append(('Python库', data['packages'], ['包名', '版本号', '可编辑安装位置']))
+    if 'requirements' in data:
+        sheets.append(('依赖匹配', [[row['file'], row['name'], row['required'], row['installed'], row['matched']]
+                                   for row in data['requirements']],
+                       ['requirements 文件', '包名', '要求版本', '已安装版本', '是否匹配']))
+    if 'consistency' in data:
+        sheets.append(('依赖冲突', [[kind, line] for kind, lines in data['consistency'].items() for line in lines],
+                       ['问题类型', '说明']))
+    write_excel_sheets(path, sheets)
+
+
+def run_batch(args):
+    # 非交互批量扫描：各目标在线程池中并发执行，进度以每行一个 JSON 对象写到标准错误，结果文件写到输出目录
+    sections = SECTIONS if not args.sections else [section.strip() for section in args.sections.split(',')]
+    unknown = [section for section in sections if section not in SECTIONS]
+    if unknown:
+        print(f"未知的部分: {', '.join(unknown)}，可选: {', '.join(SECTIONS)}", file=sys.stderr)
+        return EXIT_FAILED
+    requirement_files = args.requirements or (['requirements.txt'] if os.path.exists('requirements.txt') else [])
+    missing = [file for file in requirement_files if not os.path.exists(file)]
+    if missing and 'requirements' in sections:
+        print(f"requirements 文件不存在: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_FAILED
+    os.makedirs(args.output, exist_ok=True)
+    extension = 'xlsx' if args.format == 'xlsx' else exporters.EXPORTERS[args.format][0].rsplit('.', 1)[1]
+    stamp = {'host': socket.gethostname(), 'exported_at': datetime.now().isoformat(timespec='seconds')}
+
+    jobs = []
+    if any(section in sections for section in HOST_SECTIONS):
+        jobs.append(('host', 'host', None))
+    env_sections = [section for section in sections if section not in HOST_SECTIONS]
+    if env_sections:
+        jobs.extend(batch_targets(args))
+    progress_lock = threading.Lock()
+    done = 0
+
+    def emit(event, label, **fields):
+        if args.progress == 'none':
+            return
+        record = dict({'event': event, 'target': label, 'done': done, 'total': len(jobs)}, **fields)
+        with progress_lock:
+            if args.progress == 'json':
+                print(json.dumps(record, ensure_ascii=False), file=sys.stderr, flush=True)
+            else:
+                print(f"[{done}/{len(jobs)}] {label} {event}", file=sys.stderr, flush=True)
+
+    def run(label, kind, path):
+        emit('start', label)
+        start = time.perf_counter()
+        data = dict(stamp)
+        if kind == 'host':
+            if 'languages' in sections:
+                data['languages'] = get_installed_languages()
+            if 'frameworks' in sections:
+                data['frameworks'] = get_installed_front_end_frameworks()
+        else:
+            data.update(scan_environment(kind, path, env_sections, requirement_files, args.db))
+        output_path = os.path.join(args.output, f"{label}.{extension}")
+        # 每个目标写各自的文件，不需要加锁
+        with tracing.write(output_path):
+            write_batch_output(data, output_path, args.format)
+        return data, output_path, time.perf_counter() - start
+
+    summary = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run, *job): job for job in jobs}
+        for future in as_completed(futures):
+            label = futures[future][0]
+            with progress_lock:
+                done += 1
+            try:
+                data, output_path, elapsed = future.result()
+            except Exception as e:
+                summary[label] = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+                emit('error', label, error=summary[label]['error'])
+                continue
+            problems = count_problems(data)
+            summary[label] = {'status': 'mismatch' if problems else 'ok', 'problems': problems,
+                              'output': output_path, 'seconds': round(elapsed, 3)}
+            emit('done', label, status=summary[label]['status'], problems=problems, output=output_path,
+                 seconds=summary[label]['seconds'])
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if any(item['status'] == 'error' for item in summary.values()):
+        return EXIT_FAILED
+    if any(item['status'] == 'mismatch' for item in summary.values()):
+        return EXIT_MISMATCH
+    return 0
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='查询并保存已安装的Python库信息、编程语言信息和前端框架信息')
     parser.add_argument('-f', '--file', type=str, default='已安装库.xlsx', help='保存文件的名称')
+    parser.add_argument('--why', type=str, metavar='包名', help='查询哪些包引入了指定的包')
+    parser.add_argument('--remove-impact', type=str, metavar='包名', help='查询卸载指定包后可一并删除的依赖')
+    parser.add_argument('--orphans', action='store_true', help='列出未被任何包依赖的孤立包')
+    parser.add_argument('--cycles', action='store_true', help='列出循环依赖')
+    parser.add_argument('--search', type=str, metavar='关键词', help='按名称、简介和详细说明检索已安装的包')
+    parser.add_argument('--info', type=str, metavar='包名', help='显示已安装包的元数据')
+    parser.add_argument('--profile', type=str, nargs='?', const='trace.json', metavar='文件',
+                        help='输出最慢的步骤，并将跟踪数据保存为 Chrome trace-event JSON（默认 trace.json）')
+    batch = parser.add_argument_group('批量模式', '不显示菜单，并发扫描多个解释器和虚拟环境；'
+                                    '存在依赖不匹配或冲突时退出码为 1，有目标失败时为 2')
+    batch.add_argument('--batch', action='store_true', help='以非交互方式运行（指定以下任一选项时自动启用）')
+    batch.add_argument('--sections', type=str, metavar='部分',
+                       help=f"逗号分隔的扫描部分，默认全部：{','.join(SECTIONS)}")
+    batch.add_argument('--python', type=str, action='append', metavar='解释器', help='要扫描的 Python 解释器，可重复')
+    batch.add_argument('--venv', type=str, action='append', metavar='目录', help='要扫描的虚拟环境目录，可重复')
+    batch.add_argument('-r', '--requirements', type=str, action='append', metavar='文件',
+                       help='与每个环境比对的 requirements 文件，可重复，默认为当前目录的 requirements.txt')
+    batch.add_argument('--format', type=str, choices=FORMATS, default='json', help='输出格式')
+    batch.add_argument('-o', '--output', type=str, default=os.path.join('results', 'batch'), help='输出目录')
+    batch.add_argument('-j', '--workers', type=int, default=4, help='并发扫描的目标数')
+    batch.add_argument('--progress', type=str, choices=['json', 'text', 'none'], default='json',
+                       help='写到标准错误的进度格式')
+    batch.add_argument('--db', type=str, default=DEFAULT_DB,
+                       help='元数据索引数据库')
     args = parser.parse_args()
 
+    if args.batch or args.sections or args.python or args.venv or args.requirements:
+        raise SystemExit(run_batch(args))
+
+    if args.why or args.remove_impact or args.orphans or args.cycles:
+        print_dependency_analytics(args)
+        raise SystemExit(0)
+    if args.search or args.info:
+        print_package_search(args)
+        raise SystemExit(0)
+
     print("请选择要检测的信息类型：")
     print("1. 所有信息 (all)")
     print("2. 编程语言信息 (languages)")
@@ -203,11 +381,19 @@ if __name__ == '__main__':
         print("无效的选项编号，将默认检测所有信息。")
         selected_option = 'all'
 
-    packages = get_installed_packages()
-    requirements = get_requirements_packages()
-    languages = get_installed_languages()
-    frameworks = get_installed_front_end_frameworks()
-
-    save_to_excel(package_list=packages, languages=languages, frameworks=frameworks, requirements=requirements,
-                  file_name=args.file, selected_option=selected_option)
+    packages = session.get('packages')
+    requirements = session.get('requirements')
+    languages = session.get('languages')
+    frameworks = session.get('frameworks')
+
+    with tracing.span('save_to_excel', 'export', selected_option=selected_option):
+        save_to_excel(package_list=packages, languages=languages, frameworks=frameworks, requirements=requirements,
+                      file_name=args.file, selected_option=selected_option)
+
+    if args.profile:
+        print("\n最慢的步骤：")
+        for line in tracing.tracer.report_lines():
+            print(line)
+        tracing.tracer.export_chrome_trace(args.profile)
+        print(f"跟踪数据已保存到 {args.profile}（可在 chrome://tracing 或 Perfetto 中打开）")
 # PIPlist-Query V1.1
@@ -0,0 +1,136 @@
+# 编程语言与前端框架探测
+# 探测项从 probes.json 读取（命令、正则、读取的输出流、超时、适用平台），命令行和图形界面共用。
+# 每个命令先用 shutil.which 在 PATH 中解析，找不到的工具直接跳过，不再为它启动子进程；
+# 命令相同的探测项（如多个 npm list -g）只运行一次，共用输出。
+#
+#   python probes.py languages
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import tracing
+from records import Tool
+
+VERSION_NOT_FOUND = "版本信息未找到"
+PROBES_FILE = 'probes.json'
+DEFAULT_TIMEOUT = 10
+# 同一命令的输出在这段时间内复用，编程语言和前端框架分别采集时 npm 也只运行一次
+OUTPUT_TTL = 60
+
+_resolved = {}
+_resolved_lock = threading.Lock()
+_outputs = {}
+_output_locks = {}
+
+
+def probes_path():
+    # 当前目录下的 probes.json 优先，便于按主机自定义，否则使用程序自带的配置
+    if os.path.exists(PROBES_FILE):
+        return os.path.abspath(PROBES_FILE)
+    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, PROBES_FILE)
+
+
+def load_probes(path=None):
+    # 返回 {类别: [探测项]}，探测项的正则在加载时编译
+    with open(path or probes_path(), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    registry = {}
+    for category, entries in config.items():
+        probes = []
+        for entry in entries:
+            platforms = entry.get('platform')
+            if isinstance(platforms, str):
+                platforms = [platforms]
+            if platforms and not any(sys.platform.startswith(platform) for platform in platforms):
+                continue
+            probes.append({
+                'name': entry['name'],
+                'command': list(entry['command']),
+                'pattern': re.compile(entry['regex'], re.MULTILINE),
+                'stream': entry.get('stream', 'stdout'),
+                'timeout': entry.get('timeout', DEFAULT_TIMEOUT),
+            })
+        registry[category] = probes
+    return registry
+
+
+def resolve_executable(name):
+    # PATH 查找结果在进程内缓存；环境变化后可调用 clear_resolved()
+    with _resolved_lock:
+        if name not in _resolved:
+            _resolved[name] = shutil.which(name)
+        return _resolved[name]
+
+
+def clear_resolved():
+    with _resolved_lock:
+        _resolved.clear()
+        _outputs.clear()
+
+
+def run_command(command, timeout):
+    # 返回 (stdout, stderr)，工具不存在或运行失败时返回 None
+    executable = resolve_executable(command[0])
+    if executable is None:
+        return None
+    try:
+        result = tracing.run([executable] + command[1:], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return (result.stdout.decode('utf-8', errors='replace'), result.stderr.decode('utf-8', errors='replace'))
+
+
+def cached_output(command, timeout):
+    # 每个命令一把锁：并发探测同一命令时只运行一次，其他线程等待结果
+    key = tuple(command)
+    with _resolved_lock:
+        lock = _output_locks.setdefault(key, threading.Lock())
+    with lock:
+        entry = _outputs.get(key)
+        if entry is None or time.monotonic() - entry[0] >= OUTPUT_TTL:
+            entry = (time.monotonic(), run_command(command, timeout))
+            _outputs[key] = entry
+        return entry[1]
+
+
+def match_version(probe, output):
+    if output is None:
+        return VERSION_NOT_FOUND
+    stdout, stderr = output
+    # java -version 等工具只把版本写到 stderr
+    text = {'stdout': stdout, 'stderr': stderr}.get(probe['stream'], f"{stdout}\n{stderr}")
+    match = probe['pattern'].search(text)
+    return match.group(1) if match else VERSION_NOT_FOUND
+
+
+def run_probes(category, registry=None):
+    registry = registry or load_probes()
+    return [Tool(probe['name'], match_version(probe, cached_output(probe['command'], probe['timeout'])))
+            for probe in registry.get(category, [])]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='按 probes.json 探测已安装的编程语言和前端框架')
+    parser.add_argument('categories', nargs='*', help='要探测的类别，默认为全部')
+    parser.add_argument('--config', type=str, help='探测配置文件，默认为 probes.json')
+    args = parser.parse_args()
+
+    registry = load_probes(args.config)
+    for category in args.categories or list(registry):
+        print(f"[{category}]")
+        for tool in run_probes(category, registry):
+            print(f"  {tool.name}: {tool.version}")
+    print('\n'.join(tracing.tracer.report_lines()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Prometheus 指标导出
+# 不打开图形界面，在后台运行与性能监控相同的采样器，并定时执行清单扫描，
+# 以 Prometheus 文本格式在 /metrics 提供 CPU、内存、磁盘、各网卡流量、告警和各采集步骤的耗时。
+# 响应体在每次采样或扫描后预先生成，抓取请求只读取这份缓冲，不会触发采样，多个抓取方同时拉取也不会增加主机负载。
+# 定时扫描只刷新 --sources 指定的数据源及其依赖，系统包、原生库链接等开销大的数据源默认不扫描。
+#
+#   python prometheus_exporter.py --port 9465 --interval 5 --scan-interval 300
+#   python prometheus_exporter.py --sources packages,consistency,native_links
+import argparse
+import threading
+import time
+
+from flask import Flask, Response
+
+from alerts import AlertEngine
+from collectors import create_session
+from monitor_sampler import MonitorSampler
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'piplist'
+# 默认定时扫描的数据源（依赖的数据源自动包含）
+DEFAULT_SOURCES = ['packages', 'requirement_matches']
+
+# 网卡计数器字段 -> (指标名, 说明)
+NETWORK_COUNTERS = [
+    ('bytes_sent', 'network_transmit_bytes_total', '网卡累计发送字节数'),
+    ('bytes_recv', 'network_receive_bytes_total', '网卡累计接收字节数'),
+    ('packets_sent', 'network_transmit_packets_total', '网卡累计发送包数'),
+    ('packets_recv', 'network_receive_packets_total', '网卡累计接收包数'),
+    ('errout', 'network_transmit_errors_total', '网卡累计发送错误数'),
+    ('errin', 'network_receive_errors_total', '网卡累计接收错误数'),
+    ('dropout', 'network_transmit_drop_total', '网卡累计发送丢包数'),
+    ('dropin', 'network_receive_drop_total', '网卡累计接收丢包数'),
+]
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsBuffer:
+    # 保存最近的样本和扫描结果，每次更新后重新生成完整的响应体；读取方只取引用，无需加锁
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.scans = {}
+        self.body = b''
+        self._lock = threading.Lock()
+
+    def update_scan(self, name, duration, ok, items=None):
+        with self._lock:
+            scan = self.scans.setdefault(name, {'duration': 0.0, 'success': 0.0, 'errors': 0, 'items': None})
+            scan['duration'] = duration
+            if ok:
+                scan['success'] = time.time()
+                scan['items'] = items
+            else:
+                scan['errors'] += 1
+
+    def render(self, record=None):
+        record = record or self.sampler.latest()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{escape_label(item)}"' for key, item in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}")
+
+        if record is not None:
+            metric('cpu_usage_percent', 'gauge', 'CPU使用率', [({}, record['cpu'])])
+            metric('memory_usage_percent', 'gauge', '内存使用率', [({}, record['memory'])])
+            metric('disk_usage_percent', 'gauge', '磁盘使用率',
+                   [({'path': self.sampler.disk_path}, record['disk'])])
+            network = record.get('network') or {}
+            for field, name, help_text in NETWORK_COUNTERS:
+                metric(name, 'counter', help_text,
+                       [({'interface': nic}, getattr(counters, field)) for nic, counters in sorted(network.items())])
+            metric('last_sample_timestamp_seconds', 'gauge', '最近一次采样的时间', [({}, record['time'])])
+
+        if self.sampler.alerts is not None:
+            active = set(self.sampler.alerts.active)
+            metric('alert_firing', 'gauge', '告警规则是否处于触发状态',
+                   [({'rule': rule.text}, int(rule.text in active)) for rule in self.sampler.alerts.rules])
+
+        with self._lock:
+            scans = sorted((name, dict(scan)) for name, scan in self.scans.items())
+        metric('scan_duration_seconds', 'gauge', '最近一次采集的耗时',
+               [({'collector': name}, f"{scan['duration']:.6f}") for name, scan in scans])
+        metric('scan_last_success_timestamp_seconds', 'gauge', '最近一次采集成功的时间',
+               [({'collector': name}, scan['success']) for name, scan in scans])
+        metric('scan_errors_total', 'counter', '采集失败次数',
+               [({'collector': name}, scan['errors']) for name, scan in scans])
+        metric('scan_items', 'gauge', '最近一次采集得到的条目数',
+               [({'collector': name}, scan['items']) for name, scan in scans if scan['items'] is not None])
+
+        self.body = ('\n'.join(lines) + '\n').encode('utf-8')
+        return self.body
+
+
+def scan_loop(session, buffer, interval, stop_event, sources=DEFAULT_SOURCES):
+    # 依次刷新选定的数据源并记录耗时；被依赖的数据源总是先刷新，未选中的数据源不会被采集
+    names = session.with_dependencies(sources)
+    while True:
+        for name in names:
+            start = time.perf_counter()
+            try:
+                value = session.refresh(name)
+                buffer.update_scan(name, time.perf_counter() - start, True,
+                                   len(value) if hasattr(value, '__len__') else None)
+            except Exception as e:
+                buffer.update_scan(name, time.perf_counter() - start, False)
+                print(f"采集 {name} 失败: {e}")
+        buffer.render()
+        if stop_event.wait(interval):
+            return
+
+
+def create_app(buffer):
+    app = Flask(__name__)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(buffer.body, content_type=CONTENT_TYPE)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以 Prometheus 文本格式提供本机资源使用率和清单扫描耗时')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=9465, help='监听端口')
+    parser.add_argument('--interval', type=float, default=5.0, help='资源采样间隔（秒）')
+    parser.add_argument('--scan-interval', type=float, default=300, help='清单扫描间隔（秒），0 表示不扫描')
+    parser.add_argument('--requirements', type=str, default='requirements.txt', help='依赖匹配使用的 requirements 文件')
+    parser.add_argument('--sources', type=str, default=','.join(DEFAULT_SOURCES),
+                        help='定时扫描的数据源，逗号分隔，依赖的数据源自动包含')
+    parser.add_argument('--rule', action='append', metavar='规则', help='告警规则，可重复指定')
+    args = parser.parse_args()
+    session = create_session(requirements_file=args.requirements, ttl=None)
+    sources = [name.strip() for name in args.sources.split(',') if name.strip()]
+    unknown = [name for name in sources if name not in session.names()]
+    if unknown:
+        parser.error(f"未知数据源: {', '.join(unknown)}（可选: {', '.join(session.names())}）")
+
+    sampler = MonitorSampler(interval=args.interval, history=1, network=True, alerts=AlertEngine(args.rule))
+    buffer = MetricsBuffer(sampler)
+    sampler.add_listener(buffer.render)
+    sampler.start()
+
+    stop_event = threading.Event()
+    if args.scan_interval > 0:
+        threading.Thread(target=scan_loop, args=(session, buffer, args.scan_interval, stop_event, sources),
+                         daemon=True).start()
+
+    try:
+        create_app(buffer).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        stop_event.set()
+        sampler.stop()
+
+
+if __name__ == '__main__':
+    main()
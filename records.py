@@ -0,0 +1,63 @@
+# 清单记录类型
+# 各采集函数、依赖匹配和导出共用的紧凑记录。基于 namedtuple，没有实例字典，按下标访问的旧代码
+# （row[0]、row[1]）无需改动；包名和版本号经过 sys.intern，同一进程中扫描多个环境时相同字符串只存一份。
+import sys
+from collections import namedtuple
+
+# location 只有可编辑安装（pip install -e）才有
+Package = namedtuple('Package', ['name', 'version', 'location'], defaults=[None])
+# 编程语言、前端框架等外部工具
+Tool = namedtuple('Tool', ['name', 'version'])
+# requirements.txt 中的一行，未固定版本时 version 为 None
+RequirementPin = namedtuple('RequirementPin', ['name', 'version'], defaults=[None])
+RequirementMatch = namedtuple('RequirementMatch', ['name', 'required', 'installed', 'matched'])
+# conda 环境中的包：source 为 conda 或 pip，pip 安装的包没有 build，channel 为 pypi
+CondaPackage = namedtuple('CondaPackage', ['name', 'version', 'build', 'channel', 'source'])
+# 元数据索引中的一个分发包：requires 为依赖声明列表，top_level 为顶层模块名列表，size 为 RECORD 中登记的字节数
+DistributionInfo = namedtuple('DistributionInfo', ['name', 'version', 'summary', 'license', 'requires', 'top_level',
+                                                   'file_count', 'size', 'location'])
+# 操作系统包管理器（dpkg/rpm/apk）登记的包
+SystemPackage = namedtuple('SystemPackage', ['name', 'version', 'arch', 'manager'])
+# 扩展模块链接的动态库：source 为 system（由系统包提供）、bundled（随 wheel 附带）或 missing（找不到提供者）
+NativeLink = namedtuple('NativeLink', ['package', 'extension', 'library', 'source', 'owner', 'version'],
+                        defaults=[None, None])
+DependencyProblem = namedtuple('DependencyProblem',
+                               ['package', 'version', 'dependency', 'specifier', 'installed', 'kind'])
+
+
+def package(name, version, location=None):
+    return Package(sys.intern(name), sys.intern(version), location)
+
+
+def conda_package(name, version, build, channel, source):
+    return CondaPackage(sys.intern(name), sys.intern(version), build, sys.intern(channel), source)
+
+
+def system_package(name, version, arch, manager):
+    return SystemPackage(sys.intern(name), sys.intern(version), sys.intern(arch), manager)
+
+
+def to_row(record):
+    # 导出为 JSON/YAML 时的列表形式，去掉末尾为空的可选字段，与旧版导出格式保持一致
+    row = list(record)
+    while row and row[-1] is None:
+        row.pop()
+    return row
+
+
+def to_dict(record):
+    return {field: value for field, value in zip(record._fields, record) if value is not None}
+
+
+def write_excel(path, records, columns):
+    # 只有写 Excel 时才导入 pandas
+    import pandas as pd
+    pd.DataFrame(records, columns=columns).to_excel(path, index=False)
+
+
+def write_excel_sheets(path, sheets):
+    # sheets 为 [(工作表名, 记录, 列名)]，写入同一个工作簿
+    import pandas as pd
+    with pd.ExcelWriter(path) as writer:
+        for name, records, columns in sheets:
+            pd.DataFrame(records, columns=columns).to_excel(writer, sheet_name=name[:31], index=False)
@@ -0,0 +1,235 @@
+# 快照对比
+# 比较两个包清单快照（导出的 JSON/NDJSON/YAML、虚拟环境或 site-packages 目录、当前环境的实时扫描），
+# 基于 {规范化包名: 版本} 的字典做集合运算，得到新增/删除/升级/降级的包，可选地对比依赖图的边。
+# 只有版本不同的包才需要解析版本号，5,000 个包的快照对比在毫秒级完成。
+#
+#   python snapshot_diff.py yesterday/export.json live
+#   python snapshot_diff.py staging.json prod.json --graph --output results/delta.xlsx
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from importlib import metadata
+
+from packaging.version import Version, InvalidVersion
+
+from dep_analytics import normalize_name, read_dependency_edges
+
+LIVE = 'live'
+CHANGE_TYPES = (('added', '新增'), ('removed', '删除'), ('upgraded', '升级'), ('downgraded', '降级'),
+                ('changed', '版本变化'))
+
+
+@lru_cache(maxsize=None)
+def _parse_version(version):
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return None
+
+
+def site_packages_of(path):
+    # 虚拟环境或 Python 安装目录下的 site-packages，本身就是 site-packages 时原样返回
+    if os.path.exists(os.path.join(path, 'pyvenv.cfg')) or os.path.isdir(os.path.join(path, 'lib')):
+        found = glob.glob(os.path.join(path, 'lib', 'python*', 'site-packages'))
+        found += glob.glob(os.path.join(path, 'Lib', 'site-packages'))
+        if found:
+            return found
+    return [path]
+
+
+def snapshot_from_distributions(distributions, label, with_edges=True):
+    distributions = list(distributions)
+    packages = {}
+    for dist in distributions:
+        name = dist.metadata['Name']
+        if name and normalize_name(name) not in packages:
+            packages[normalize_name(name)] = (name, dist.version)
+    edges = read_dependency_edges(distributions)[1] if with_edges else None
+    return {'label': label, 'packages': packages, 'edges': edges}
+
+
+def snapshot_from_ndjson(path):
+    packages = {}
+    edges = {}
+    label = os.path.basename(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['type'] == 'package':
+                packages[normalize_name(record['name'])] = (record['name'], record['version'])
+            elif record['type'] == 'dependency':
+                edges.setdefault(normalize_name(record['package']), set()).add(normalize_name(record['requires']))
+            elif record['type'] == 'meta':
+                label = record.get('host') or label
+                if record.get('exported_at'):
+                    label = f"{label} @ {record['exported_at']}"
+    return {'label': label, 'packages': packages, 'edges': edges}
+
+
+def snapshot_from_export(path):
+    if path.endswith('.ndjson'):
+        return snapshot_from_ndjson(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        else:
+            data = json.load(f)
+    packages = {}
+    for row in data.get('packages', []):
+        if len(row) >= 2:
+            packages[normalize_name(row[0])] = (row[0], row[1])
+
+    # 较早的导出中没有依赖关系，此时不做依赖图对比
+    edges = None
+    dependencies = (data.get('dependency_analytics') or {}).get('dependencies')
+    if dependencies is not None:
+        edges = {normalize_name(name): {normalize_name(dep) for dep in deps} for name, deps in dependencies.items()}
+    label = data.get('host') or os.path.basename(path)
+    if data.get('exported_at'):
+        label = f"{label} @ {data['exported_at']}"
+    return {'label': label, 'packages': packages, 'edges': edges}
+
+
+def load_snapshot(source, with_edges=True):
+    # source 可以是 live（当前环境）、导出文件、虚拟环境目录或 site-packages 目录
+    if source == LIVE:
+        return snapshot_from_distributions(metadata.distributions(), '当前环境', with_edges)
+    if os.path.isdir(source):
+        distributions = metadata.distributions(path=site_packages_of(source))
+        return snapshot_from_distributions(distributions, source, with_edges)
+    return snapshot_from_export(source)
+
+
+def diff_snapshots(old, new, include_graph=False):
+    old_packages = old['packages']
+    new_packages = new['packages']
+    delta = {key: [] for key, _ in CHANGE_TYPES}
+
+    for key in new_packages.keys() - old_packages.keys():
+        delta['added'].append(list(new_packages[key]))
+    for key in old_packages.keys() - new_packages.keys():
+        delta['removed'].append(list(old_packages[key]))
+    for key in new_packages.keys() & old_packages.keys():
+        old_version = old_packages[key][1]
+        new_version = new_packages[key][1]
+        if old_version == new_version:
+            continue
+        old_parsed = _parse_version(old_version)
+        new_parsed = _parse_version(new_version)
+        if old_parsed is None or new_parsed is None or old_parsed == new_parsed:
+            # 无法比较的版本号，或只是写法不同（如 1.0 与 1.0.0）
+            change = 'changed'
+        else:
+            change = 'upgraded' if new_parsed > old_parsed else 'downgraded'
+        delta[change].append([new_packages[key][0], old_version, new_version])
+    for rows in delta.values():
+        rows.sort(key=lambda row: row[0].lower())
+
+    result = {
+        'old': old['label'],
+        'new': new['label'],
+        'compared_at': datetime.now().isoformat(timespec='seconds'),
+        'summary': {key: len(rows) for key, rows in delta.items()},
+        'packages': delta,
+    }
+    if include_graph and old.get('edges') is not None and new.get('edges') is not None:
+        result['dependencies'] = diff_edges(old, new)
+    return result
+
+
+def diff_edges(old, new):
+    # 只比较两边都安装了的包之间的依赖边，包本身的增删已经体现在包清单的差异中
+    common = old['packages'].keys() & new['packages'].keys()
+
+    def edge_set(snapshot):
+        return {(parent, child) for parent, children in snapshot['edges'].items() if parent in common
+                for child in children if child in common}
+
+    old_edges = edge_set(old)
+    new_edges = edge_set(new)
+
+    def display(edges):
+        names = new['packages']
+        return sorted(([names[parent][0], names[child][0]] for parent, child in edges),
+                      key=lambda row: (row[0].lower(), row[1].lower()))
+
+    return {'added': display(new_edges - old_edges), 'removed': display(old_edges - new_edges)}
+
+
+def has_changes(delta):
+    return any(delta['summary'].values()) or any((delta.get('dependencies') or {}).values())
+
+
+def format_delta(delta):
+    lines = [f"{delta['old']} -> {delta['new']}"]
+    for name, version in delta['packages']['added']:
+        lines.append(f"+ {name} {version}")
+    for name, version in delta['packages']['removed']:
+        lines.append(f"- {name} {version}")
+    for key, marker in (('upgraded', '↑'), ('downgraded', '↓'), ('changed', '*')):
+        for name, old_version, new_version in delta['packages'][key]:
+            lines.append(f"{marker} {name} {old_version} -> {new_version}")
+    if 'dependencies' in delta:
+        for parent, child in delta['dependencies']['added']:
+            lines.append(f"+ 依赖 {parent} -> {child}")
+        for parent, child in delta['dependencies']['removed']:
+            lines.append(f"- 依赖 {parent} -> {child}")
+    summary = '，'.join(f"{label} {delta['summary'][key]}" for key, label in CHANGE_TYPES)
+    lines.append(summary)
+    return lines
+
+
+def save_delta(delta, path):
+    # 按扩展名保存为 JSON 或 Excel（每种变化一个工作表）
+    if not path.endswith('.xlsx'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(delta, f, ensure_ascii=False, indent=2)
+        return
+
+    import pandas as pd
+    with pd.ExcelWriter(path) as writer:
+        rows = [[label, delta['summary'][key]] for key, label in CHANGE_TYPES]
+        pd.DataFrame([['对比', f"{delta['old']} -> {delta['new']}"]] + rows,
+                     columns=['项目', '数量']).to_excel(writer, sheet_name='概要', index=False)
+        for key, label in CHANGE_TYPES:
+            columns = ['包名', '版本'] if key in ('added', 'removed') else ['包名', '原版本', '新版本']
+            pd.DataFrame(delta['packages'][key], columns=columns).to_excel(writer, sheet_name=label, index=False)
+        if 'dependencies' in delta:
+            for key, label in (('added', '新增依赖'), ('removed', '删除依赖')):
+                pd.DataFrame(delta['dependencies'][key], columns=['包名', '依赖']).to_excel(
+                    writer, sheet_name=label, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比两个包清单快照')
+    parser.add_argument('old', help='旧快照：导出的 JSON/YAML、虚拟环境或 site-packages 目录，或 live 表示当前环境')
+    parser.add_argument('new', help='新快照，格式同上')
+    parser.add_argument('--graph', action='store_true', help='同时对比依赖关系')
+    parser.add_argument('--output', type=str, help='保存差异报告，.json 或 .xlsx')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    old = load_snapshot(args.old, args.graph)
+    new = load_snapshot(args.new, args.graph)
+    loaded = time.perf_counter()
+    delta = diff_snapshots(old, new, args.graph)
+    compared = time.perf_counter()
+
+    print('\n'.join(format_delta(delta)))
+    if args.graph and 'dependencies' not in delta:
+        print("快照中没有依赖关系数据，已跳过依赖对比", file=sys.stderr)
+    if args.output:
+        save_delta(delta, args.output)
+        print(f"差异报告已保存到 {args.output}")
+    print(f"加载 {1000 * (loaded - start):.1f}ms，对比 {1000 * (compared - loaded):.1f}ms", file=sys.stderr)
+    sys.exit(1 if has_changes(delta) else 0)
+
+
+if __name__ == '__main__':
+    main()
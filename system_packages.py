@@ -0,0 +1,359 @@
+# 系统包清单与扩展模块的动态库依赖
+# 直接流式读取包管理器的数据库，不运行 dpkg -l / rpm -qa：
+#   - dpkg：/var/lib/dpkg/status，文件归属来自 /var/lib/dpkg/info/*.list
+#   - rpm：/var/lib/rpm/rpmdb.sqlite 中的包头（旧版 Berkeley DB 格式不支持）
+#   - apk：/var/lib/apk/installed
+# 得到 包名 -> 版本 的索引和 动态库文件名 -> 包名 的索引，按数据库文件的 mtime 缓存在 results/system_packages_cache.json。
+# 再读取已安装包中扩展模块（.so）ELF 头里的 DT_NEEDED，与索引关联，得到每个 wheel 依赖的 openssl、libstdc++ 等系统包及其版本。
+#
+#   python system_packages.py --package cryptography
+#   python system_packages.py --output results/native_links.xlsx
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import struct
+import time
+from importlib import metadata
+
+from dep_analytics import normalize_name
+from records import NativeLink, system_package, to_row, write_excel
+
+DEFAULT_CACHE = os.path.join('results', 'system_packages_cache.json')
+DPKG_STATUS = '/var/lib/dpkg/status'
+DPKG_INFO = '/var/lib/dpkg/info'
+RPM_SQLITE = '/var/lib/rpm/rpmdb.sqlite'
+APK_INSTALLED = '/var/lib/apk/installed'
+
+# rpm 包头中的标签和数据类型
+RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH, RPMTAG_ARCH = 1000, 1001, 1002, 1003, 1022
+RPMTAG_BASENAMES = 1117
+RPM_INT32, RPM_STRING, RPM_STRING_ARRAY, RPM_I18NSTRING = 4, 6, 8, 9
+
+# ELF 动态段
+SHT_DYNAMIC = 6
+DT_NULL, DT_NEEDED = 0, 1
+
+
+def is_library(path):
+    return '.so' in os.path.basename(path)
+
+
+def iter_stanzas(path):
+    # dpkg status 与 apk installed 都是空行分隔的段落，逐行读取，不把整个文件读入内存
+    stanza = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line:
+                stanza.append(line)
+            elif stanza:
+                yield stanza
+                stanza = []
+    if stanza:
+        yield stanza
+
+
+def parse_dpkg_status(path=DPKG_STATUS):
+    # 返回 [(包名, 版本, 架构)]，只保留状态为已安装的包；续行（以空格开头）全部跳过
+    packages = []
+    for stanza in iter_stanzas(path):
+        fields = {}
+        for line in stanza:
+            if line[0] in ' \t':
+                continue
+            key, _, value = line.partition(':')
+            if key in ('Package', 'Status', 'Version', 'Architecture'):
+                fields[key] = value.strip()
+        if fields.get('Status', '').endswith(' installed') and 'Package' in fields:
+            packages.append((fields['Package'], fields.get('Version', ''), fields.get('Architecture', '')))
+    return packages
+
+
+def dpkg_library_owners(info_dir=DPKG_INFO):
+    # {动态库文件名: 包名}，来自每个包的文件列表 <包名>[:架构].list
+    owners = {}
+    for list_path in glob.glob(os.path.join(info_dir, '*.list')):
+        name = os.path.basename(list_path)[:-len('.list')].split(':')[0]
+        with open(list_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if '.so' in line:
+                    owners.setdefault(os.path.basename(line.rstrip('\n')), name)
+    return owners
+
+
+def parse_apk_installed(path=APK_INSTALLED):
+    # P: 包名，V: 版本，A: 架构，F: 目录，R: 该目录下的文件
+    packages = []
+    owners = {}
+    for stanza in iter_stanzas(path):
+        fields = {}
+        for line in stanza:
+            key, _, value = line.partition(':')
+            if key in ('P', 'V', 'A'):
+                fields[key] = value
+            elif key == 'R' and is_library(value) and 'P' in fields:
+                owners.setdefault(value, fields['P'])
+        if 'P' in fields:
+            packages.append((fields['P'], fields.get('V', ''), fields.get('A', '')))
+    return packages, owners
+
+
+def parse_rpm_header(blob):
+    # 包头：条目数、数据区长度（大端），随后每个条目为 (标签, 类型, 偏移, 个数)，最后是数据区
+    count, _ = struct.unpack_from('>ii', blob, 0)
+    data_start = 8 + 16 * count
+    wanted = (RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH, RPMTAG_ARCH, RPMTAG_BASENAMES)
+    tags = {}
+    for i in range(count):
+        tag, kind, offset, number = struct.unpack_from('>iiii', blob, 8 + 16 * i)
+        if tag not in wanted:
+            continue
+        position = data_start + offset
+        if kind == RPM_INT32:
+            tags[tag] = struct.unpack_from(f'>{number}i', blob, position)
+        elif kind in (RPM_STRING, RPM_STRING_ARRAY, RPM_I18NSTRING):
+            values = []
+            for _ in range(number if kind == RPM_STRING_ARRAY else 1):
+                end = blob.index(b'\0', position)
+                values.append(blob[position:end].decode('utf-8', 'replace'))
+                position = end + 1
+            tags[tag] = values
+    return tags
+
+
+def parse_rpmdb(path=RPM_SQLITE):
+    # 以只读方式打开 rpm 的 sqlite 数据库，逐行解析 Packages 表中的包头
+    packages = []
+    owners = {}
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        for (blob,) in connection.execute('SELECT blob FROM Packages'):
+            tags = parse_rpm_header(bytes(blob))
+            if RPMTAG_NAME not in tags:
+                continue
+            name = tags[RPMTAG_NAME][0]
+            version = f"{tags.get(RPMTAG_VERSION, [''])[0]}-{tags.get(RPMTAG_RELEASE, [''])[0]}"
+            if tags.get(RPMTAG_EPOCH):
+                version = f"{tags[RPMTAG_EPOCH][0]}:{version}"
+            packages.append((name, version, tags.get(RPMTAG_ARCH, [''])[0]))
+            for basename in tags.get(RPMTAG_BASENAMES, ()):
+                if is_library(basename):
+                    owners.setdefault(basename, name)
+    finally:
+        connection.close()
+    return packages, owners
+
+
+def detect_database():
+    # 返回 (包管理器, 数据库文件, 缓存键涉及的路径)；dpkg 安装时 info 目录的 mtime 也会变化
+    if os.path.exists(DPKG_STATUS):
+        return 'dpkg', DPKG_STATUS, [DPKG_STATUS, DPKG_INFO]
+    if os.path.exists(RPM_SQLITE):
+        return 'rpm', RPM_SQLITE, [RPM_SQLITE]
+    if os.path.exists(APK_INSTALLED):
+        return 'apk', APK_INSTALLED, [APK_INSTALLED]
+    return None, None, []
+
+
+def load_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    if not cache_path:
+        return
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(temp_path, cache_path)
+
+
+class SystemIndex:
+    def __init__(self, manager, packages, owners):
+        self.manager = manager
+        self.packages = packages
+        self.versions = {package.name: package.version for package in packages}
+        self.owners = owners
+
+    def __len__(self):
+        return len(self.packages)
+
+    def owner_of(self, library):
+        # 返回 (包名, 版本) 或 None
+        name = self.owners.get(os.path.basename(library))
+        return (name, self.versions.get(name)) if name else None
+
+
+def load_system_index(cache_path=DEFAULT_CACHE, refresh=False):
+    manager, database, stamp_paths = detect_database()
+    if manager is None:
+        return SystemIndex(None, [], {})
+    stamp = [os.stat(path).st_mtime_ns for path in stamp_paths]
+    cache = load_cache(cache_path)
+    index = cache.get('index')
+    if refresh or not index or index.get('manager') != manager or index.get('stamp') != stamp:
+        if manager == 'dpkg':
+            packages, owners = parse_dpkg_status(database), dpkg_library_owners()
+        elif manager == 'rpm':
+            packages, owners = parse_rpmdb(database)
+        else:
+            packages, owners = parse_apk_installed(database)
+        index = {'manager': manager, 'stamp': stamp, 'packages': packages, 'owners': owners}
+        cache['index'] = index
+        save_cache(cache_path, cache)
+    return SystemIndex(manager, [system_package(*row, manager) for row in index['packages']], index['owners'])
+
+
+def elf_needed(path):
+    # 读取 ELF 动态段中的 DT_NEEDED；只读取文件头、节头表和两个相关的节，大文件也不必整体读入
+    with open(path, 'rb') as f:
+        ident = f.read(16)
+        if len(ident) < 16 or ident[:4] != b'\x7fELF':
+            return []
+        is64 = ident[4] == 2
+        order = '<' if ident[5] == 1 else '>'
+        if is64:
+            header = struct.unpack(order + 'HHIQQQIHHHHHH', f.read(48))
+            section_format, entry_format = order + 'IIQQQQIIQQ', order + 'qQ'
+        else:
+            header = struct.unpack(order + 'HHIIIIIHHHHHH', f.read(36))
+            section_format, entry_format = order + 'IIIIIIIIII', order + 'iI'
+        section_offset, section_size, section_count = header[5], header[10], header[11]
+        if not section_offset or not section_count:
+            return []
+        f.seek(section_offset)
+        table = f.read(section_size * section_count)
+        sections = [struct.unpack_from(section_format, table, i * section_size) for i in range(section_count)]
+
+        needed = []
+        entry_size = struct.calcsize(entry_format)
+        for section in sections:
+            # (名称, 类型, 标志, 地址, 偏移, 大小, 关联节, ...)
+            if section[1] != SHT_DYNAMIC:
+                continue
+            f.seek(section[4])
+            dynamic = f.read(section[5])
+            strings = sections[section[6]]
+            f.seek(strings[4])
+            string_table = f.read(strings[5])
+            for tag, value in struct.iter_unpack(entry_format, dynamic[:len(dynamic) - len(dynamic) % entry_size]):
+                if tag == DT_NULL:
+                    break
+                if tag == DT_NEEDED:
+                    needed.append(string_table[value:string_table.index(b'\0', value)].decode('utf-8', 'replace'))
+        return needed
+
+
+def extension_modules(distributions=None):
+    # 返回 [(包名, 扩展模块绝对路径, 该包自带的动态库文件名集合)]
+    if distributions is None:
+        distributions = metadata.distributions()
+    modules = []
+    seen = set()
+    for dist in distributions:
+        name = dist.metadata['Name']
+        if not name or normalize_name(name) in seen or not dist.files:
+            continue
+        seen.add(normalize_name(name))
+        libraries = [file for file in dist.files if file.name.endswith('.so') or '.so.' in file.name]
+        bundled = {file.name for file in libraries}
+        for file in libraries:
+            modules.append((name, str(dist.locate_file(file)), bundled))
+    return modules
+
+
+def native_links(distributions=None, index=None, cache_path=DEFAULT_CACHE, packages=None):
+    # 把扩展模块的 DT_NEEDED 与系统包索引关联；ELF 解析结果按 (大小, mtime) 缓存
+    if index is None:
+        index = load_system_index(cache_path)
+    wanted = {normalize_name(name) for name in packages} if packages else None
+    cache = load_cache(cache_path)
+    elf_cache = cache.get('elf', {})
+    changed = False
+    links = []
+    for name, path, bundled in extension_modules(distributions):
+        if wanted is not None and normalize_name(name) not in wanted:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        cached = elf_cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            needed = cached[2]
+        else:
+            try:
+                needed = elf_needed(path)
+            except (OSError, struct.error, ValueError, IndexError):
+                needed = []
+            elf_cache[path] = [stat.st_size, stat.st_mtime_ns, needed]
+            changed = True
+        for library in needed:
+            owner = index.owner_of(library)
+            if library in bundled:
+                links.append(NativeLink(name, path, library, 'bundled'))
+            elif owner:
+                links.append(NativeLink(name, path, library, 'system', *owner))
+            else:
+                links.append(NativeLink(name, path, library, 'missing'))
+    if changed:
+        # 缓存文件可能已被 load_system_index 更新，重新读取后只替换 ELF 部分
+        cache = load_cache(cache_path)
+        cache['elf'] = {path: value for path, value in elf_cache.items() if os.path.exists(path)}
+        save_cache(cache_path, cache)
+    return links
+
+
+def system_dependencies(links):
+    # {包名: {系统包: 版本}}，供安全检查和依赖报告列出每个 wheel 依赖的系统包
+    result = {}
+    for link in links:
+        if link.source == 'system':
+            result.setdefault(link.package, {})[link.owner] = link.version
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='读取系统包数据库，列出扩展模块依赖的系统包')
+    parser.add_argument('--package', type=str, action='append', help='只检查指定的 Python 包，可重复')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存重新读取包数据库')
+    parser.add_argument('--output', type=str, help='保存为 .json 或 .xlsx')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = load_system_index(refresh=args.refresh)
+    loaded = time.perf_counter()
+    if index.manager is None:
+        print('未找到 dpkg、rpm 或 apk 的包数据库')
+    else:
+        print(f"{index.manager}: {len(index)} 个系统包，{len(index.owners)} 个动态库，耗时 {1000 * (loaded - start):.1f}ms")
+
+    links = native_links(index=index, packages=args.package)
+    for name, owners in sorted(system_dependencies(links).items(), key=lambda item: item[0].lower()):
+        print(f"{name}: " + '，'.join(f"{owner} {version}" for owner, version in sorted(owners.items())))
+    missing = sorted({(link.package, link.library) for link in links if link.source == 'missing'})
+    for name, library in missing:
+        print(f"[未找到提供者] {name}: {library}")
+    print(f"共 {len(links)} 条链接，耗时 {1000 * (time.perf_counter() - start):.1f}ms")
+
+    if args.output:
+        if args.output.endswith('.xlsx'):
+            write_excel(args.output, [list(link) for link in links],
+                        ['包名', '扩展模块', '动态库', '来源', '系统包', '版本'])
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump([to_row(link) for link in links], f, ensure_ascii=False, indent=2)
+        print(f"已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def write_dist_info(site_dir, name, version, requires=(), top_level=None, files=None, summary=''):
+    # 在 site_dir 下生成一个最小的 .dist-info 目录
+    dist_info = os.path.join(site_dir, f"{name.replace('-', '_')}-{version}.dist-info")
+    os.makedirs(dist_info, exist_ok=True)
+    lines = ['Metadata-Version: 2.1', f'Name: {name}', f'Version: {version}', f'Summary: {summary}']
+    lines += [f'Requires-Dist: {line}' for line in requires]
+    with open(os.path.join(dist_info, 'METADATA'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    if top_level is not None:
+        with open(os.path.join(dist_info, 'top_level.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(top_level) + '\n')
+    if files is not None:
+        with open(os.path.join(dist_info, 'RECORD'), 'w', encoding='utf-8') as f:
+            f.write(''.join(f'{path},,\n' for path in files))
+    return dist_info
+
+
+@pytest.fixture
+def site_dir(tmp_path):
+    path = tmp_path / 'site-packages'
+    path.mkdir()
+    return str(path)
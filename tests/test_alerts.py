@@ -0,0 +1,56 @@
+import pytest
+
+from alerts import AlertEngine, AverageRule, SlopeRule, ThresholdRule, parse_rule, parse_rules
+
+
+def feed(engine, metric, values, step=1.0):
+    events = []
+    for index, value in enumerate(values):
+        events.extend(engine.evaluate({'time': index * step, metric: value}))
+    return events
+
+
+def test_parse_rule_forms():
+    rule = parse_rule('cpu > 90% for 2min')
+    assert isinstance(rule, ThresholdRule) and (rule.metric, rule.op, rule.threshold, rule.duration) == ('cpu', '>', 90, 120)
+    rule = parse_rule('avg(memory, 60s) >= 80')
+    assert isinstance(rule, AverageRule) and (rule.window, rule.op) == (60, '>=')
+    rule = parse_rule('slope(memory, 5min) > 5/min')
+    assert isinstance(rule, SlopeRule) and rule.window == 300
+    assert [rule.text for rule in parse_rules('cpu > 90; disk > 95\n')] == ['cpu > 90', 'disk > 95']
+    with pytest.raises(ValueError):
+        parse_rule('cpu is high')
+
+
+def test_threshold_fires_after_duration_and_resolves():
+    engine = AlertEngine(['cpu > 90 for 3s'])
+    events = feed(engine, 'cpu', [95, 95, 95, 95, 50])
+    assert [(alert.time, alert.state) for alert in events] == [(3.0, 'firing'), (4.0, 'resolved')]
+    assert engine.active == {}
+    assert len(engine.alerts()) == 2
+
+
+def test_threshold_restarts_when_interrupted():
+    engine = AlertEngine(['cpu > 90 for 3s'])
+    assert feed(engine, 'cpu', [95, 95, 50, 95, 95, 95]) == []
+
+
+def test_average_waits_for_full_window():
+    engine = AlertEngine(['avg(cpu, 3s) > 80'])
+    events = feed(engine, 'cpu', [100, 100, 100, 100, 100])
+    assert [(alert.time, alert.state) for alert in events] == [(4.0, 'firing')]
+    assert events[0].value == pytest.approx(100)
+
+
+def test_slope_ignores_flat_and_catches_growth():
+    engine = AlertEngine(['slope(memory, 60s) > 5'])
+    assert feed(engine, 'memory', [40] * 120) == []
+    engine = AlertEngine(['slope(memory, 60s) > 5'])
+    events = feed(engine, 'memory', [40 + index * 0.5 for index in range(120)])
+    assert [alert.state for alert in events] == ['firing']
+    assert 5 < events[0].value <= 30
+
+
+def test_missing_metric_is_skipped():
+    engine = AlertEngine(['disk > 90'])
+    assert engine.evaluate({'time': 0, 'cpu': 99}) == []
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+from importlib import metadata
+
+from packaging.markers import default_environment
+
+from conftest import ROOT, write_dist_info
+from consistency_check import check_installed_requirements, match_requirement_pins
+from piplist import interpreter_info, venv_environment
+from records import RequirementPin, package
+
+
+def run_batch(tmp_path, *arguments):
+    command = [sys.executable, os.path.join(ROOT, 'piplist.py'), '--sections', 'requirements,consistency',
+               '--progress', 'json', '--db', str(tmp_path / 'index.sqlite'), '-o', str(tmp_path / 'out'),
+               *arguments]
+    return subprocess.run(command, cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120)
+
+
+def test_match_requirement_pins_normalizes_names_and_accepts_unpinned():
+    packages = [package('Flask', '3.1.3'), package('numpy', '2.4.6'), package('PyYAML', '6.0.3')]
+    pins = [RequirementPin('flask', '3.1.3'), RequirementPin('numpy'), RequirementPin('pyyaml>=6,<7'),
+            RequirementPin('# 注释'), RequirementPin('-r other.txt'), RequirementPin('missing-pkg')]
+    matches = {match.name: match for match in match_requirement_pins(packages, pins)}
+    assert set(matches) == {'flask', 'numpy', 'pyyaml', 'missing-pkg'}
+    assert matches['flask'].matched and matches['flask'].installed == '3.1.3'
+    assert matches['numpy'].matched and matches['numpy'].required == '未指定版本'
+    assert matches['pyyaml'].matched
+    assert not matches['missing-pkg'].matched and matches['missing-pkg'].installed == '未安装'
+
+
+def test_batch_exit_codes(tmp_path, site_dir):
+    write_dist_info(site_dir, 'Flask', '3.1.3')
+    write_dist_info(site_dir, 'numpy', '2.4.6')
+    (tmp_path / 'ok.txt').write_text('flask==3.1.3\nnumpy\n', encoding='utf-8')
+    (tmp_path / 'bad.txt').write_text('flask==3.0.0\nnumpy\n', encoding='utf-8')
+
+    result = run_batch(tmp_path, '--venv', site_dir, '-r', 'ok.txt')
+    assert result.returncode == 0, result.stderr.decode('utf-8')
+    events = [json.loads(line) for line in result.stderr.decode('utf-8').splitlines()]
+    assert [event['event'] for event in events] == ['start', 'done']
+    assert json.loads(result.stdout)[events[-1]['target']]['status'] == 'ok'
+
+    assert run_batch(tmp_path, '--venv', site_dir, '-r', 'bad.txt').returncode == 1
+    assert run_batch(tmp_path, '--venv', site_dir, '--venv', str(tmp_path / 'missing'), '-r', 'ok.txt').returncode == 2
+
+
+WINDOWS_38 = {'python_version': '3.8', 'python_full_version': '3.8.10', 'sys_platform': 'win32',
+              'os_name': 'nt', 'platform_system': 'Windows'}
+
+
+def test_markers_are_evaluated_for_the_target_environment(site_dir):
+    write_dist_info(site_dir, 'tool', '1.0', requires=['pywin32>=300; sys_platform == "win32"',
+                                                       'tomli; python_version < "3.11"'])
+    write_dist_info(site_dir, 'tomli', '2.0.1')
+    distributions = list(metadata.distributions(path=[site_dir]))
+    local = check_installed_requirements(distributions, default_environment())
+    target = check_installed_requirements(distributions, WINDOWS_38)
+    assert [problem.dependency for problem in target] == ['pywin32']
+    assert ('pywin32' in [problem.dependency for problem in local]) == (sys.platform == 'win32')
+
+    pins = [RequirementPin('colorama; os_name == "nt"'), RequirementPin('uvloop; sys_platform != "win32"')]
+    assert [match.name for match in match_requirement_pins([], pins, WINDOWS_38)] == ['colorama']
+
+
+def test_interpreter_info_matches_packaging_environment():
+    directories, environment = interpreter_info(sys.executable)
+    assert environment == default_environment()
+    assert directories and all(os.path.isabs(path) for path in directories)
+
+
+def test_venv_environment_from_layout(tmp_path):
+    assert venv_environment(str(tmp_path), [str(tmp_path / 'lib' / 'python3.8' / 'site-packages')]) == \
+        {'python_version': '3.8'}
+    assert venv_environment(str(tmp_path), [str(tmp_path / 'Lib' / 'site-packages')])['sys_platform'] == 'win32'
@@ -0,0 +1,44 @@
+from importlib import metadata
+
+from conftest import write_dist_info
+from dep_analytics import DependencyAnalytics
+
+
+def build(edges):
+    names = set(edges) | {dep for deps in edges.values() for dep in deps}
+    return DependencyAnalytics({name: name for name in names}, edges)
+
+
+def test_cycle_is_one_component_with_shared_closure():
+    analytics = build({'app': {'a', 'd'}, 'a': {'b'}, 'b': {'c'}, 'c': {'a'}, 'e': set()})
+    assert analytics.to_dict()['strongly_connected_components'] == [['a', 'b', 'c']]
+    assert len(analytics.components) == 4
+    assert analytics.requires_all('app') == ['a', 'b', 'c', 'd']
+    assert analytics.requires_all('b') == ['a', 'c']
+    assert analytics.pulled_in_by('a') == ['app', 'b', 'c']
+    assert analytics.removable_with('app') == ['a', 'b', 'c', 'd']
+    assert sorted(analytics.orphans) == ['app', 'e']
+
+
+def test_components_are_reverse_topological():
+    analytics = build({'top': {'mid'}, 'mid': {'x'}, 'x': {'y'}, 'y': {'x'}})
+    order = [sorted(component) for component in analytics.components]
+    assert order.index(['x', 'y']) < order.index(['mid']) < order.index(['top'])
+
+
+def test_long_chain_does_not_recurse():
+    size = 2000
+    analytics = build({f'p{i}': {f'p{i + 1}'} for i in range(size)})
+    assert len(analytics.components) == size + 1
+    assert len(analytics.descendants['p0']) == size
+    assert analytics.cycles == []
+
+
+def test_from_environment_skips_extras_and_missing(site_dir):
+    write_dist_info(site_dir, 'Flask', '3.0', requires=['Werkzeug>=3', 'python-dotenv; extra == "dotenv"', 'absent'])
+    write_dist_info(site_dir, 'werkzeug', '3.0')
+    write_dist_info(site_dir, 'python-dotenv', '1.0')
+    analytics = DependencyAnalytics.from_environment(metadata.distributions(path=[site_dir]))
+    assert analytics.dependencies('flask') == ['werkzeug']
+    assert analytics.dependents('Werkzeug') == ['Flask']
+    assert analytics.is_installed('python_dotenv') and not analytics.is_installed('absent')
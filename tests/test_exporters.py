@@ -0,0 +1,80 @@
+import json
+
+import pytest
+import yaml
+
+import exporters
+from records import Tool, package
+from snapshot_diff import snapshot_from_export
+
+
+def export_data():
+    return {
+        'host': 'build-01',
+        'exported_at': '2026-10-19T14:00:00',
+        'packages': (record for record in [package('Flask', '3.0.0'), package('local-tool', '0.1', '/src/local-tool')]),
+        'languages': [Tool('Python', '3.12.1')],
+        'dependency_analytics': {
+            'orphans': ['Flask'],
+            'dependencies': exporters.MappingStream(iter([('Flask', ['Werkzeug'])])),
+        },
+    }
+
+
+def plain_data():
+    return {
+        'host': 'build-01',
+        'exported_at': '2026-10-19T14:00:00',
+        'packages': [['Flask', '3.0.0'], ['local-tool', '0.1', '/src/local-tool']],
+        'languages': [['Python', '3.12.1']],
+        'dependency_analytics': {'orphans': ['Flask'], 'dependencies': {'Flask': ['Werkzeug']}},
+    }
+
+
+@pytest.mark.parametrize('fmt', ['json', 'yaml'])
+def test_document_exports_match_plain_serialization(tmp_path, fmt):
+    file_name, writer = exporters.EXPORTERS[fmt]
+    path = tmp_path / file_name
+    writer(export_data(), str(path))
+    with open(path, encoding='utf-8') as f:
+        loaded = json.load(f) if fmt == 'json' else yaml.safe_load(f)
+    assert loaded == plain_data()
+
+
+@pytest.mark.parametrize('fmt', ['json', 'yaml', 'ndjson'])
+def test_exports_load_as_snapshots(tmp_path, fmt):
+    file_name, writer = exporters.EXPORTERS[fmt]
+    path = tmp_path / file_name
+    writer(export_data(), str(path))
+    snapshot = snapshot_from_export(str(path))
+    assert snapshot['label'] == 'build-01 @ 2026-10-19T14:00:00'
+    assert snapshot['packages'] == {'flask': ('Flask', '3.0.0'), 'local-tool': ('local-tool', '0.1')}
+    assert snapshot['edges'] == {'flask': {'werkzeug'}}
+
+
+@pytest.mark.skipif(exporters.msgpack is None, reason='未安装 msgpack')
+def test_msgpack_matches_ndjson_records(tmp_path):
+    exporters.write_msgpack(export_data(), str(tmp_path / 'export.msgpack'))
+    exporters.write_ndjson(export_data(), str(tmp_path / 'export.ndjson'))
+    with open(tmp_path / 'export.ndjson', encoding='utf-8') as f:
+        expected = [json.loads(line) for line in f]
+    assert list(exporters.read_msgpack(str(tmp_path / 'export.msgpack'))) == expected
+    assert {'type': 'package', 'name': 'local-tool', 'version': '0.1', 'location': '/src/local-tool'} in expected
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'msgpack'])
+def test_record_streams_keep_location_from_plain_rows(tmp_path, fmt):
+    if fmt == 'msgpack' and exporters.msgpack is None:
+        pytest.skip('未安装 msgpack')
+    file_name, writer = exporters.EXPORTERS[fmt]
+    path = tmp_path / file_name
+    writer(plain_data(), str(path))
+    if fmt == 'ndjson':
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+    else:
+        records = list(exporters.read_msgpack(str(path)))
+    assert [record for record in records if record['type'] == 'package'] == [
+        {'type': 'package', 'name': 'Flask', 'version': '3.0.0'},
+        {'type': 'package', 'name': 'local-tool', 'version': '0.1', 'location': '/src/local-tool'},
+    ]
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import fleet_index
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_build_index_skips_non_snapshots(tmp_path, capsys):
+    write_json(tmp_path / 'a.json', {'host': 'a', 'packages': [['NumPy', '1.26.4'], ['urllib3', '1.26.0']]})
+    write_json(tmp_path / 'b.json', {'host': 'b', 'packages': [['numpy', '2.0.0']]})
+    write_json(tmp_path / 'trace.json', {'traceEvents': []})
+    write_json(tmp_path / 'list.json', [1, 2, 3])
+    write_json(tmp_path / 'summary.json', {'current': {'status': 'ok'}})
+    (tmp_path / 'broken.json').write_text('{', encoding='utf-8')
+
+    index = fleet_index.build_index(str(tmp_path), workers=1)
+    assert sorted(index.hosts) == ['a', 'b']
+    assert 'trace' not in index.hosts
+    assert capsys.readouterr().err.count('跳过') == 4
+
+
+def test_read_snapshot_rejects_list_and_missing_packages(tmp_path):
+    write_json(tmp_path / 'list.json', [])
+    write_json(tmp_path / 'trace.json', {'traceEvents': []})
+    assert isinstance(fleet_index._read_snapshot_safe(str(tmp_path / 'list.json')), str)
+    assert isinstance(fleet_index._read_snapshot_safe(str(tmp_path / 'trace.json')), str)
+
+
+def test_duplicate_hosts_keep_newest_snapshot(tmp_path, capsys):
+    (tmp_path / '2026-10-01' / 'web-1').mkdir(parents=True)
+    (tmp_path / '2026-10-18' / 'web-1').mkdir(parents=True)
+    (tmp_path / 'web-2').mkdir()
+    write_json(tmp_path / '2026-10-18' / 'web-1' / 'export.json',
+               {'exported_at': '2026-10-18T09:00:00', 'packages': [['numpy', '2.0.0']]})
+    write_json(tmp_path / '2026-10-01' / 'web-1' / 'export.json',
+               {'exported_at': '2026-10-01T09:00:00', 'packages': [['numpy', '1.26.4'], ['urllib3', '1.26.0']]})
+    write_json(tmp_path / 'web-2' / 'export.json', {'packages': [['numpy', '2.0.0']]})
+
+    index = fleet_index.build_index(str(tmp_path), workers=1)
+    assert sorted(index.hosts) == ['web-1', 'web-2']
+    assert index.presence('urllib3') == ([], ['web-1', 'web-2'])
+    assert index.version_counts('numpy') == {'2.0.0': 2}
+    assert index.drift() == []
+    assert '2026-10-01' in capsys.readouterr().err
+
+
+def test_build_rejects_duplicate_hosts():
+    with pytest.raises(ValueError):
+        fleet_index.FleetIndex.build([('a', [('numpy', '1.0')]), ('a', [('numpy', '2.0')])])
@@ -0,0 +1,54 @@
+from conftest import write_dist_info
+from import_scanner import analyze_imports, import_name_index, parse_imports
+from metadata_index import MetadataIndex
+
+
+def build_index(tmp_path, site_dir):
+    write_dist_info(site_dir, 'PyYAML', '6.0', top_level=['_yaml', 'yaml'])
+    write_dist_info(site_dir, 'beautifulsoup4', '4.12.0', top_level=['bs4'])
+    write_dist_info(site_dir, 'openpyxl', '3.1.5', requires=['et-xmlfile'], files=['openpyxl/__init__.py'])
+    write_dist_info(site_dir, 'et-xmlfile', '2.0.0', top_level=['et_xmlfile'])
+    write_dist_info(site_dir, 'no-layout', '1.0')
+    index = MetadataIndex(str(tmp_path / 'index.sqlite'), [site_dir])
+    index.update()
+    return index
+
+
+def test_import_name_index_only_synthesizes_without_layout(tmp_path, site_dir):
+    names = import_name_index(build_index(tmp_path, site_dir).distributions())
+    assert names['yaml'] == {'pyyaml'}
+    assert names['bs4'] == {'beautifulsoup4'}
+    assert names['openpyxl'] == {'openpyxl'}
+    assert names['no_layout'] == {'no-layout'}
+    assert 'pyyaml' not in names and 'beautifulsoup4' not in names
+
+
+def test_analyze_imports_uses_index(tmp_path, site_dir):
+    project = tmp_path / 'project'
+    project.mkdir()
+    source = project / 'app.py'
+    source.write_text('import yaml\nfrom bs4 import BeautifulSoup\nimport openpyxl\nimport json\nimport mystery\n')
+    imports = {name: [str(source)] for name in parse_imports(str(source))}
+    declared = {'pyyaml': 'PyYAML', 'beautifulsoup4': 'beautifulsoup4', 'et-xmlfile': 'et-xmlfile'}
+
+    report = analyze_imports(imports, declared, str(project), build_index(tmp_path, site_dir).distributions())
+    assert report['unused'] == []
+    assert report['transitive_only'] == [['et-xmlfile', ['openpyxl']]]
+    assert [row[0] for row in report['undeclared']] == ['openpyxl']
+    assert [row[0] for row in report['unresolved']] == ['mystery']
+
+
+def test_extra_dependencies_are_not_unused(tmp_path, site_dir):
+    write_dist_info(site_dir, 'pandas', '2.2.0', top_level=['pandas'],
+                    requires=['numpy>=1.26', 'openpyxl>=3.1; extra == "excel"'])
+    write_dist_info(site_dir, 'numpy', '1.26.4', top_level=['numpy'])
+    index = build_index(tmp_path, site_dir)
+    project = tmp_path / 'project'
+    project.mkdir()
+    imports = {'pandas': [str(project / 'app.py')]}
+    declared = {'pandas': 'pandas', 'openpyxl': 'openpyxl', 'et-xmlfile': 'et-xmlfile', 'pyyaml': 'PyYAML'}
+
+    report = analyze_imports(imports, declared, str(project), index.distributions())
+    assert report['unused'] == ['PyYAML']
+    assert ['openpyxl', ['pandas[excel]']] in report['transitive_only']
+    assert ['et-xmlfile', ['pandas[excel]']] in report['transitive_only']
@@ -0,0 +1,57 @@
+import json
+import os
+
+import interpreter_discovery
+
+
+def make_binary(prefix, name):
+    path = prefix / 'bin' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('#!/bin/sh\nexit 1\n')
+    path.chmod(0o755)
+    return str(path)
+
+
+def make_header(prefix, minor, version):
+    header = prefix / 'include' / f'python{minor}' / 'patchlevel.h'
+    header.parent.mkdir(parents=True, exist_ok=True)
+    header.write_text(f'#define PY_VERSION "{version}"\n')
+
+
+def test_shared_prefix_uses_matching_layout(tmp_path):
+    make_header(tmp_path, '3.9', '3.9.18')
+    make_header(tmp_path, '3.12', '3.12.4')
+    assert interpreter_discovery.read_version_from_layout(make_binary(tmp_path, 'python3.12')) == '3.12.4'
+    assert interpreter_discovery.read_version_from_layout(make_binary(tmp_path, 'python3.9')) == '3.9.18'
+    # 通用名称无法区分多个布局，交给 run_for_version
+    assert interpreter_discovery.read_version_from_layout(make_binary(tmp_path, 'python3')) is None
+
+
+def test_symlink_name_selects_version(tmp_path):
+    make_header(tmp_path, '3.9', '3.9.18')
+    make_header(tmp_path, '3.12', '3.12.4')
+    target = make_binary(tmp_path, 'python3.12')
+    link = tmp_path / 'bin' / 'python3'
+    link.symlink_to(target)
+    assert interpreter_discovery.read_version_from_layout(str(link)) == '3.12.4'
+
+
+def test_lib_layout_requires_matching_minor(tmp_path):
+    for minor in ('3.9', '3.12'):
+        (tmp_path / 'lib' / f'python{minor}').mkdir(parents=True)
+        (tmp_path / 'lib' / f'python{minor}' / 'os.py').write_text('')
+    assert interpreter_discovery.read_version_from_layout(make_binary(tmp_path, 'python3.12')) == '3.12'
+    assert interpreter_discovery.read_version_from_layout(make_binary(tmp_path, 'python3.11')) is None
+
+
+def test_refresh_ignores_and_rewrites_cache(tmp_path, monkeypatch):
+    make_header(tmp_path, '3.12', '3.12.4')
+    binary = make_binary(tmp_path, 'python3.12')
+    cache_path = tmp_path / 'cache.json'
+    stale = {os.path.realpath(binary): {'mtime': os.stat(binary).st_mtime_ns, 'version': '3.9.18'}}
+    cache_path.write_text(json.dumps(stale))
+    monkeypatch.setattr(interpreter_discovery, 'candidate_paths', lambda: [(binary, 'path')])
+    monkeypatch.setattr(interpreter_discovery, '_discovered', None)
+
+    assert interpreter_discovery.discover_interpreters(refresh=True, cache_path=str(cache_path))[0]['version'] == '3.12.4'
+    assert json.loads(cache_path.read_text())[os.path.realpath(binary)]['version'] == '3.12.4'
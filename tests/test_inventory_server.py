@@ -0,0 +1,47 @@
+import hashlib
+import json
+
+from collectors import SessionCache
+from inventory_server import RenderedCache
+from records import package
+
+
+class RacingSession(SessionCache):
+    # 第一次读取后立即发生一次后台刷新：调用方拿到旧数据，而时间戳已经是新版本的
+    raced = False
+
+    def get(self, name, refresh=False):
+        value = super().get(name, refresh)
+        if not self.raced:
+            self.raced = True
+            self.refresh(name)
+        return value
+
+
+def make_session(session_class=SessionCache):
+    versions = iter(['1.0', '2.0', '3.0'])
+    session = session_class(ttl=None)
+    session.register('packages', lambda: [package('demo', next(versions))])
+    return session
+
+
+def test_rendered_cache_reuses_body_until_refresh():
+    session = make_session()
+    rendered = RenderedCache(session)
+    body, etag = rendered.get('packages')
+    assert rendered.get('packages') == (body, etag)
+    assert etag == hashlib.sha1(body).hexdigest()
+
+    session.refresh('packages')
+    new_body, new_etag = rendered.get('packages')
+    assert json.loads(new_body) == [['demo', '2.0']]
+    assert new_etag != etag
+
+
+def test_rendered_cache_does_not_pair_old_body_with_new_stamp():
+    session = make_session(RacingSession)
+    rendered = RenderedCache(session)
+    body, etag = rendered.get('packages')
+    assert json.loads(body) == [['demo', '2.0']]
+    assert etag == hashlib.sha1(body).hexdigest()
+    assert rendered.get('packages') == (body, etag)
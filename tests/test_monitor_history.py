@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+from monitor_history import Recording
+
+
+def write_recording(path, rows, spike_at):
+    start = np.datetime64('2026-10-19T14:00:00')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('time,cpu,memory,disk,alerts\n')
+        for i in range(rows):
+            stamp = str(start + np.timedelta64(i, 's')).replace('T', ' ')
+            cpu = 99.0 if i == spike_at else 10.0
+            alert = 'CPU过高' if i == spike_at else ''
+            f.write(f'{stamp},{cpu},50.0,70.0,{alert}\n')
+
+
+def test_query_never_exceeds_max_points_and_keeps_spikes(tmp_path):
+    path = tmp_path / 'monitor.csv'
+    write_recording(path, 20000, spike_at=12345)
+    recording = Recording(str(path))
+    assert len(recording) == 20000
+    assert len(recording.alerts) == 1
+
+    for max_points in (10, 101, 2000):
+        x, y = recording.query('cpu', max_points=max_points)
+        assert 0 < len(y) <= max_points
+        assert len(x) == len(y)
+        assert y.max() == 99.0 and y.min() == 10.0
+
+    first, last = recording.time_range()
+    x, y = recording.query('cpu', first + 100, first + 150, max_points=2000)
+    assert len(y) <= 53 and y.max() == 10.0
+
+
+def test_short_recording_is_decimated_without_pyramid(tmp_path):
+    path = tmp_path / 'monitor.csv'
+    write_recording(path, 1500, spike_at=700)
+    recording = Recording(str(path))
+    assert len(recording.levels) == 1
+
+    x, y = recording.query('cpu', max_points=100)
+    assert len(y) <= 100 and y.max() == 99.0
+
+
+def test_pyramid_levels_are_persisted(tmp_path):
+    path = tmp_path / 'monitor.csv'
+    write_recording(path, 20000, spike_at=3)
+    recording = Recording(str(path))
+    files = [name for name in os.listdir(recording.cache_path) if name.startswith('level')]
+    assert len(files) == (len(recording.levels) - 1) * 3 * 2
+
+    reopened = Recording(str(path))
+    mins, maxs = reopened.levels[1]['cpu']
+    assert isinstance(maxs, np.memmap)
+    np.testing.assert_array_equal(maxs, recording.levels[1]['cpu'][1])
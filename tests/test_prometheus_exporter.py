@@ -0,0 +1,28 @@
+import threading
+
+from collectors import SessionCache
+from monitor_sampler import MonitorSampler
+from prometheus_exporter import MetricsBuffer, scan_loop
+
+
+def test_scan_loop_only_refreshes_selected_sources():
+    calls = []
+    session = SessionCache(ttl=None)
+
+    def loader(name, value):
+        return lambda *dependencies: calls.append(name) or value
+
+    session.register('metadata_index', loader('metadata_index', object()))
+    session.register('packages', loader('packages', [1, 2, 3]), depends_on=['metadata_index'])
+    session.register('system_packages', loader('system_packages', []))
+    session.register('native_links', loader('native_links', []), depends_on=['system_packages'])
+
+    buffer = MetricsBuffer(MonitorSampler(history=1))
+    stop_event = threading.Event()
+    stop_event.set()
+    scan_loop(session, buffer, 60, stop_event, ['packages'])
+
+    assert calls == ['metadata_index', 'packages']
+    assert sorted(buffer.scans) == ['metadata_index', 'packages']
+    assert buffer.scans['packages']['items'] == 3
+    assert b'piplist_scan_items{collector="packages"} 3' in buffer.body
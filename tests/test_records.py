@@ -0,0 +1,14 @@
+from records import Package, RequirementPin, package, to_dict, to_row
+
+
+def test_records_trim_trailing_optional_fields():
+    assert to_row(package('Flask', '3.0.0')) == ['Flask', '3.0.0']
+    assert to_row(Package('x', '1', '/src/x')) == ['x', '1', '/src/x']
+    assert to_dict(package('Flask', '3.0.0')) == {'name': 'Flask', 'version': '3.0.0'}
+    assert package('Fl' + 'ask', '3.0.0').name is package('Flask', '3.0.0').name
+
+
+def test_records_keep_index_access():
+    pin = RequirementPin('requests')
+    assert pin[0] == 'requests' and pin.version is None
+    assert to_row(pin) == ['requests']
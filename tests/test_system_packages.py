@@ -0,0 +1,74 @@
+import os
+import platform
+import struct
+
+import pytest
+
+from system_packages import (RPM_INT32, RPM_STRING, RPM_STRING_ARRAY, RPMTAG_ARCH, RPMTAG_BASENAMES, RPMTAG_EPOCH,
+                             RPMTAG_NAME, RPMTAG_RELEASE, RPMTAG_VERSION, elf_needed, parse_apk_installed,
+                             parse_dpkg_status, parse_rpm_header)
+
+
+def test_parse_dpkg_status_keeps_installed_only(tmp_path):
+    status = tmp_path / 'status'
+    status.write_text(
+        'Package: libssl3\nStatus: install ok installed\nArchitecture: amd64\nVersion: 3.0.13-0ubuntu3\n'
+        'Description: Secure Sockets Layer toolkit\n Version: 9.9 (continuation line)\n\n'
+        'Package: removed-pkg\nStatus: deinstall ok config-files\nVersion: 1.0\n\n'
+        'Package: zlib1g\nStatus: install ok installed\nVersion: 1:1.3.dfsg-3\nArchitecture: amd64\n')
+    assert parse_dpkg_status(str(status)) == [('libssl3', '3.0.13-0ubuntu3', 'amd64'),
+                                              ('zlib1g', '1:1.3.dfsg-3', 'amd64')]
+
+
+def test_parse_apk_installed_collects_library_owners(tmp_path):
+    installed = tmp_path / 'installed'
+    installed.write_text('C:Q1abc=\nP:musl\nV:1.2.4-r2\nA:x86_64\nF:lib\nR:ld-musl-x86_64.so.1\nR:README\n\n'
+                         'P:zlib\nV:1.3.1-r0\nA:x86_64\nF:lib\nR:libz.so.1.3.1\n')
+    packages, owners = parse_apk_installed(str(installed))
+    assert packages == [('musl', '1.2.4-r2', 'x86_64'), ('zlib', '1.3.1-r0', 'x86_64')]
+    assert owners == {'ld-musl-x86_64.so.1': 'musl', 'libz.so.1.3.1': 'zlib'}
+
+
+def rpm_header(entries):
+    # entries: [(标签, 类型, 值)]，值为整数列表、字符串或字符串列表
+    index = b''
+    data = b''
+    for tag, kind, value in entries:
+        if kind == RPM_INT32:
+            data += b'\0' * (-len(data) % 4)
+            payload, number = struct.pack(f'>{len(value)}i', *value), len(value)
+        elif kind == RPM_STRING_ARRAY:
+            payload, number = b''.join(item.encode() + b'\0' for item in value), len(value)
+        else:
+            payload, number = value.encode() + b'\0', 1
+        index += struct.pack('>iiii', tag, kind, len(data), number)
+        data += payload
+    return struct.pack('>ii', len(entries), len(data)) + index + data
+
+
+def test_parse_rpm_header():
+    blob = rpm_header([
+        (RPMTAG_NAME, RPM_STRING, 'openssl-libs'),
+        (1004, RPM_STRING, 'ignored summary'),
+        (RPMTAG_VERSION, RPM_STRING, '3.0.7'),
+        (RPMTAG_RELEASE, RPM_STRING, '27.el9'),
+        (RPMTAG_EPOCH, RPM_INT32, [1]),
+        (RPMTAG_ARCH, RPM_STRING, 'x86_64'),
+        (RPMTAG_BASENAMES, RPM_STRING_ARRAY, ['libssl.so.3', 'openssl.cnf']),
+    ])
+    tags = parse_rpm_header(blob)
+    assert tags[RPMTAG_NAME] == ['openssl-libs']
+    assert tags[RPMTAG_EPOCH] == (1,)
+    assert tags[RPMTAG_BASENAMES] == ['libssl.so.3', 'openssl.cnf']
+    assert 1004 not in tags
+
+
+def test_elf_needed_rejects_non_elf(tmp_path):
+    path = tmp_path / 'not-elf.so'
+    path.write_bytes(b'#!/bin/sh\n')
+    assert elf_needed(str(path)) == []
+
+
+@pytest.mark.skipif(platform.libc_ver()[0] != 'glibc' or not os.path.exists('/bin/ls'), reason='需要 glibc 系统')
+def test_elf_needed_reads_dynamic_section():
+    assert 'libc.so.6' in elf_needed('/bin/ls')
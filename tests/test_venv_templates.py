@@ -0,0 +1,93 @@
+import errno
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+import venv_templates
+from venv_templates import clone_template, find_venv_processes
+
+SLEEP = 'import time; time.sleep(30)'
+
+
+@pytest.fixture
+def fake_venv(tmp_path):
+    # 与 Linux 上的 venv 相同：bin/python 是指向基础解释器的符号链接
+    venv = tmp_path / 'venv'
+    (venv / 'bin').mkdir(parents=True)
+    os.symlink(sys.executable, venv / 'bin' / 'python')
+    return venv
+
+
+def spawn(args, **kwargs):
+    proc = subprocess.Popen(args, **kwargs)
+    # 等子进程完成 exec，否则 cmdline 还是父进程的
+    for _ in range(250):
+        if psutil.Process(proc.pid).cmdline()[-1:] == [SLEEP]:
+            break
+        time.sleep(0.02)
+    return proc
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='依赖 /proc 和符号链接形式的 venv')
+def test_bare_python_from_activated_venv_is_found(fake_venv):
+    env = dict(os.environ, PATH=f"{fake_venv / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}")
+    proc = spawn(['python', '-c', SLEEP], env=env)
+    try:
+        assert proc.pid in [p.pid for p in find_venv_processes(str(fake_venv))]
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='依赖 /proc')
+def test_process_with_cwd_inside_venv_is_found(fake_venv, tmp_path):
+    proc = spawn([sys.executable, '-c', SLEEP], cwd=str(fake_venv))
+    try:
+        assert proc.pid in [p.pid for p in find_venv_processes(str(fake_venv))]
+        assert proc.pid not in [p.pid for p in find_venv_processes(str(tmp_path / 'other'))]
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def make_template(tmp_path):
+    template = tmp_path / 'template'
+    (template / 'lib' / 'site-packages').mkdir(parents=True)
+    for name in ('a.py', 'b.py', 'c.py'):
+        (template / 'lib' / 'site-packages' / name).write_text(f'# {name}\n')
+    return template
+
+
+def failing_link_for(name, monkeypatch):
+    real_link = os.link
+
+    def link(source, target):
+        if os.path.basename(source) == name:
+            raise OSError(errno.EMLINK, 'Too many links')
+        return real_link(source, target)
+
+    monkeypatch.setattr(os, 'link', link)
+    monkeypatch.setattr(venv_templates, '_reflink', lambda source, target: (_ for _ in ()).throw(OSError('no reflink')))
+
+
+def test_auto_mode_falls_back_per_file(tmp_path, monkeypatch):
+    template = make_template(tmp_path)
+    # 让遍历顺序中最后一个文件无法硬链接：前面的文件已经确定使用 hardlink
+    last = os.listdir(template / 'lib' / 'site-packages')[-1]
+    failing_link_for(last, monkeypatch)
+    target = tmp_path / 'clone'
+    assert clone_template(str(template), str(target), 'auto') == 'copy'
+    for name in ('a.py', 'b.py', 'c.py'):
+        assert (target / 'lib' / 'site-packages' / name).read_text() == f'# {name}\n'
+    assert os.stat(target / 'lib' / 'site-packages' / last).st_nlink == 1
+
+
+def test_explicit_hardlink_mode_still_raises(tmp_path, monkeypatch):
+    template = make_template(tmp_path)
+    failing_link_for('b.py', monkeypatch)
+    with pytest.raises(OSError):
+        clone_template(str(template), str(tmp_path / 'clone'), 'hardlink')
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+
+from conftest import write_dist_info
+from collectors import apply_package_delta, session
+from records import package
+from watch_mode import InventoryWatcher, format_delta
+
+
+def test_snapshot_keeps_editable_location(tmp_path, site_dir):
+    dist_info = write_dist_info(site_dir, 'local-tool', '0.1')
+    with open(os.path.join(dist_info, 'direct_url.json'), 'w', encoding='utf-8') as f:
+        json.dump({'url': 'file:///src/local-tool', 'dir_info': {'editable': True}}, f)
+    write_dist_info(site_dir, 'requests', '2.32.0')
+    snapshot = tmp_path / 'export.json'
+    snapshot.write_text(json.dumps({'languages': [['Python', '3.12']], 'packages': []}))
+
+    watcher = InventoryWatcher([site_dir], snapshot_path=str(snapshot), use_events=False)
+    write_dist_info(site_dir, 'idna', '3.7')
+    watcher.mark_dirty(site_dir)
+    delta = watcher.flush()
+    assert delta['added'] == [['idna', '3.7']]
+
+    data = json.loads(snapshot.read_text())
+    assert data['languages'] == [['Python', '3.12']]
+    assert data['packages'] == [['idna', '3.7'], ['local-tool', '0.1', '/src/local-tool'], ['requests', '2.32.0']]
+
+
+def test_flushes_do_not_overlap(site_dir):
+    watcher = InventoryWatcher([site_dir], use_events=False)
+    active = []
+    overlapped = []
+
+    def slow_listener(delta, inventory):
+        active.append(1)
+        overlapped.append(len(active) > 1)
+        time.sleep(0.05)
+        active.pop()
+
+    watcher.add_listener(slow_listener)
+    write_dist_info(site_dir, 'idna', '3.7')
+    watcher.mark_dirty(site_dir)
+    first = threading.Thread(target=watcher.flush)
+    first.start()
+    time.sleep(0.01)
+    write_dist_info(site_dir, 'requests', '2.32.0')
+    watcher.mark_dirty(site_dir)
+    watcher.flush()
+    first.join()
+    watcher.stop()
+
+    assert overlapped == [False, False]
+    assert sorted(watcher.inventory) == ['idna', 'requests']
+
+
+def test_delta_uses_metadata_names_and_carries_location(site_dir, monkeypatch):
+    write_dist_info(site_dir, 'zope.interface', '6.0')
+    watcher = InventoryWatcher([site_dir], use_events=False)
+    assert [record.name for record in watcher.packages()] == ['zope.interface']
+
+    dist_info = write_dist_info(site_dir, 'local-tool', '0.1')
+    with open(os.path.join(dist_info, 'direct_url.json'), 'w', encoding='utf-8') as f:
+        json.dump({'url': 'file:///src/local-tool', 'dir_info': {'editable': True}}, f)
+    watcher.mark_dirty(site_dir)
+    delta = watcher.flush()
+    watcher.stop()
+    assert delta['added'] == [['local-tool', '0.1', '/src/local-tool']]
+    assert format_delta(delta) == ['+ local-tool 0.1']
+
+    monkeypatch.setattr(session, '_entries', {'packages': (0, [package('zope.interface', '6.0')])})
+    apply_package_delta(delta)
+    assert session.peek('packages') == [package('local-tool', '0.1', '/src/local-tool'),
+                                        package('zope.interface', '6.0')]
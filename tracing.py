@@ -0,0 +1,117 @@
+# 执行跟踪
+# 为每个采集步骤、子进程调用和文件写入记录一个带耗时的区间（span），
+# 可导出为 Chrome trace-event JSON（chrome://tracing 或 Perfetto 打开），也可汇总出最慢的步骤。
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+            self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, category='step', **args):
+        # args 在区间内可继续补充，例如退出码、输出大小
+        if not self.enabled:
+            yield args
+            return
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end = time.perf_counter()
+            record = {
+                'name': name,
+                'cat': category,
+                'start': start - self.origin,
+                'duration': end - start,
+                'tid': threading.get_ident(),
+                'args': args,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    def run(self, command, **kwargs):
+        # subprocess.run 的跟踪版本，记录命令、退出码和输出大小
+        with self.span(' '.join(command), 'subprocess', command=list(command)) as args:
+            result = subprocess.run(command, **kwargs)
+            args['returncode'] = result.returncode
+            args['stdout_bytes'] = len(result.stdout) if result.stdout is not None else 0
+            args['stderr_bytes'] = len(result.stderr) if result.stderr is not None else 0
+            return result
+
+    @contextmanager
+    def write(self, path):
+        # 包裹一次文件写入，结束后记录文件大小
+        with self.span(os.path.basename(path), 'write', path=path) as args:
+            yield args
+            if os.path.exists(path):
+                args['bytes'] = os.path.getsize(path)
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        events = [{
+            'name': span['name'],
+            'cat': span['cat'],
+            'ph': 'X',
+            'ts': round(span['start'] * 1e6, 3),
+            'dur': round(span['duration'] * 1e6, 3),
+            'pid': pid,
+            'tid': span['tid'],
+            'args': span['args'],
+        } for span in spans]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return file_path
+
+    def slowest(self, limit=5, category=None):
+        with self._lock:
+            spans = [span for span in self.spans if category is None or span['cat'] == category]
+        return sorted(spans, key=lambda span: span['duration'], reverse=True)[:limit]
+
+    def summary(self, limit=5):
+        parts = []
+        for span in self.slowest(limit):
+            parts.append(f"{span['name']} {span['duration']:.2f}s")
+        return '，'.join(parts)
+
+    def report_lines(self, limit=10):
+        lines = []
+        for span in self.slowest(limit):
+            args = span['args']
+            detail = ''
+            if span['cat'] == 'subprocess':
+                detail = f" 退出码={args.get('returncode', '-')} 输出={args.get('stdout_bytes', 0) + args.get('stderr_bytes', 0)}B"
+            elif span['cat'] == 'write':
+                detail = f" 大小={args.get('bytes', 0)}B"
+            if 'error' in args:
+                detail += f" 错误={args['error']}"
+            lines.append(f"{span['duration']:>8.3f}s  [{span['cat']}] {span['name']}{detail}")
+        return lines
+
+
+# 进程内共享的默认跟踪器
+tracer = Tracer()
+span = tracer.span
+run = tracer.run
+write = tracer.write
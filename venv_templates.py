@@ -0,0 +1,368 @@
+# 基于模板快速创建虚拟环境
+# 每个解释器版本（以及可选的本地 wheel 目录）只用 venv + ensurepip 构建一次基础模板，
+# 之后新环境直接克隆模板：普通文件优先使用 reflink（写时复制），否则使用硬链接，最后才复制；
+# pyvenv.cfg 和 bin/Scripts 下引用了模板路径的脚本会复制并改写为新路径。
+#
+# 删除环境时只结束真正在使用该环境的进程，文件在后台并行删除。
+#
+#   python venv_templates.py ci-1 ci-2 ci-3 --python 3.11 --wheelhouse wheels/
+#   python venv_templates.py ci-1 ci-2 ci-3 --delete --terminate
+import argparse
+import hashlib
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+import interpreter_discovery
+import tracing
+
+VENVS_DIRECTORY = os.path.join(os.getcwd(), 'venvs')
+TEMPLATES_DIRECTORY = os.path.join(VENVS_DIRECTORY, '.templates')
+FICLONE = 0x40049409
+_template_locks = {}
+_template_locks_guard = threading.Lock()
+
+
+def scripts_dir(venv_path):
+    return os.path.join(venv_path, 'Scripts' if os.name == 'nt' else 'bin')
+
+
+def venv_python(venv_path):
+    if os.name == 'nt':
+        return os.path.join(venv_path, 'Scripts', 'python.exe')
+    return os.path.join(venv_path, 'bin', 'python')
+
+
+def find_interpreter(version=None):
+    # 按版本号（如 "3.11"）从已发现的解释器中选择，Windows 上再尝试 py 启动器
+    try:
+        return interpreter_discovery.find_interpreter(version)
+    except FileNotFoundError:
+        launcher = shutil.which('py') if os.name == 'nt' else None
+        if not launcher:
+            raise
+        result = subprocess.run([launcher, f'-{version}', '-c', 'import sys; print(sys.executable)'],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            raise
+        return result.stdout.decode('utf-8').strip()
+
+
+def interpreter_version(python_exe):
+    version = interpreter_discovery.read_version(python_exe)
+    if not version:
+        raise RuntimeError(f"无法确定 {python_exe} 的版本")
+    return version
+
+
+def template_key(python_exe, version, wheelhouse=None):
+    # 模板随解释器路径、版本和 wheel 目录内容变化
+    digest = hashlib.sha1(os.path.realpath(python_exe).encode('utf-8'))
+    if wheelhouse:
+        for name in sorted(os.listdir(wheelhouse)):
+            if name.endswith('.whl'):
+                digest.update(name.encode('utf-8'))
+    return f"{version}-{digest.hexdigest()[:10]}"
+
+
+def _template_lock(path):
+    with _template_locks_guard:
+        return _template_locks.setdefault(path, threading.Lock())
+
+
+def ensure_template(python_exe, wheelhouse=None):
+    version = interpreter_version(python_exe)
+    template_path = os.path.join(TEMPLATES_DIRECTORY, template_key(python_exe, version, wheelhouse))
+    marker = os.path.join(template_path, '.template-complete')
+    with _template_lock(template_path):
+        if os.path.exists(marker):
+            return template_path
+
+        shutil.rmtree(template_path, ignore_errors=True)
+        os.makedirs(TEMPLATES_DIRECTORY, exist_ok=True)
+        # 模板只在第一次构建时运行 ensurepip
+        tracing.run([python_exe, '-m', 'venv', template_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    check=True)
+        if wheelhouse:
+            wheels = [os.path.join(wheelhouse, name) for name in sorted(os.listdir(wheelhouse))
+                      if name.endswith('.whl')]
+            if wheels:
+                tracing.run([venv_python(template_path), '-m', 'pip', 'install', '--no-index',
+                             '--find-links', wheelhouse, *wheels],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        open(marker, 'w').close()
+    return template_path
+
+
+def _reflink(source, target):
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+
+def _link_file(source, target, mode, hint=None):
+    # mode 为用户指定的方式；hint 为上一个文件实际使用的方式，auto 模式下直接从它开始尝试，
+    # 避免每个文件都重复尝试已经失败过的方式，某个文件失败时仍会继续退回到更保守的方式。
+    # 只有用户明确指定 reflink/hardlink 时，该方式失败才报错。返回本文件实际使用的方式
+    start = hint if mode == 'auto' and hint else mode
+    if start in ('auto', 'reflink') and sys.platform.startswith('linux'):
+        try:
+            _reflink(source, target)
+            return 'reflink'
+        except OSError:
+            if os.path.exists(target):
+                os.remove(target)
+            if mode == 'reflink':
+                raise
+    if start in ('auto', 'reflink', 'hardlink'):
+        try:
+            os.link(source, target)
+            return 'hardlink'
+        except OSError:
+            if mode == 'hardlink':
+                raise
+    shutil.copy2(source, target)
+    return 'copy'
+
+
+def _rewrite_file(source, target, old_path, new_path):
+    with open(source, 'rb') as f:
+        content = f.read()
+    with open(target, 'wb') as f:
+        f.write(content.replace(old_path, new_path))
+    shutil.copystat(source, target)
+
+
+def clone_template(template_path, target_path, link_mode='auto'):
+    if os.path.exists(target_path):
+        raise FileExistsError(f"目标目录已存在: {target_path}")
+
+    old_path = os.path.abspath(template_path).encode('utf-8')
+    new_path = os.path.abspath(target_path).encode('utf-8')
+    template_scripts = os.path.abspath(scripts_dir(template_path))
+    used = None
+    python_names = {'python', 'python3', 'python.exe', 'pythonw.exe'}
+
+    for root, dirs, files in os.walk(template_path):
+        relative = os.path.relpath(root, template_path)
+        destination = os.path.normpath(os.path.join(target_path, relative))
+        os.makedirs(destination, exist_ok=True)
+
+        for name in list(dirs):
+            source = os.path.join(root, name)
+            if os.path.islink(source):
+                # 例如 lib64 -> lib
+                os.symlink(os.readlink(source), os.path.join(destination, name))
+                dirs.remove(name)
+
+        for name in files:
+            if name == '.template-complete':
+                continue
+            source = os.path.join(root, name)
+            target = os.path.join(destination, name)
+            if os.path.islink(source):
+                link_target = os.readlink(source)
+                if os.path.isabs(link_target) and link_target.startswith(old_path.decode('utf-8')):
+                    link_target = new_path.decode('utf-8') + link_target[len(old_path):]
+                os.symlink(link_target, target)
+            elif name == 'pyvenv.cfg' or (os.path.abspath(root) == template_scripts
+                                          and not name.lower().startswith(tuple(python_names))):
+                # pyvenv.cfg、activate 脚本和 pip 等入口脚本中写有模板的绝对路径
+                _rewrite_file(source, target, old_path, new_path)
+            else:
+                used = _link_file(source, target, link_mode, used)
+    return used or link_mode
+
+
+def create_venv(target_path, python_exe=None, wheelhouse=None, link_mode='auto'):
+    python_exe = python_exe or sys.executable
+    with tracing.span(os.path.basename(target_path), 'venv', target=target_path) as args:
+        template_path = ensure_template(python_exe, wheelhouse)
+        args['link_mode'] = clone_template(template_path, target_path, link_mode)
+    return target_path
+
+
+def _inside(path, root):
+    if not path:
+        return False
+    path = os.path.normcase(os.path.abspath(path))
+    return path == root or path.startswith(root + os.sep)
+
+
+def _resolve_command(proc, command, cwd):
+    # 相对路径按进程的工作目录解析；不带路径的命令（激活环境后直接运行 python）按进程自己的 PATH 查找
+    if os.sep in command or (os.altsep and os.altsep in command):
+        return os.path.join(cwd, command) if cwd else None
+    try:
+        search_path = proc.environ().get('PATH')
+    except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    if not search_path:
+        return None
+    found = shutil.which(command, path=os.pathsep.join(
+        os.path.join(cwd, entry) if cwd else entry for entry in search_path.split(os.pathsep)))
+    return os.path.abspath(found) if found else None
+
+
+def find_venv_processes(venv_path):
+    # 只找可执行文件、启动命令、工作目录或打开的文件位于该环境内的进程。
+    # Linux 上 venv 中的 python 是指向基础解释器的符号链接，exe 会解析到基础解释器，因此还要看 cmdline[0]
+    root = os.path.normcase(os.path.abspath(venv_path))
+    real_root = os.path.normcase(os.path.realpath(venv_path))
+    processes = []
+    for proc in psutil.process_iter(['pid', 'name', 'exe', 'cmdline', 'cwd']):
+        if proc.pid == os.getpid():
+            continue
+        info = proc.info
+        command = (info.get('cmdline') or [None])[0]
+        if command and not os.path.isabs(command):
+            command = _resolve_command(proc, command, info.get('cwd'))
+        matched = any(_inside(path, base) for path in (info.get('exe'), command, info.get('cwd'))
+                      for base in (root, real_root))
+        if not matched:
+            try:
+                matched = any(_inside(f.path, base) for f in proc.open_files() for base in (root, real_root))
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+        if matched:
+            processes.append(proc)
+    return processes
+
+
+def terminate_processes(processes, timeout=5):
+    # 先 terminate，超时后再 kill；返回仍未退出的进程
+    for proc in processes:
+        try:
+            proc.terminate()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for proc in alive:
+        try:
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    _, alive = psutil.wait_procs(alive, timeout=timeout)
+    return alive
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except PermissionError:
+        # Windows 上只读文件需要先去掉只读属性
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_tree(path, workers=8, progress=None):
+    # 并行删除文件，再自底向上删除目录；progress(已删除, 总数)
+    files = []
+    directories = []
+    for root, dirs, names in os.walk(path, topdown=False):
+        for name in names:
+            files.append(os.path.join(root, name))
+        for name in dirs:
+            full = os.path.join(root, name)
+            # 指向目录的符号链接（如 lib64）当作文件删除
+            if os.path.islink(full):
+                files.append(full)
+            else:
+                directories.append(full)
+    directories.append(path)
+
+    total = len(files)
+    done = 0
+    batches = [files[i:i + 512] for i in range(0, total, 512)]
+
+    def unlink_batch(batch):
+        for file in batch:
+            _unlink(file)
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for count in executor.map(unlink_batch, batches):
+            done += count
+            if progress:
+                progress(done, total)
+    for directory in directories:
+        os.rmdir(directory)
+    return total
+
+
+def delete_venv(venv_path, terminate=False, workers=8, progress=None):
+    # terminate 为 False 时若有进程在使用该环境则抛出异常，由调用方决定是否结束这些进程
+    processes = find_venv_processes(venv_path)
+    if processes:
+        if not terminate:
+            names = ', '.join(f"{proc.info['name']}({proc.pid})" for proc in processes)
+            raise RuntimeError(f"以下进程正在使用该环境: {names}")
+        alive = terminate_processes(processes)
+        if alive:
+            raise RuntimeError(f"无法结束进程: {', '.join(str(proc.pid) for proc in alive)}")
+
+    target = venv_path
+    if os.name != 'nt':
+        # 先改名移到回收目录（同一文件系统上只是一次 rename），环境立刻从列表中消失，之后再慢慢删除
+        trash = os.path.join(os.path.dirname(os.path.abspath(venv_path)), '.trash')
+        os.makedirs(trash, exist_ok=True)
+        target = os.path.join(trash, f"{os.path.basename(venv_path)}-{time.time_ns()}")
+        try:
+            os.rename(venv_path, target)
+        except OSError:
+            target = venv_path
+    with tracing.span(os.path.basename(venv_path), 'venv-delete', target=venv_path):
+        return remove_tree(target, workers, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基于模板快速创建虚拟环境')
+    parser.add_argument('names', nargs='+', help='要创建（或删除）的环境名称（位于 venvs/ 下）或路径')
+    parser.add_argument('--delete', action='store_true', help='删除这些环境而不是创建')
+    parser.add_argument('--terminate', action='store_true', help='删除前结束正在使用该环境的进程')
+    parser.add_argument('--python', type=str, help='Python 版本（如 3.11）或解释器路径，默认为当前解释器')
+    parser.add_argument('--wheelhouse', type=str, help='预先安装到模板中的本地 wheel 目录')
+    parser.add_argument('--link-mode', choices=['auto', 'reflink', 'hardlink', 'copy'], default='auto')
+    parser.add_argument('-j', '--workers', type=int, default=8, help='并行克隆数')
+    args = parser.parse_args()
+
+    if args.delete:
+        for name in args.names:
+            target = name if os.sep in name else os.path.join(VENVS_DIRECTORY, name)
+            start = time.perf_counter()
+            count = delete_venv(target, terminate=args.terminate, workers=args.workers)
+            print(f"已删除 {target}（{count} 个文件，{time.perf_counter() - start:.2f}s）")
+        return
+
+    if args.python and os.path.exists(args.python):
+        python_exe = args.python
+    else:
+        python_exe = find_interpreter(args.python)
+
+    start = time.perf_counter()
+    template_path = ensure_template(python_exe, args.wheelhouse)
+    print(f"模板: {template_path}（{time.perf_counter() - start:.2f}s）")
+
+    def create(name):
+        target = name if os.sep in name else os.path.join(VENVS_DIRECTORY, name)
+        return target, create_venv(target, python_exe, args.wheelhouse, args.link_mode)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for target, _ in executor.map(create, args.names):
+            print(f"已创建 {target}")
+    print(f"共创建 {len(args.names)} 个环境，耗时 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
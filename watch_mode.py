@@ -0,0 +1,309 @@
+# 监视模式
+# 监视 site-packages 目录（优先使用 watchdog 的 inotify 等系统事件，不可用时退化为目录 mtime 轮询），
+# 只重新列出发生变化的目录，把新增/删除/升级的增量应用到内存中的包清单。
+# 大量安装时的连续事件会被合并（去抖）成一次更新，然后通知各个监听方并可同步写出磁盘快照。
+#
+#   python watch_mode.py --snapshot results/export.json
+import argparse
+import json
+import os
+import site
+import sys
+import threading
+import time
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+
+from dep_analytics import normalize_name
+from metadata_index import editable_location
+from records import package, to_row
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+METADATA_SUFFIXES = ('.dist-info', '.egg-info')
+
+
+def default_site_directories():
+    directories = []
+    candidates = list(getattr(site, 'getsitepackages', lambda: [])())
+    candidates.append(site.getusersitepackages())
+    candidates.extend(path for path in sys.path if path.endswith(('site-packages', 'dist-packages')))
+    for path in candidates:
+        path = os.path.abspath(path)
+        if os.path.isdir(path) and path not in directories:
+            directories.append(path)
+    return directories
+
+
+def parse_metadata_dir(entry):
+    # 从 name-version.dist-info 目录名解析包名和版本，只用于发现变化，显示名以 METADATA 为准
+    for suffix in METADATA_SUFFIXES:
+        if entry.endswith(suffix):
+            stem = entry[:-len(suffix)]
+            name, sep, version = stem.partition('-')
+            if not sep:
+                return None
+            # egg-info 可能带 -py3.x 后缀
+            version = version.split('-py')[0]
+            return name, version
+    return None
+
+
+def read_metadata_entry(directory, entry):
+    # 包名和版本取自 METADATA（与 pip list、元数据索引一致），读取失败时退回目录名；
+    # 可编辑安装的位置来自 dist-info 中的 direct_url.json
+    name, version = parse_metadata_dir(entry)
+    dist = metadata.PathDistribution(Path(directory, entry))
+    try:
+        meta = dist.metadata
+        name, version = meta['Name'] or name, meta['Version'] or version
+    except (OSError, ValueError):
+        pass
+    location = editable_location(dist) if entry.endswith('.dist-info') else None
+    return package(name, version, location)
+
+
+def list_directory(directory, cache=None):
+    # {规范化包名: Package}；cache 为 {目录项: (mtime, Package)}，目录项的名称和 mtime 都没变时不再读取 METADATA
+    packages = {}
+    cache = {} if cache is None else cache
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        cache.clear()
+        return packages
+    seen = set()
+    for entry in entries:
+        if not parse_metadata_dir(entry.name):
+            continue
+        try:
+            mtime = entry.stat().st_mtime_ns
+        except OSError:
+            continue
+        seen.add(entry.name)
+        cached = cache.get(entry.name)
+        if cached is None or cached[0] != mtime:
+            cached = cache[entry.name] = (mtime, read_metadata_entry(directory, entry.name))
+        packages[normalize_name(cached[1].name)] = cached[1]
+    for name in set(cache) - seen:
+        del cache[name]
+    return packages
+
+
+def diff_packages(old, new):
+    # 新增行为 to_row 的形式，升级行为 [包名, 旧版本, 新版本]；可编辑安装时两者末尾都带上位置
+    delta = {'added': [], 'removed': [], 'upgraded': []}
+    for key, record in new.items():
+        if key not in old:
+            delta['added'].append(to_row(record))
+        elif old[key].version != record.version:
+            delta['upgraded'].append([record.name, old[key].version, record.version] + to_row(record)[2:])
+    for key, record in old.items():
+        if key not in new:
+            delta['removed'].append([record.name, record.version])
+    for rows in delta.values():
+        rows.sort(key=lambda row: row[0].lower())
+    return delta
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher, directory):
+        self.watcher = watcher
+        self.directory = directory
+
+    def on_any_event(self, event):
+        self.watcher.mark_dirty(self.directory)
+
+
+class InventoryWatcher:
+    def __init__(self, directories=None, debounce=1.5, max_delay=15.0, poll_interval=2.0,
+                 snapshot_path=None, use_events=True):
+        self.directories = directories or default_site_directories()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.snapshot_path = snapshot_path
+        self.use_events = use_events and Observer is not None
+        self.listeners = []
+        self._entries = {directory: {} for directory in self.directories}
+        self.by_directory = {directory: list_directory(directory, self._entries[directory])
+                             for directory in self.directories}
+        self._dirty = set()
+        self._first_dirty = None
+        self._timer = None
+        self._lock = threading.Lock()
+        # 去抖计时器和手动调用都可能触发 flush，同一时刻只允许一次，避免两次更新交错读写目录清单和快照
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer = None
+        self._poll_thread = None
+
+    @property
+    def inventory(self):
+        # 合并各目录，排在前面的目录优先（与 sys.path 的导入顺序一致）
+        merged = {}
+        for directory in reversed(self.directories):
+            merged.update(self.by_directory.get(directory, {}))
+        return merged
+
+    def add_listener(self, callback):
+        # callback(delta, inventory) 在后台线程中调用，GUI 需要自行切回主线程
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def mark_dirty(self, directory):
+        with self._lock:
+            self._dirty.add(directory)
+            now = time.monotonic()
+            if self._first_dirty is None:
+                self._first_dirty = now
+            if self._timer is not None:
+                self._timer.cancel()
+            # 持续有事件时不断推迟，但最迟 max_delay 秒后一定更新一次
+            delay = min(self.debounce, max(0.0, self._first_dirty + self.max_delay - now))
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+            self._first_dirty = None
+            self._timer = None
+        if not dirty:
+            return None
+
+        before = self.inventory
+        for directory in dirty:
+            self.by_directory[directory] = list_directory(directory, self._entries[directory])
+        after = self.inventory
+        delta = diff_packages(before, after)
+        if not any(delta.values()):
+            return None
+
+        if self.snapshot_path:
+            self.write_snapshot(after)
+        for callback in list(self.listeners):
+            try:
+                callback(delta, after)
+            except Exception as e:
+                print(f"监视回调出错: {e}", file=sys.stderr)
+        return delta
+
+    def packages(self, inventory=None):
+        inventory = self.inventory if inventory is None else inventory
+        return sorted(inventory.values(), key=lambda record: record.name.lower())
+
+    def write_snapshot(self, inventory):
+        # 先写临时文件再替换，读取方不会看到写了一半的快照
+        data = {}
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        # 与导出相同，按 to_row 写出，保留可编辑安装的位置
+        data['packages'] = [to_row(record) for record in self.packages(inventory)]
+        data['exported_at'] = datetime.now().isoformat(timespec='seconds')
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.snapshot_path)
+
+    def _poll(self):
+        # 安装/卸载包会在 site-packages 中创建或删除目录，目录自身的 mtime 随之变化，每个目录只需一次 stat
+        mtimes = {directory: self._mtime(directory) for directory in self.directories}
+        while not self._stop.wait(self.poll_interval):
+            for directory in self.directories:
+                mtime = self._mtime(directory)
+                if mtime != mtimes[directory]:
+                    mtimes[directory] = mtime
+                    self.mark_dirty(directory)
+
+    @staticmethod
+    def _mtime(directory):
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self):
+        self._stop.clear()
+        if self.use_events:
+            self._observer = Observer()
+            for directory in self.directories:
+                self._observer.schedule(_EventHandler(self, directory), directory, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._poll_thread = threading.Thread(target=self._poll, daemon=True)
+            self._poll_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    @property
+    def running(self):
+        return not self._stop.is_set() and (self._observer is not None or self._poll_thread is not None)
+
+
+def format_delta(delta):
+    lines = []
+    for row in delta['added']:
+        lines.append(f"+ {row[0]} {row[1]}")
+    for name, version in delta['removed']:
+        lines.append(f"- {name} {version}")
+    for row in delta['upgraded']:
+        lines.append(f"* {row[0]} {row[1]} -> {row[2]}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监视 site-packages 目录并实时更新包清单')
+    parser.add_argument('directories', nargs='*', help='要监视的目录，默认为当前解释器的 site-packages')
+    parser.add_argument('--snapshot', type=str, help='每次变化后同步更新的 JSON 快照文件')
+    parser.add_argument('--debounce', type=float, default=1.5, help='事件合并的静默时间（秒）')
+    parser.add_argument('--poll', action='store_true', help='强制使用 mtime 轮询而不是文件系统事件')
+    args = parser.parse_args()
+
+    watcher = InventoryWatcher(args.directories or None, debounce=args.debounce,
+                               snapshot_path=args.snapshot, use_events=not args.poll)
+    watcher.add_listener(lambda delta, inventory: print('\n'.join(format_delta(delta)), flush=True))
+    if args.snapshot:
+        watcher.write_snapshot(watcher.inventory)
+    watcher.start()
+    mode = '文件系统事件' if watcher.use_events else 'mtime 轮询'
+    print(f"正在通过{mode}监视 {len(watcher.directories)} 个目录（{len(watcher.inventory)} 个包），按 Ctrl+C 退出")
+    for directory in watcher.directories:
+        print(f"  {directory}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == '__main__':
+    main()